@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -74,6 +75,27 @@ WSGI_APPLICATION = "bookairfreight.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connection handling is set per environment:
+# - DB_CONN_MAX_AGE: seconds a connection is reused across requests (0 opens
+#   one per request, "none" keeps it open for good).
+# - DB_CONN_HEALTH_CHECKS: check a reused connection still works first.
+# - DB_POOL_SIZE: borrow connections from an in-process pool of this size
+#   instead, which also serves the per-request threads async views query
+#   from under ASGI. DB_POOL_TIMEOUT is how long to wait for a free one.
+# - DB_PREPARED_STATEMENTS=1: run the rate lookup as a prepared statement.
+# The pool and prepared statements are opt in and need the quotes.db.postgresql
+# backend, which is only used when one of them is on.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "0"))
+DB_PREPARED_STATEMENTS = os.environ.get("DB_PREPARED_STATEMENTS", "0") == "1"
+DB_CONN_MAX_AGE = os.environ.get("DB_CONN_MAX_AGE", "60")
+if DB_POOL_SIZE:
+    # Pooled connections go back to the pool at the end of each request.
+    DB_CONN_MAX_AGE = 0
+elif DB_CONN_MAX_AGE.lower() == "none":
+    DB_CONN_MAX_AGE = None
+else:
+    DB_CONN_MAX_AGE = int(DB_CONN_MAX_AGE)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -82,7 +104,49 @@ DATABASES = {
         "PASSWORD": "postgres",
         "HOST": "db",
         "PORT": 5432,
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "OPTIONS": {},
+    }
+}
+if DB_POOL_SIZE or DB_PREPARED_STATEMENTS:
+    DATABASES["default"]["ENGINE"] = "quotes.db.postgresql"
+    DATABASES["default"]["OPTIONS"] = {
+        "pool_size": DB_POOL_SIZE,
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        "prepared_statements": DB_PREPARED_STATEMENTS,
+    }
+
+
+# Comma separated hosts of read replicas of "default", added as replica_<n>
+# aliases and used for quote reads (see QUOTES_REPLICA_DATABASES).
+for position, host in enumerate(
+    host for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host
+):
+    DATABASES[f"replica_{position}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["quotes.routers.QuoteReplicaRouter"]
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Cached quotes are keyed by the rate table revision, so a shared backend
+# (e.g. Redis or Memcached) for "quotes" only adds hits across workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "quotes": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "quotes",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
 }
 
 
@@ -126,3 +190,66 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Quotes
+
+# Serve rate lookups from the per-process rate index instead of querying
+# PerWeightRate on every request.
+QUOTES_RATE_INDEX_ENABLED = True
+
+# Seconds a process reuses the rate table revision it read from the primary.
+# The rate index, surcharge rules and cached quotes follow the revision, so
+# changes committed by other processes reach new quotes within this long.
+QUOTES_RATE_TABLE_REVISION_TTL = 1
+
+# Upper bound on the number of shipments priced by one /v1/quotes/batch call.
+QUOTES_BATCH_MAX_SHIPMENTS = 1000
+
+# Manifests with at least this many box lines are aggregated as NumPy arrays
+# when numpy is installed. None always uses the per-box Python path.
+QUOTES_VECTORIZE_MIN_BOXES = 1000
+
+# Cache computed quotes in the QUOTES_CACHE_ALIAS cache, keyed by the shipment
+# and the rate table version.
+QUOTES_CACHE_ENABLED = True
+QUOTES_CACHE_ALIAS = "quotes"
+
+# JSON quote requests with a body of at least this many bytes are parsed
+# incrementally from the request stream instead of being read into memory
+# (which also lifts DATA_UPLOAD_MAX_MEMORY_SIZE for them). None never streams.
+QUOTES_STREAMING_MIN_BYTES = 1024 * 1024
+
+# Streamed bodies (large JSON bodies and every CSV or NDJSON one) fail as
+# malformed past QUOTES_STREAMING_MAX_BYTES, or when a single JSON value (a
+# box or another field) or CSV or NDJSON line is longer than
+# QUOTES_STREAMING_MAX_VALUE_LENGTH characters. None lifts either limit.
+QUOTES_STREAMING_MAX_BYTES = 128 * 1024 * 1024
+QUOTES_STREAMING_MAX_VALUE_LENGTH = 64 * 1024
+
+# Quote reads (rate lookups, rate index and surcharge rule loads) go to these
+# DATABASES aliases, picked "round_robin" or by "least_latency", skipping any
+# replica not serving the primary's active rate card version yet. Empty
+# reads from "default".
+QUOTES_REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+QUOTES_REPLICA_SELECTION = os.environ.get("QUOTES_REPLICA_SELECTION", "round_robin")
+
+# Warm up every process once apps are loaded (see quotes.warmup): load the
+# rate index, prime validators and price a synthetic quote before the first
+# request. Meant for server processes rather than management commands.
+QUOTES_WARM_UP = os.environ.get("QUOTES_WARM_UP", "0") == "1"
+
+# Time the stages, DB queries and box count of every quote request and report
+# them in a Server-Timing header, a quotes.requests log line and /metrics.
+QUOTES_INSTRUMENTATION_ENABLED = True
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "quotes.requests": {"handlers": ["console"], "level": "INFO"},
+        "quotes.warmup": {"handlers": ["console"], "level": "INFO"},
+        "quotes.surcharges": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -78,7 +79,49 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+    },
+    # Stands in for a read replica in tests that route quote reads to it.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+
+# Set TEST_POSTGRES_HOST to run the tests against Postgres through the
+# quotes.db.postgresql backend, with its pool and prepared statements on.
+# Tests marked postgres only run then.
+if os.environ.get("TEST_POSTGRES_HOST"):
+    for database in DATABASES.values():
+        database.update(
+            ENGINE="quotes.db.postgresql",
+            NAME="postgres",
+            USER=os.environ.get("TEST_POSTGRES_USER", "postgres"),
+            PASSWORD=os.environ.get("TEST_POSTGRES_PASSWORD", "postgres"),
+            HOST=os.environ["TEST_POSTGRES_HOST"],
+            PORT=int(os.environ.get("TEST_POSTGRES_PORT", "5432")),
+            CONN_HEALTH_CHECKS=True,
+            OPTIONS={"pool_size": 4, "pool_timeout": 5, "prepared_statements": True},
+        )
+
+DATABASE_ROUTERS = ["quotes.routers.QuoteReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Cached quotes are keyed by the rate table revision, so a shared backend
+# (e.g. Redis or Memcached) for "quotes" only adds hits across workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "quotes": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "quotes",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
 }
 
 
@@ -122,3 +165,66 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Quotes
+
+# Serve rate lookups from the per-process rate index instead of querying
+# PerWeightRate on every request.
+QUOTES_RATE_INDEX_ENABLED = True
+
+# Seconds a process reuses the rate table revision it read from the primary.
+# The rate index, surcharge rules and cached quotes follow the revision, so
+# changes committed by other processes reach new quotes within this long.
+QUOTES_RATE_TABLE_REVISION_TTL = 1
+
+# Upper bound on the number of shipments priced by one /v1/quotes/batch call.
+QUOTES_BATCH_MAX_SHIPMENTS = 1000
+
+# Manifests with at least this many box lines are aggregated as NumPy arrays
+# when numpy is installed. None always uses the per-box Python path.
+QUOTES_VECTORIZE_MIN_BOXES = 1000
+
+# Cache computed quotes in the QUOTES_CACHE_ALIAS cache, keyed by the shipment
+# and the rate table version.
+QUOTES_CACHE_ENABLED = True
+QUOTES_CACHE_ALIAS = "quotes"
+
+# JSON quote requests with a body of at least this many bytes are parsed
+# incrementally from the request stream instead of being read into memory
+# (which also lifts DATA_UPLOAD_MAX_MEMORY_SIZE for them). None never streams.
+QUOTES_STREAMING_MIN_BYTES = 1024 * 1024
+
+# Streamed bodies (large JSON bodies and every CSV or NDJSON one) fail as
+# malformed past QUOTES_STREAMING_MAX_BYTES, or when a single JSON value (a
+# box or another field) or CSV or NDJSON line is longer than
+# QUOTES_STREAMING_MAX_VALUE_LENGTH characters. None lifts either limit.
+QUOTES_STREAMING_MAX_BYTES = 128 * 1024 * 1024
+QUOTES_STREAMING_MAX_VALUE_LENGTH = 64 * 1024
+
+# Quote reads (rate lookups, rate index and surcharge rule loads) go to these
+# DATABASES aliases, picked "round_robin" or by "least_latency", skipping any
+# replica not serving the primary's active rate card version yet. Empty
+# reads from "default".
+QUOTES_REPLICA_DATABASES = []
+QUOTES_REPLICA_SELECTION = "round_robin"
+
+# Warm up every process once apps are loaded (see quotes.warmup): load the
+# rate index, prime validators and price a synthetic quote before the first
+# request. Meant for server processes rather than management commands.
+QUOTES_WARM_UP = False
+
+# Time the stages, DB queries and box count of every quote request and report
+# them in a Server-Timing header, a quotes.requests log line and /metrics.
+QUOTES_INSTRUMENTATION_ENABLED = True
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "quotes.requests": {"handlers": ["console"], "level": "INFO"},
+        "quotes.warmup": {"handlers": ["console"], "level": "INFO"},
+        "quotes.surcharges": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
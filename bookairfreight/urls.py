@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from quotes.views import MetricsView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("v1/quotes", include("quotes.urls")),
+    path("v1/", include("quotes.urls")),
+    path("metrics", MetricsView.as_view()),
 ]
@@ -0,0 +1,20 @@
+from django.contrib import admin
+from quotes.models import SurchargeRule
+
+
+@admin.register(SurchargeRule)
+class SurchargeRuleAdmin(admin.ModelAdmin):
+    list_display = ("kind", "starting_country", "threshold", "inclusive", "fee_cents")
+    list_filter = ("kind",)
+
+    # Default rules price every starting country without a rule of its own,
+    # so they can be edited but not deleted or moved to a country.
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None and obj.is_default:
+            return ("kind", "starting_country")
+        return ()
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and obj.is_default:
+            return False
+        return super().has_delete_permission(request, obj)
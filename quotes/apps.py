@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class QuotesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "quotes"
+
+    def ready(self):
+        from quotes import signals  # noqa: F401
+
+        if settings.QUOTES_WARM_UP:
+            from quotes.warmup import warm_up
+
+            warm_up()
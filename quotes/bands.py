@@ -0,0 +1,37 @@
+import bisect
+import itertools
+from array import array
+from typing import Iterable
+
+
+class BandIndex:
+    # Weight bands of one rate as sorted boundary arrays plus an array of
+    # per kg rates in cents.
+    # A weight falls in every band with min <= weight <= max, and when
+    # several contain it the band starting last wins: a weight on a shared
+    # boundary, e.g. 20 kg with 0-20 and 20-40 bands, takes the upper band.
+    __slots__ = ("min_weights", "max_weights", "per_kg_rates_cents", "_reach")
+
+    def __init__(self, bands: Iterable[tuple[float, float, int]]):
+        bands = sorted(bands)
+        self.min_weights = array("d", [band[0] for band in bands])
+        self.max_weights = array("d", [band[1] for band in bands])
+        self.per_kg_rates_cents = array("q", [band[2] for band in bands])
+        # Highest max weight up to each band, so a lookup stops as soon as no
+        # earlier band can reach the weight, overlapping bands or not.
+        self._reach = array("d", itertools.accumulate(self.max_weights, max))
+
+    def __len__(self) -> int:
+        return len(self.min_weights)
+
+    def find(self, weight: float) -> int:
+        # Position of the band pricing the weight, or -1 if none contains it.
+        position = bisect.bisect_right(self.min_weights, weight) - 1
+        while position >= 0 and self._reach[position] >= weight:
+            if self.max_weights[position] >= weight:
+                return position
+            position -= 1
+        return -1
+
+    def find_many(self, weights: Iterable[float]) -> list[int]:
+        return [self.find(weight) for weight in weights]
@@ -0,0 +1,266 @@
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Optional
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, override_settings
+from quotes.management.commands.import_rates import RATE_FIELDS, WEIGHT_BAND_FIELDS
+from quotes.manifest import Manifest
+from quotes.models import PerWeightRate, Rate, RateCardVersion
+from quotes.utils import QuoteCalculationService
+
+BENCHMARK_ORIGIN = "Origin 0"
+BENCHMARK_DESTINATION = "Destination 0"
+
+
+def generate_rate_card(lanes: int, bands: int) -> RateCardVersion:
+    version = RateCardVersion.objects.create(name="benchmark")
+    rates = Rate.objects.bulk_create(
+        [
+            Rate(
+                version=version,
+                starting_country=f"Origin {lane}",
+                destination_country=f"Destination {lane % 50}",
+                shipping_channel=shipping_channel,
+                shipping_time_range_min_days=1,
+                shipping_time_range_max_days=10,
+            )
+            for lane in range(lanes)
+            for shipping_channel in ["air", "ocean"]
+        ],
+        batch_size=5000,
+    )
+    PerWeightRate.objects.bulk_create(
+        (
+            PerWeightRate(
+                min_weight_kg=band * 100,
+                # the last band is open ended so huge manifests still get quotes
+                max_weight_kg=(band + 1) * 100 if band < bands - 1 else 10**9,
+                per_kg_rate_cents=1000 - band // 10,
+                rate_id=rate.id,
+            )
+            for rate in rates
+            for band in range(bands)
+        ),
+        batch_size=5000,
+    )
+    version.activate()
+    return version
+
+
+def generate_manifest(boxes: int, seed: int = 0) -> list[dict]:
+    generator = random.Random(seed)
+    return [
+        {
+            "count": generator.randint(1, 5),
+            "weight_kg": round(generator.uniform(0.5, 40), 2),
+            "length": round(generator.uniform(5, 150), 1),
+            "width": round(generator.uniform(5, 150), 1),
+            "height": round(generator.uniform(5, 150), 1),
+        }
+        for _ in range(boxes)
+    ]
+
+
+def measure(run: Callable[[], object], repeat: int) -> dict:
+    run()  # warm up caches, lazy imports and the rate index
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        **_summarize(timings),
+        # CPython keeps no running allocation counter, so report the peak
+        # traced memory and the memory blocks a run leaves allocated.
+        "peak_memory_kb": peak / 1024,
+        "retained_blocks": sum(
+            stat.count_diff for stat in after.compare_to(before, "filename")
+        ),
+    }
+
+
+def _percentile(sorted_timings: list[float], percentile: int) -> float:
+    position = round(percentile / 100 * (len(sorted_timings) - 1))
+    return sorted_timings[position]
+
+
+def _summarize(timings: list[float]) -> dict:
+    timings = sorted(timings)
+    return {
+        "runs": len(timings),
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": _percentile(timings, 50),
+        "p95_ms": _percentile(timings, 95),
+        "p99_ms": _percentile(timings, 99),
+    }
+
+
+def _write_rate_card(path: Path, lanes: int, bands: int):
+    with path.open("w", newline="") as rate_card:
+        writer = csv.writer(rate_card)
+        writer.writerow(RATE_FIELDS + WEIGHT_BAND_FIELDS)
+        for lane in range(lanes):
+            for band in range(bands):
+                writer.writerow(
+                    [f"Import {lane}", "USA", "air", 1, 2, band, band + 1, 5.0]
+                )
+
+
+def run_benchmarks(
+    lanes: int = 100,
+    bands: int = 100,
+    manifest_sizes: tuple[int, ...] = (1, 100, 10_000),
+    repeat: int = 20,
+    import_rows: int = 10_000,
+) -> dict[str, dict]:
+    results = {}
+    # Quote caching would turn every run after the first into a cache hit, and
+    # the largest manifests exceed Django's default request body limit.
+    with override_settings(
+        ALLOWED_HOSTS=["testserver"],
+        QUOTES_CACHE_ENABLED=False,
+        DATA_UPLOAD_MAX_MEMORY_SIZE=None,
+    ), transaction.atomic():
+        generate_rate_card(lanes, bands)
+        client = Client()
+
+        def post_quote(body: str):
+            response = client.post("/v1/quotes", body, content_type="application/json")
+            if response.status_code != 200:
+                raise AssertionError(f"Quote request failed: {response.content!r}")
+
+        for size in manifest_sizes:
+            manifest = generate_manifest(size)
+            boxes = Manifest.from_dicts(manifest)
+            results[f"calculate_quotes[{size}]"] = measure(
+                lambda: QuoteCalculationService.calculate_quotes(
+                    BENCHMARK_ORIGIN, BENCHMARK_DESTINATION, boxes
+                ),
+                repeat,
+            )
+
+            body = json.dumps(
+                {
+                    "starting_country": BENCHMARK_ORIGIN,
+                    "destination_country": BENCHMARK_DESTINATION,
+                    "boxes": manifest,
+                }
+            )
+            results[f"quote_view[{size}]"] = measure(lambda: post_quote(body), repeat)
+
+        with tempfile.TemporaryDirectory() as directory:
+            rate_card = Path(directory) / "rates.csv"
+            _write_rate_card(rate_card, max(import_rows // 100, 1), 100)
+            results[f"import_rates[{import_rows}]"] = measure(
+                lambda: call_command("import_rates", str(rate_card), stdout=StringIO()),
+                max(repeat // 5, 1),
+            )
+
+        transaction.set_rollback(True)
+    return results
+
+
+def compare_to_baseline(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        reference: Optional[dict] = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ["p50_ms", "p95_ms"]:
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name} {metric}: {result[metric]:.3f} > "
+                    f"{reference[metric]:.3f} (+{tolerance:.0%} tolerance)"
+                )
+    return regressions
+
+
+# Run in a fresh interpreter per measurement: Django setup as a new worker
+# does it, then the warm-up that QuotesConfig.ready runs with QUOTES_WARM_UP.
+STARTUP_SCRIPT = """
+import json
+import time
+
+started = time.perf_counter()
+import django
+
+django.setup()
+setup_ms = (time.perf_counter() - started) * 1000
+
+from quotes.warmup import warm_up
+
+timings = {f"warm_up_{step}": duration for step, duration in warm_up().items()}
+print(json.dumps({"django_setup": setup_ms, **timings}))
+"""
+
+
+def parse_importtime(output: str) -> dict[str, float]:
+    # Self time in ms of every module in python -X importtime output, whose
+    # lines read "import time: <self us> | <cumulative us> | <module>".
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        if self_us.strip().isdigit():
+            imports[module.strip()] = int(self_us) / 1000
+    return imports
+
+
+def run_startup_benchmark(
+    repeat: int = 5, top: int = 10
+) -> tuple[dict[str, dict], list[tuple[str, float]]]:
+    # Times interpreter start to a warmed up worker, returning p50/p95/p99 of
+    # Django setup, each warm-up step and the total import time, plus the
+    # modules with the highest median import time.
+    timings: dict[str, list[float]] = {}
+    imports: dict[str, list[float]] = {}
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            capture_output=True,
+            text=True,
+            check=True,
+            # The script warms up explicitly, so ready() must not as well.
+            env={**os.environ, "QUOTES_WARM_UP": "0"},
+        )
+        run_imports = parse_importtime(process.stderr)
+        run_timings = json.loads(process.stdout.splitlines()[-1])
+        run_timings["imports"] = sum(run_imports.values())
+        for name, duration in run_timings.items():
+            timings.setdefault(name, []).append(duration)
+        for module, duration in run_imports.items():
+            imports.setdefault(module, []).append(duration)
+
+    slowest_imports = sorted(
+        (
+            (module, statistics.median(durations))
+            for module, durations in imports.items()
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        name: _summarize(durations) for name, durations in timings.items()
+    }, slowest_imports
@@ -0,0 +1,79 @@
+import math
+from typing import Iterable, Mapping
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+BOX_FIELDS = ("count", "weight_kg", "length", "width", "height")
+
+
+def is_vectorization_available() -> bool:
+    return np is not None
+
+
+class BoxArrays:
+    __slots__ = ("count", "weight_kg", "volume", "longest_dimension")
+
+    def __init__(self, columns):
+        # columns is a (5, n) float array laid out in BOX_FIELDS order
+        count, weight_kg, length, width, height = columns
+        self.count = count
+        self.weight_kg = weight_kg
+        self.volume = length * width * height
+        self.longest_dimension = np.maximum(np.maximum(length, width), height)
+
+    @classmethod
+    def from_dicts(cls, boxes: Iterable[Mapping[str, float]]) -> "BoxArrays":
+        rows = np.array(
+            [tuple(box[field] for field in BOX_FIELDS) for box in boxes],
+            dtype=np.float64,
+        ).reshape(-1, len(BOX_FIELDS))
+        return cls(rows.T)
+
+    @classmethod
+    def from_boxes(cls, boxes) -> "BoxArrays":
+        return cls.from_dicts(
+            {field: getattr(box, field) for field in BOX_FIELDS} for box in boxes
+        )
+
+    @classmethod
+    def from_manifest(cls, manifest) -> "BoxArrays":
+        # Wraps the manifest's arrays without copying them.
+        box_arrays = cls.__new__(cls)
+        for field in cls.__slots__:
+            setattr(box_arrays, field, np.frombuffer(getattr(manifest, field)))
+        return box_arrays
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    def sorted_rows_bytes(self) -> bytes:
+        columns = np.stack(
+            (self.count, self.weight_kg, self.volume, self.longest_dimension)
+        )
+        return columns[:, np.lexsort(columns)].tobytes()
+
+    def gross_weight(self) -> float:
+        # fsum rather than a dot product: sums are rounded once, whatever
+        # their order, so every box representation gets the same weights and
+        # prices agree to the cent.
+        return math.fsum((self.count * self.weight_kg).tolist())
+
+    def volumetric_weight(self) -> float:
+        return math.fsum((self.count * self.volume).tolist()) / 6000
+
+    def count_overweight(self, limit_kg: float, inclusive: bool) -> int:
+        overweight = (
+            self.weight_kg >= limit_kg if inclusive else self.weight_kg > limit_kg
+        )
+        return int(np.count_nonzero(overweight))
+
+    def count_oversized(self, limit: float, inclusive: bool = False) -> int:
+        oversized = (
+            self.longest_dimension >= limit
+            if inclusive
+            else self.longest_dimension > limit
+        )
+        return int(np.count_nonzero(oversized))
@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    # A pooled DB-API connection and the per session state that outlives a
+    # checkout, like the statements prepared on it.
+    __slots__ = ("connection", "prepared_statements", "returned_at")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.prepared_statements: set[str] = set()
+        self.returned_at = time.monotonic()
+
+
+class ConnectionPool:
+    # Thread safe pool of up to max_size connections, handed out most
+    # recently used first so idle ones age out of use. A checkout waits up
+    # to timeout seconds for a connection to be returned once all are taken.
+    def __init__(
+        self,
+        max_size: int,
+        timeout: float,
+        check: Optional[Callable[[Any], bool]] = None,
+        check_after: float = 0,
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        # Connections idle for longer than check_after seconds are only
+        # handed out again once check(connection) returns True.
+        self._check = check
+        self._check_after = check_after
+        self._idle: list[PooledConnection] = []
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def get(self, connect: Callable[[], Any]) -> PooledConnection:
+        # connect() opens a new connection when none is idle and the pool
+        # has room for one.
+        while True:
+            with self._condition:
+                if not self._condition.wait_for(
+                    lambda: self._idle or self._size < self.max_size, self.timeout
+                ):
+                    raise PoolTimeout(
+                        f"No connection available within {self.timeout}s "
+                        f"({self.max_size} in use)"
+                    )
+                if not self._idle:
+                    self._size += 1
+                    break
+                pooled = self._idle.pop()
+
+            if self._is_usable(pooled):
+                return pooled
+            self.discard(pooled)
+
+        try:
+            return PooledConnection(connect())
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _is_usable(self, pooled: PooledConnection) -> bool:
+        if getattr(pooled.connection, "closed", False):
+            return False
+        if (
+            self._check is None
+            or time.monotonic() - pooled.returned_at <= self._check_after
+        ):
+            return True
+        try:
+            return self._check(pooled.connection)
+        except Exception:
+            return False
+
+    def put(self, pooled: PooledConnection):
+        pooled.returned_at = time.monotonic()
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def discard(self, pooled: PooledConnection):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self.discard(pooled)
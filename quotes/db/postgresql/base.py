@@ -0,0 +1,100 @@
+import threading
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from quotes.db.pool import ConnectionPool, PoolTimeout
+
+# Pooled connections idle for longer than this are checked before reuse
+# when CONN_HEALTH_CHECKS is on.
+POOL_HEALTH_CHECK_AFTER = 10
+
+# libpq's PQTRANS_IDLE, as reported by psycopg2 and psycopg alike.
+TRANSACTION_STATUS_IDLE = 0
+
+# One pool per database alias, shared by every thread of the process.
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _is_usable(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # The stock PostgreSQL backend plus two OPTIONS:
+    # - "pool_size": borrow connections from an in-process pool of that size
+    #   (waiting up to "pool_timeout" seconds for one) and return them on
+    #   close, instead of opening and closing a connection every time. Use
+    #   it with CONN_MAX_AGE = 0, so each request returns its connection.
+    # - "prepared_statements": run lookups that support it as server side
+    #   prepared statements, see quotes.db.prepared.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pooled = None
+        self.prepared_statements: set[str] = set()
+
+    @property
+    def prepared_statements_enabled(self) -> bool:
+        return bool(self.settings_dict["OPTIONS"].get("prepared_statements"))
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        for option in ("pool_size", "pool_timeout", "prepared_statements"):
+            conn_params.pop(option, None)
+        return conn_params
+
+    def _get_pool(self) -> ConnectionPool:
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+            if pool is None:
+                options = self.settings_dict["OPTIONS"]
+                pool = ConnectionPool(
+                    max_size=options["pool_size"],
+                    timeout=options.get("pool_timeout", 30),
+                    check=_is_usable
+                    if self.settings_dict["CONN_HEALTH_CHECKS"]
+                    else None,
+                    check_after=POOL_HEALTH_CHECK_AFTER,
+                )
+                _pools[self.alias] = pool
+            return pool
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        if not self.settings_dict["OPTIONS"].get("pool_size"):
+            self.prepared_statements = set()
+            return super().get_new_connection(conn_params)
+        try:
+            self._pooled = self._get_pool().get(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+            )
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+        self.prepared_statements = self._pooled.prepared_statements
+        return self._pooled.connection
+
+    def _close(self):
+        pooled, self._pooled = self._pooled, None
+        if pooled is None:
+            return super()._close()
+        pool = _pools[self.alias]
+        connection = pooled.connection
+        # Only connections left idle outside a transaction go back, anything
+        # else is closed rather than handed to the next request as is.
+        if (
+            not connection.closed
+            and connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+        ):
+            pool.put(pooled)
+        else:
+            pool.discard(pooled)
+
+
+def close_pools():
+    # Closes the idle connections of every pool, e.g. before forking workers
+    # that must not share them.
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,55 @@
+from typing import Optional
+
+
+def prepare_sql(name: str, sql: str, param_count: int) -> str:
+    # Django SQL uses %s placeholders with literal percent signs doubled, so
+    # formatting it with $n placeholders gives a statement Postgres can
+    # prepare.
+    return f"PREPARE {name} AS " + sql % tuple(
+        f"${position}" for position in range(1, param_count + 1)
+    )
+
+
+def execute_sql(name: str, param_count: int) -> str:
+    if not param_count:
+        return f"EXECUTE {name}"
+    return f"EXECUTE {name} ({', '.join(['%s'] * param_count)})"
+
+
+def supports_prepared_statements(connection) -> bool:
+    return getattr(connection, "prepared_statements_enabled", False)
+
+
+def _values_list_order(queryset) -> Optional[list[int]]:
+    # SQL selects model fields before annotations, whatever order they are
+    # given to values_list in. Positions of the values_list fields in the
+    # selected columns, like ValuesListIterable does, or None when they match.
+    query = queryset.query
+    if not queryset._fields:
+        return None
+    columns = [*query.extra_select, *query.values_select, *query.annotation_select]
+    fields = [
+        *queryset._fields,
+        *(name for name in query.annotation_select if name not in queryset._fields),
+    ]
+    if fields == columns:
+        return None
+    return [columns.index(field) for field in fields]
+
+
+def execute_prepared(connection, name: str, queryset) -> list[tuple]:
+    # Runs the values_list queryset as the server side prepared statement
+    # name, preparing it on first use in each database session, so Postgres
+    # parses and plans it once per session instead of once per call. Returns
+    # rows with their values in values_list order.
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if name not in connection.prepared_statements:
+            cursor.execute(prepare_sql(name, sql, len(params)))
+            connection.prepared_statements.add(name)
+        cursor.execute(execute_sql(name, len(params)), params)
+        rows = cursor.fetchall()
+    order = _values_list_order(queryset)
+    if order is None:
+        return rows
+    return [tuple(row[position] for position in order) for row in rows]
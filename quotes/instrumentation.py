@@ -0,0 +1,255 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+from django.conf import settings
+
+logger = logging.getLogger("quotes.requests")
+
+DURATION_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+COUNT_BUCKETS = (0, 1, 5, 10, 100, 1000, 10000, 100000)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label value -> (per bucket counts with a trailing +Inf bucket, sum)
+        self._series: dict[str, tuple[list[int], list[float]]] = {}
+
+    def observe(self, label_value: str, value: float):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                label_value, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[position] += 1
+            total[0] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {
+                label_value: (list(counts), total[0])
+                for label_value, (counts, total) in self._series.items()
+            }
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "quotes_request_duration_seconds",
+    "Time spent handling a quote request.",
+    "endpoint",
+    DURATION_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "quotes_stage_duration_seconds",
+    "Time spent in each stage of a quote request.",
+    "stage",
+    DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "quotes_request_db_queries",
+    "Database queries run by a quote request.",
+    "endpoint",
+    COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "quotes_request_db_duration_seconds",
+    "Time a quote request spent waiting on the database.",
+    "endpoint",
+    DURATION_BUCKETS,
+)
+REQUEST_BOXES = Histogram(
+    "quotes_request_boxes",
+    "Box lines in a quote request.",
+    "endpoint",
+    COUNT_BUCKETS,
+)
+HISTOGRAMS = [REQUEST_DURATION, STAGE_DURATION, DB_QUERIES, DB_DURATION, REQUEST_BOXES]
+
+
+class RequestMetrics:
+    __slots__ = ("endpoint", "stages", "boxes", "db_queries", "db_duration")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: dict[str, float] = {}
+        self.boxes = 0
+        self.db_queries = 0
+        self.db_duration = 0.0
+
+    def add_stage(self, name: str, duration: float):
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+
+    def server_timing(self, duration: float) -> str:
+        entries = [
+            f"{name};dur={stage_duration * 1000:.3f}"
+            for name, stage_duration in self.stages.items()
+        ]
+        entries.append(
+            f'db;dur={self.db_duration * 1000:.3f};desc="{self.db_queries} queries"'
+        )
+        entries.append(f"total;dur={duration * 1000:.3f}")
+        return ", ".join(entries)
+
+    def log_fields(self, duration: float) -> dict:
+        return {
+            "endpoint": self.endpoint,
+            "duration_ms": round(duration * 1000, 3),
+            "boxes": self.boxes,
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_duration * 1000, 3),
+            **{
+                f"{name}_ms": round(stage_duration * 1000, 3)
+                for name, stage_duration in self.stages.items()
+            },
+        }
+
+
+_current_metrics: contextvars.ContextVar[
+    Optional[RequestMetrics]
+] = contextvars.ContextVar("quotes_request_metrics", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_stage(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed as an execute wrapper on every DB connection. Connections are
+    # per thread, so the request is found through the context variable, which
+    # sync_to_async carries over to the thread running async views' queries.
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_duration += time.perf_counter() - started
+
+
+def record_boxes(count: int):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.boxes += count
+
+
+def _finish(metrics: RequestMetrics, response, duration: float):
+    REQUEST_DURATION.observe(metrics.endpoint, duration)
+    DB_QUERIES.observe(metrics.endpoint, metrics.db_queries)
+    DB_DURATION.observe(metrics.endpoint, metrics.db_duration)
+    REQUEST_BOXES.observe(metrics.endpoint, metrics.boxes)
+    for name, stage_duration in metrics.stages.items():
+        STAGE_DURATION.observe(name, stage_duration)
+
+    response["Server-Timing"] = metrics.server_timing(duration)
+    fields = metrics.log_fields(duration)
+    fields["status"] = response.status_code
+    logger.info(
+        " ".join(f"{key}={value}" for key, value in fields.items()),
+        extra={"quote_request": fields},
+    )
+    return response
+
+
+def instrumented(endpoint: str):
+    # Wraps a quote view so stage timers, DB queries and box counts recorded
+    # while it runs end up in its Server-Timing header, a log line and the
+    # /metrics histograms.
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not settings.QUOTES_INSTRUMENTATION_ENABLED:
+                    return await view(request, *args, **kwargs)
+                metrics = RequestMetrics(endpoint)
+                token = _current_metrics.set(metrics)
+                started = time.perf_counter()
+                try:
+                    response = await view(request, *args, **kwargs)
+                finally:
+                    _current_metrics.reset(token)
+                return _finish(metrics, response, time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.QUOTES_INSTRUMENTATION_ENABLED:
+                return view(request, *args, **kwargs)
+            metrics = RequestMetrics(endpoint)
+            token = _current_metrics.set(metrics)
+            started = time.perf_counter()
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                _current_metrics.reset(token)
+            return _finish(metrics, response, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics(counters: dict[str, tuple[str, int]]) -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, (help, value) in counters.items():
+        lines.extend(
+            [f"# HELP {name} {help}", f"# TYPE {name} counter", f"{name} {value}"]
+        )
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
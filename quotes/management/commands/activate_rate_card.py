@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from quotes.models import RateCardVersion
+
+
+class Command(BaseCommand):
+    help = "Switches quotes over to a previously imported rate card version"
+
+    def add_arguments(self, parser):
+        parser.add_argument("version_id", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            version = RateCardVersion.objects.get(pk=options["version_id"])
+        except RateCardVersion.DoesNotExist:
+            raise CommandError(f"Rate card version {options['version_id']} not found")
+        version.activate()
+        self.stdout.write(
+            self.style.SUCCESS(f"Activated rate card version {version.pk}")
+        )
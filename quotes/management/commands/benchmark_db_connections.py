@@ -0,0 +1,80 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from quotes.managers import active_rate_card_version_ids
+from quotes.models import PerWeightRate, Rate
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the lane + weight band lookup against the configured database "
+        "(e.g. a local Postgres) the way requests would run it: reconnecting "
+        "for every lookup (CONN_MAX_AGE = 0, or a pool checkout when "
+        "DB_POOL_SIZE is set), over a persistent connection, and over a "
+        "persistent connection with the lookup as a prepared statement. Uses "
+        "the active rate card, so load some rates first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lookups", type=int, default=500)
+        parser.add_argument("--max-weight", type=float, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def _time_lookups(self, lanes, lookups: int, max_weight: float, reconnect: bool):
+        timings = []
+        for _ in range(lookups):
+            starting_country, destination_country = random.choice(lanes)
+            weight = random.uniform(0, max_weight)
+            started = time.perf_counter()
+            PerWeightRate.objects.fetch_for_lane_and_weight(
+                starting_country, destination_country, weight
+            )
+            if reconnect:
+                connection.close()
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        lanes = list(
+            Rate.objects.filter(version__in=active_rate_card_version_ids())
+            .values_list("starting_country", "destination_country")
+            .distinct()
+        )
+        if not lanes:
+            raise CommandError("The active rate card has no rates")
+
+        options_dict = connection.settings_dict["OPTIONS"]
+        # Only the quotes.db.postgresql backend knows the option.
+        can_prepare = hasattr(connection, "prepared_statements_enabled")
+        prepared_statements = options_dict.get("prepared_statements")
+        modes = [
+            ("pooled" if options_dict.get("pool_size") else "reconnect", True, False),
+            ("persistent", False, False),
+        ]
+        if can_prepare:
+            modes.append(("prepared", False, True))
+
+        try:
+            for name, reconnect, prepared in modes:
+                if can_prepare:
+                    options_dict["prepared_statements"] = prepared
+                connection.close()
+                # Warm up, so the first connection or PREPARE is not counted.
+                self._time_lookups(lanes, 1, options["max_weight"], False)
+                timings = self._time_lookups(
+                    lanes, options["lookups"], options["max_weight"], reconnect
+                )
+                self.stdout.write(
+                    f"{name:>10}: "
+                    f"mean={statistics.mean(timings):.3f}ms "
+                    f"p50={timings[len(timings) // 2]:.3f}ms "
+                    f"p95={timings[int(len(timings) * 0.95)]:.3f}ms "
+                    f"max={timings[-1]:.3f}ms"
+                )
+        finally:
+            if can_prepare:
+                options_dict["prepared_statements"] = prepared_statements
+            connection.close()
@@ -0,0 +1,96 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from quotes.serializers import (
+    ShippingQuotesRequestSerializer,
+    ShippingQuotesResponseSerializer,
+)
+from quotes.utils import (
+    Box,
+    Quote,
+    QuotePriceBreakdown,
+    Shipment,
+    ShippingQuotesResponse,
+    ShippingTimeRange,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the CPU time per request spent validating the quote request and "
+        "serializing the response with DRF serializers against the pydantic path "
+        "used by ShippingQuotesView"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--boxes", type=int, default=10)
+        parser.add_argument("--quotes", type=int, default=3)
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    @staticmethod
+    def _serializer_round_trip(body: bytes, quotes: list[Quote]) -> bytes:
+        serializer = ShippingQuotesRequestSerializer(data=json.loads(body))
+        serializer.is_valid(raise_exception=True)
+        [Box(**box_data) for box_data in serializer.data["boxes"]]
+        response_serializer = ShippingQuotesResponseSerializer(
+            data={"quotes": [quote.model_dump(mode="json") for quote in quotes]}
+        )
+        response_serializer.is_valid(raise_exception=True)
+        return JSONRenderer().render(response_serializer.data)
+
+    @staticmethod
+    def _pydantic_fast_path(body: bytes, quotes: list[Quote]) -> bytes:
+        Shipment.model_validate_json(body)
+        return ShippingQuotesResponse(quotes=quotes).model_dump_json().encode()
+
+    def _time(self, handler, body: bytes, quotes: list[Quote], iterations: int):
+        started = time.process_time()
+        for _ in range(iterations):
+            handler(body, quotes)
+        return (time.process_time() - started) / iterations * 1_000_000
+
+    def handle(self, *args, **options):
+        body = json.dumps(
+            {
+                "starting_country": "China",
+                "destination_country": "USA",
+                "boxes": [
+                    {
+                        "count": 10,
+                        "weight_kg": 12.5,
+                        "length": 40,
+                        "width": 30,
+                        "height": 20,
+                    }
+                ]
+                * options["boxes"],
+            }
+        ).encode()
+        quotes = [
+            Quote(
+                shipping_channel=f"channel {i}",
+                cost_breakdown=QuotePriceBreakdown(
+                    shipping_cost=1234.5,
+                    service_fee=300,
+                    oversized_fee=100,
+                    overweight_fee=0,
+                ),
+                shipping_time_range=ShippingTimeRange(min_days=10, max_days=20),
+                total_cost=1634.5,
+            )
+            for i in range(options["quotes"])
+        ]
+
+        serializer_us = self._time(
+            self._serializer_round_trip, body, quotes, options["iterations"]
+        )
+        fast_path_us = self._time(
+            self._pydantic_fast_path, body, quotes, options["iterations"]
+        )
+        self.stdout.write(f"DRF serializers: {serializer_us:.1f}us CPU per request")
+        self.stdout.write(f"pydantic:        {fast_path_us:.1f}us CPU per request")
+        self.stdout.write(
+            f"saved:           {serializer_us - fast_path_us:.1f}us "
+            f"({serializer_us / fast_path_us:.1f}x)"
+        )
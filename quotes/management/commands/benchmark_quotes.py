@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from quotes.benchmarks import compare_to_baseline, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the quote pipeline (QuoteCalculationService, the quote endpoint and "
+        "rate import) against a synthetic rate table, writes p50/p95/p99 and "
+        "memory use as JSON and optionally fails on regressions against a "
+        "stored baseline. Generated data is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lanes", type=int, default=100)
+        parser.add_argument("--bands", type=int, default=100)
+        parser.add_argument(
+            "--boxes",
+            default="1,100,10000",
+            help="Comma separated manifest sizes",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--import-rows", type=int, default=10000)
+        parser.add_argument("--output", type=Path)
+        parser.add_argument("--baseline", type=Path)
+        parser.add_argument("--tolerance", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            lanes=options["lanes"],
+            bands=options["bands"],
+            manifest_sizes=tuple(int(size) for size in options["boxes"].split(",")),
+            repeat=options["repeat"],
+            import_rows=options["import_rows"],
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28} p50={result['p50_ms']:.3f}ms "
+                f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms "
+                f"peak={result['peak_memory_kb']:.0f}KiB"
+            )
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2))
+
+        if options["baseline"]:
+            regressions = compare_to_baseline(
+                results,
+                json.loads(options["baseline"].read_text()),
+                options["tolerance"],
+            )
+            if regressions:
+                raise CommandError(
+                    "Performance regressions:\n" + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from quotes.models import PerWeightRate, Rate, RateCardVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic rate table and reports the query plan and "
+        "timings of the lane + weight band lookup. The generated rows are "
+        "rolled back unless --keep is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lanes", type=int, default=1000)
+        parser.add_argument("--bands", type=int, default=100)
+        parser.add_argument("--lookups", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true")
+
+    def _generate_rate_table(self, lanes: int, bands: int) -> list[tuple[str, str]]:
+        lane_keys = [(f"Origin {i}", f"Destination {i % 50}") for i in range(lanes)]
+        version = RateCardVersion.objects.get_or_create_active()
+        rates = Rate.objects.bulk_create(
+            [
+                Rate(
+                    version=version,
+                    starting_country=starting_country,
+                    destination_country=destination_country,
+                    shipping_channel="air",
+                    shipping_time_range_min_days=1,
+                    shipping_time_range_max_days=10,
+                )
+                for starting_country, destination_country in lane_keys
+            ],
+            batch_size=5000,
+        )
+        PerWeightRate.objects.bulk_create(
+            (
+                PerWeightRate(
+                    min_weight_kg=band * 10,
+                    max_weight_kg=(band + 1) * 10,
+                    per_kg_rate_cents=1000 - band,
+                    rate_id=rate.id,
+                )
+                for rate in rates
+                for band in range(bands)
+            ),
+            batch_size=5000,
+        )
+        return lane_keys
+
+    def _time_lookups(self, lane_keys, bands: int, lookups: int) -> list[float]:
+        timings = []
+        for _ in range(lookups):
+            starting_country, destination_country = random.choice(lane_keys)
+            weight = random.uniform(0, bands * 10)
+            started = time.perf_counter()
+            list(
+                PerWeightRate.objects.for_lane_and_weight(
+                    starting_country, destination_country, weight
+                )
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        with transaction.atomic():
+            started = time.perf_counter()
+            lane_keys = self._generate_rate_table(options["lanes"], options["bands"])
+            self.stdout.write(
+                f"Generated {options['lanes'] * options['bands']} weight bands "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+
+            starting_country, destination_country = lane_keys[0]
+            self.stdout.write("Query plan:")
+            self.stdout.write(
+                PerWeightRate.objects.for_lane_and_weight(
+                    starting_country, destination_country, 15
+                ).explain()
+            )
+
+            timings = sorted(
+                self._time_lookups(lane_keys, options["bands"], options["lookups"])
+            )
+            self.stdout.write(
+                f"{len(timings)} lookups: "
+                f"mean={statistics.mean(timings):.3f}ms "
+                f"p50={timings[len(timings) // 2]:.3f}ms "
+                f"p95={timings[int(len(timings) * 0.95)]:.3f}ms "
+                f"max={timings[-1]:.3f}ms"
+            )
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from quotes.benchmarks import compare_to_baseline, run_startup_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Times worker startup in fresh interpreters run with python -X "
+        "importtime: Django setup, each step of the quotes warm-up and the total "
+        "import time, plus the slowest imports. Writes p50/p95/p99 as JSON and "
+        "optionally fails on regressions against a stored baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--top", type=int, default=10, help="Slowest imports")
+        parser.add_argument("--output", type=Path)
+        parser.add_argument("--baseline", type=Path)
+        parser.add_argument("--tolerance", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        results, slowest_imports = run_startup_benchmark(
+            options["repeat"], options["top"]
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28} p50={result['p50_ms']:.3f}ms "
+                f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms"
+            )
+        self.stdout.write("Slowest imports (median self time):")
+        for module, duration in slowest_imports:
+            self.stdout.write(f"  {module:<48} {duration:.3f}ms")
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2))
+
+        if options["baseline"]:
+            regressions = compare_to_baseline(
+                results,
+                json.loads(options["baseline"].read_text()),
+                options["tolerance"],
+            )
+            if regressions:
+                raise CommandError(
+                    "Performance regressions:\n" + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
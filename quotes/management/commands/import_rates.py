@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from quotes.models import PerWeightRate, Rate, RateCardVersion
+from quotes.money import to_cents
+
+RATE_FIELDS = (
+    "starting_country",
+    "destination_country",
+    "shipping_channel",
+    "shipping_time_range_min_days",
+    "shipping_time_range_max_days",
+)
+WEIGHT_BAND_FIELDS = ("min_weight_kg", "max_weight_kg", "per_kg_rate")
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a rate card from a CSV or JSONL file with one weight band per "
+        "row/line and the columns " + ", ".join(RATE_FIELDS + WEIGHT_BAND_FIELDS) + ". "
+        "Consecutive rows sharing the rate columns become a single Rate. The "
+        "file is staged as a new rate card version in one transaction and only "
+        "served once activated. Rates are currency amounts in whole cents"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--name", help="Rate card version name")
+        parser.add_argument(
+            "--activate",
+            action="store_true",
+            help="Serve quotes from the new rate card once it is imported",
+        )
+
+    @staticmethod
+    def _read_rows(path: Path, file_format: str):
+        # JSONL lines are yielded undecoded, so a malformed line is reported
+        # by _parse_row along with its row number like any other bad row.
+        with path.open(newline="") as rate_card:
+            if file_format == "csv":
+                yield from csv.DictReader(rate_card)
+            else:
+                for line in rate_card:
+                    if line.strip():
+                        yield line
+
+    @staticmethod
+    def _parse_row(row) -> tuple[tuple, tuple]:
+        if isinstance(row, str):
+            row = json.loads(row)
+        return (
+            (
+                row["starting_country"],
+                row["destination_country"],
+                row["shipping_channel"],
+                int(row["shipping_time_range_min_days"]),
+                int(row["shipping_time_range_max_days"]),
+            ),
+            (
+                float(row["min_weight_kg"]),
+                float(row["max_weight_kg"]),
+                to_cents(row["per_kg_rate"], exact=True),
+            ),
+        )
+
+    @staticmethod
+    def _insert_weight_bands(weight_bands: list[PerWeightRate]):
+        if connection.vendor != "postgresql":
+            PerWeightRate.objects.bulk_create(weight_bands)
+            return
+        # COPY skips statement parsing and per-row overhead for the bulk of
+        # the import, which is weight bands rather than rates.
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (
+                band.min_weight_kg,
+                band.max_weight_kg,
+                band.per_kg_rate_cents,
+                band.rate.pk,
+            )
+            for band in weight_bands
+        )
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {PerWeightRate._meta.db_table} "
+                "(min_weight_kg, max_weight_kg, per_kg_rate_cents, rate_id) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    def _flush(self, rates: list[Rate], weight_bands: list[PerWeightRate]):
+        Rate.objects.bulk_create(rates)
+        self._insert_weight_bands(weight_bands)
+
+    def _import(
+        self, rows, version: RateCardVersion, batch_size: int
+    ) -> tuple[int, int]:
+        rate_count = band_count = 0
+        pending_rates: list[Rate] = []
+        pending_bands: list[PerWeightRate] = []
+        current_key = current_rate = None
+        started = time.perf_counter()
+
+        for line_number, row in enumerate(rows, start=1):
+            try:
+                rate_key, (
+                    min_weight_kg,
+                    max_weight_kg,
+                    per_kg_rate_cents,
+                ) = self._parse_row(row)
+            except (KeyError, TypeError, ValueError) as error:
+                raise CommandError(f"Invalid rate card row {line_number}: {error!r}")
+
+            if rate_key != current_key:
+                current_key = rate_key
+                current_rate = Rate(version=version, **dict(zip(RATE_FIELDS, rate_key)))
+                pending_rates.append(current_rate)
+                rate_count += 1
+            pending_bands.append(
+                PerWeightRate(
+                    min_weight_kg=min_weight_kg,
+                    max_weight_kg=max_weight_kg,
+                    per_kg_rate_cents=per_kg_rate_cents,
+                    rate=current_rate,
+                )
+            )
+            band_count += 1
+
+            if len(pending_bands) >= batch_size:
+                self._flush(pending_rates, pending_bands)
+                pending_rates, pending_bands = [], []
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{band_count} weight bands ({band_count / elapsed:.0f} rows/s)"
+                )
+
+        self._flush(pending_rates, pending_bands)
+        return rate_count, band_count
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or (
+            "csv" if path.suffix.lower() == ".csv" else "jsonl"
+        )
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+
+        started = time.perf_counter()
+        # Staged rows belong to a version nobody reads yet, so the import
+        # never contends with quote traffic and needs no cache invalidation.
+        with transaction.atomic():
+            version = RateCardVersion.objects.create(name=options["name"] or path.name)
+            rate_count, band_count = self._import(
+                self._read_rows(path, file_format), version, options["batch_size"]
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {rate_count} rates with {band_count} weight bands into "
+                f"rate card version {version.pk} in {elapsed:.2f}s "
+                f"({band_count / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+        )
+        if options["activate"]:
+            version.activate()
+            self.stdout.write(f"Activated rate card version {version.pk}")
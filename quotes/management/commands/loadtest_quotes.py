@@ -0,0 +1,83 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent quote requests at running servers and compares their "
+        "throughput and latency, e.g. the WSGI /v1/quotes endpoint against the "
+        "ASGI /v1/quotes/async one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            action="append",
+            dest="urls",
+            help="Endpoint to load test, can be repeated",
+        )
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--boxes", type=int, default=10)
+
+    @staticmethod
+    def _post(url: str, body: bytes) -> tuple[float, bool]:
+        request = urllib.request.Request(
+            url, data=body, headers={"Content-Type": "application/json"}
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                succeeded = response.status == 200
+        except (urllib.error.URLError, ConnectionError):
+            succeeded = False
+        return time.perf_counter() - started, succeeded
+
+    def _load_test(self, url: str, body: bytes, requests: int, concurrency: int):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(
+                executor.map(lambda _: self._post(url, body), range(requests))
+            )
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, succeeded in results if not succeeded)
+        self.stdout.write(
+            f"{url}: {requests / elapsed:.1f} req/s, "
+            f"mean={statistics.mean(latencies):.1f}ms "
+            f"p50={latencies[len(latencies) // 2]:.1f}ms "
+            f"p95={latencies[int(len(latencies) * 0.95)]:.1f}ms "
+            f"p99={latencies[int(len(latencies) * 0.99)]:.1f}ms "
+            f"errors={errors}"
+        )
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or [
+            "http://127.0.0.1:8000/v1/quotes",
+            "http://127.0.0.1:8000/v1/quotes/async",
+        ]
+        body = json.dumps(
+            {
+                "starting_country": "China",
+                "destination_country": "USA",
+                "boxes": [
+                    {
+                        "count": 10,
+                        "weight_kg": 12,
+                        "length": 40,
+                        "width": 30,
+                        "height": 20,
+                    }
+                ]
+                * options["boxes"],
+            }
+        ).encode()
+        for url in urls:
+            self._load_test(url, body, options["requests"], options["concurrency"])
@@ -1,17 +1,19 @@
 from django.core.management.base import BaseCommand
-from quotes.models import Rate
+from django.db import transaction
+from quotes.models import Rate, RateCardVersion
 
 
 class Command(BaseCommand):
     help = "Populates the db with predefined data, no extra args needed"
 
-    def _populate_db(self):
+    def _populate_db(self, version: RateCardVersion):
         Rate.objects.create_with_weight_rates(
             starting_country="China",
             destination_country="USA",
             shipping_channel="air",
             shipping_time_range_min_days=15,
             shipping_time_range_max_days=20,
+            version=version,
             weight_rates=[
                 {"min_weight_kg": 0, "max_weight_kg": 20, "per_kg_rate": 5.00},
                 {"min_weight_kg": 20, "max_weight_kg": 40, "per_kg_rate": 4.50},
@@ -26,6 +28,7 @@ class Command(BaseCommand):
             shipping_channel="ocean",
             shipping_time_range_min_days=45,
             shipping_time_range_max_days=50,
+            version=version,
             weight_rates=[
                 {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate": 1.00}
             ],
@@ -37,6 +40,7 @@ class Command(BaseCommand):
             shipping_channel="air",
             shipping_time_range_min_days=10,
             shipping_time_range_max_days=15,
+            version=version,
             weight_rates=[
                 {"min_weight_kg": 0, "max_weight_kg": 10, "per_kg_rate": 10.00},
                 {"min_weight_kg": 10, "max_weight_kg": 20, "per_kg_rate": 9.50},
@@ -53,17 +57,19 @@ class Command(BaseCommand):
             shipping_channel="ocean",
             shipping_time_range_min_days=40,
             shipping_time_range_max_days=50,
+            version=version,
             weight_rates=[
                 {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate": 1.50}
             ],
         )
 
         Rate.objects.create_with_weight_rates(
-            starting_country="China",
+            starting_country="Vietnam",
             destination_country="USA",
             shipping_channel="air",
-            shipping_time_range_min_days=15,
-            shipping_time_range_max_days=20,
+            shipping_time_range_min_days=0,
+            shipping_time_range_max_days=100,
+            version=version,
             weight_rates=[
                 {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00},
                 {"min_weight_kg": 100, "max_weight_kg": 200, "per_kg_rate": 4.50},
@@ -73,4 +79,7 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        self._populate_db()
+        with transaction.atomic():
+            version = RateCardVersion.objects.create(name="predefined")
+            self._populate_db(version)
+        version.activate()
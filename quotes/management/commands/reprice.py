@@ -0,0 +1,49 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from quotes.repricing import REPRICE_CHUNK_SIZE, reprice_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprices a backlog of shipments against the active rate card. The "
+        "input is a JSONL file with one /v1/quotes request body per line, the "
+        'output gets one {"quotes": [...]} or {"errors": {...}} line per '
+        "shipment in the same order. Shipments are priced in parallel worker "
+        "processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--output", type=Path, required=True)
+        parser.add_argument(
+            "--workers", type=int, help="Worker processes, defaults to the CPU count"
+        )
+        parser.add_argument("--chunk-size", type=int, default=REPRICE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+
+        started = time.perf_counter()
+        priced = 0
+        with path.open() as shipments, options["output"].open("w") as output:
+            for result in reprice_lines(
+                shipments, options["workers"], options["chunk_size"]
+            ):
+                output.write(result + "\n")
+                priced += 1
+                if priced % 100_000 == 0:
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"{priced} shipments ({priced / elapsed:.0f} shipments/s)"
+                    )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Repriced {priced} shipments in {elapsed:.2f}s "
+                f"({priced / max(elapsed, 1e-9):.0f} shipments/s)"
+            )
+        )
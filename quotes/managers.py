@@ -1,5 +1,41 @@
-from django.db import models
+from collections import namedtuple
+from typing import Collection, Optional
+from django.db import connections, models, transaction
+from django.db.models import Exists, F, OuterRef
 from django.apps import apps
+from quotes.db.prepared import execute_prepared, supports_prepared_statements
+from quotes.money import to_cents
+
+RATE_LOOKUP_STATEMENT = "quotes_rate_lookup"
+LaneRate = namedtuple(
+    "LaneRate",
+    [
+        "shipping_channel",
+        "shipping_time_range_min_days",
+        "shipping_time_range_max_days",
+        "per_kg_rate_cents",
+    ],
+)
+
+
+def active_rate_card_version_ids():
+    # Subquery selecting the live rate card version, so filtering on it keeps
+    # lookups to a single statement.
+    active_rate_card_model = apps.get_model("quotes", "ActiveRateCard")
+    return active_rate_card_model.objects.values("version_id")
+
+
+class RateCardVersionManager(models.Manager):
+    def get_active(self):
+        return self.filter(pk__in=active_rate_card_version_ids()).first()
+
+    def get_or_create_active(self):
+        version = self.get_active()
+        if version is None:
+            with transaction.atomic(using=self.db):
+                version = self.create(name="default")
+                version.activate()
+        return version
 
 
 class RateManager(models.Manager):
@@ -11,27 +47,110 @@ class RateManager(models.Manager):
         shipping_time_range_min_days: int,
         shipping_time_range_max_days: int,
         weight_rates: list[dict[str, str]],
+        version=None,
     ):
+        # Rates go into the active rate card unless staged into another one.
+        if version is None:
+            version = apps.get_model(
+                "quotes", "RateCardVersion"
+            ).objects.get_or_create_active()
         rate = self.model(
+            version=version,
             starting_country=starting_country,
             destination_country=destination_country,
             shipping_channel=shipping_channel,
             shipping_time_range_min_days=shipping_time_range_min_days,
             shipping_time_range_max_days=shipping_time_range_max_days,
         )
-        rate.save()
 
         per_weight_rate_model = apps.get_model("quotes", "PerWeightRate")
 
-        per_weight_rate_model.objects.bulk_create(
-            [
-                per_weight_rate_model(
-                    min_weight_kg=weight_rate["min_weight_kg"],
-                    max_weight_kg=weight_rate["max_weight_kg"],
-                    per_kg_rate=weight_rate["per_kg_rate"],
-                    rate_id=rate.id,
-                )
-                for weight_rate in weight_rates
-            ]
-        )
+        # A single transaction so the rate index is only invalidated once the
+        # rate and all of its weight bands are visible together.
+        with transaction.atomic(using=self.db):
+            rate.save()
+            per_weight_rate_model.objects.bulk_create(
+                [
+                    per_weight_rate_model(
+                        min_weight_kg=weight_rate["min_weight_kg"],
+                        max_weight_kg=weight_rate["max_weight_kg"],
+                        per_kg_rate_cents=to_cents(weight_rate["per_kg_rate"]),
+                        rate_id=rate.id,
+                    )
+                    for weight_rate in weight_rates
+                ]
+            )
         return rate
+
+
+class PerWeightRateQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(rate__version__in=active_rate_card_version_ids())
+
+    def with_rate_details(self):
+        return self.annotate(
+            starting_country=F("rate__starting_country"),
+            destination_country=F("rate__destination_country"),
+            shipping_channel=F("rate__shipping_channel"),
+            shipping_time_range_min_days=F("rate__shipping_time_range_min_days"),
+            shipping_time_range_max_days=F("rate__shipping_time_range_max_days"),
+        )
+
+    def containing_weight(self, weight_kg: float):
+        return self.filter(min_weight_kg__lte=weight_kg, max_weight_kg__gte=weight_kg)
+
+    def for_lane_and_weight(
+        self,
+        starting_country: str,
+        destination_country: str,
+        weight_kg: float,
+        channels: Optional[Collection[str]] = None,
+    ):
+        # Like BandIndex, a weight on a shared boundary of two bands of a rate
+        # is priced by the band starting last.
+        later_band = self.model.objects.containing_weight(weight_kg).filter(
+            rate_id=OuterRef("rate_id"), min_weight_kg__gt=OuterRef("min_weight_kg")
+        )
+        queryset = self.active().filter(
+            rate__starting_country=starting_country,
+            rate__destination_country=destination_country,
+        )
+        if channels is not None:
+            queryset = queryset.filter(rate__shipping_channel__in=sorted(channels))
+        return (
+            queryset.containing_weight(weight_kg)
+            .filter(~Exists(later_band))
+            .with_rate_details()
+            .values_list(*LaneRate._fields, named=True)
+            .order_by("rate_id", "min_weight_kg")
+        )
+
+    def fetch_for_lane_and_weight(
+        self,
+        starting_country: str,
+        destination_country: str,
+        weight_kg: float,
+        channels: Optional[Collection[str]] = None,
+    ) -> list[LaneRate]:
+        # for_lane_and_weight evaluated as a server side prepared statement
+        # where the backend supports it: the statement is the same for every
+        # lane and weight, so it is planned once per database session.
+        if channels is not None and not channels:
+            return []
+        queryset = self.for_lane_and_weight(
+            starting_country, destination_country, weight_kg, channels
+        )
+        connection = connections[self.db]
+        if not supports_prepared_statements(connection):
+            return list(queryset)
+        # The channel filter adds one parameter per channel, so each number
+        # of channels gets a statement of its own.
+        name = RATE_LOOKUP_STATEMENT
+        if channels is not None:
+            name = f"{RATE_LOOKUP_STATEMENT}_{len(channels)}_channels"
+        return [
+            LaneRate._make(row) for row in execute_prepared(connection, name, queryset)
+        ]
+
+
+PerWeightRateManager = models.Manager.from_queryset(PerWeightRateQuerySet)
@@ -0,0 +1,99 @@
+import math
+import operator
+from array import array
+from typing import Iterable, Mapping
+from pydantic import BaseModel, GetCoreSchemaHandler
+from pydantic_core import core_schema
+from typing_extensions import TypedDict
+
+
+class BoxRow(TypedDict):
+    count: int
+    weight_kg: float
+    length: float
+    width: float
+    height: float
+
+
+class Manifest:
+    # Struct of arrays holding only what pricing reads: one C double per box
+    # line and column instead of a pydantic model per box line.
+    __slots__ = ("count", "weight_kg", "volume", "longest_dimension")
+
+    def __init__(self):
+        self.count = array("d")
+        self.weight_kg = array("d")
+        self.volume = array("d")
+        self.longest_dimension = array("d")
+
+    @staticmethod
+    def _row(box: Mapping[str, float]) -> tuple[float, float, float, float]:
+        length, width, height = box["length"], box["width"], box["height"]
+        return (
+            box["count"],
+            box["weight_kg"],
+            length * width * height,
+            max(length, width, height),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[float, float, float, float]]) -> "Manifest":
+        manifest = cls()
+        for count, weight_kg, volume, longest_dimension in rows:
+            manifest.count.append(count)
+            manifest.weight_kg.append(weight_kg)
+            manifest.volume.append(volume)
+            manifest.longest_dimension.append(longest_dimension)
+        return manifest
+
+    @classmethod
+    def from_dicts(cls, boxes: Iterable[Mapping[str, float]]) -> "Manifest":
+        return cls.from_rows(map(cls._row, boxes))
+
+    @classmethod
+    def _validate(cls, value, handler) -> "Manifest":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, list):
+            value = [
+                box.model_dump() if isinstance(box, BaseModel) else box for box in value
+            ]
+        return cls.from_dicts(handler(value))
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        # Box lines are validated as plain dicts, so errors keep the
+        # boxes.<index>.<field> locations of list[Box].
+        return core_schema.no_info_wrap_validator_function(
+            cls._validate, handler.generate_schema(list[BoxRow])
+        )
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    def sorted_rows_bytes(self) -> bytes:
+        # Same layout as BoxArrays.sorted_rows_bytes, so both representations
+        # of a shipment share a quote cache entry.
+        rows = sorted(
+            zip(self.count, self.weight_kg, self.volume, self.longest_dimension),
+            key=lambda row: row[::-1],
+        )
+        return b"".join(array("d", column).tobytes() for column in zip(*rows))
+
+    def gross_weight(self) -> float:
+        return math.fsum(map(operator.mul, self.count, self.weight_kg))
+
+    def volumetric_weight(self) -> float:
+        return math.fsum(map(operator.mul, self.count, self.volume)) / 6000
+
+    def count_overweight(self, limit_kg: float, inclusive: bool) -> int:
+        if inclusive:
+            return sum(1 for weight_kg in self.weight_kg if weight_kg >= limit_kg)
+        return sum(1 for weight_kg in self.weight_kg if weight_kg > limit_kg)
+
+    def count_oversized(self, limit: float, inclusive: bool = False) -> int:
+        if inclusive:
+            return sum(1 for longest in self.longest_dimension if longest >= limit)
+        return sum(1 for longest in self.longest_dimension if longest > limit)
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quotes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="perweightrate",
+            index=models.Index(
+                fields=["rate", "min_weight_kg", "max_weight_kg"],
+                name="quotes_pwr_rate_weight_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rate",
+            index=models.Index(
+                fields=["starting_country", "destination_country"],
+                name="quotes_rate_lane_idx",
+            ),
+        ),
+    ]
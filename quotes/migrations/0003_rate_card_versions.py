@@ -0,0 +1,79 @@
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def assign_rates_to_initial_version(apps, schema_editor):
+    RateCardVersion = apps.get_model("quotes", "RateCardVersion")
+    ActiveRateCard = apps.get_model("quotes", "ActiveRateCard")
+    Rate = apps.get_model("quotes", "Rate")
+
+    version = RateCardVersion.objects.create(
+        name="initial", activated_at=timezone.now()
+    )
+    Rate.objects.update(version=version)
+    ActiveRateCard.objects.create(id=1, version=version)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quotes", "0002_rate_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateCardVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("activated_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ActiveRateCard",
+            fields=[
+                (
+                    "id",
+                    models.PositiveSmallIntegerField(
+                        default=1, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="quotes.ratecardversion",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="activeratecard",
+            constraint=models.CheckConstraint(
+                check=models.Q(("id", 1)), name="quotes_single_active_rate_card"
+            ),
+        ),
+        migrations.AddField(
+            model_name="rate",
+            name="version",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rates",
+                to="quotes.ratecardversion",
+            ),
+        ),
+        migrations.RunPython(
+            assign_rates_to_initial_version, migrations.RunPython.noop
+        ),
+    ]
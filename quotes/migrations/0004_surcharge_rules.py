@@ -0,0 +1,72 @@
+from django.db import migrations, models
+
+# The surcharges quotes were priced with before rules were stored:
+# (kind, starting country, threshold, inclusive, fee)
+INITIAL_RULES = [
+    ("service", "", None, False, 0),
+    ("service", "China", None, False, 300),
+    ("overweight", "", 30, False, 80),
+    ("overweight", "India", 15, True, 80),
+    ("oversized", "", 120, False, 100),
+    ("oversized", "Vietnam", 70, False, 100),
+]
+
+
+def create_initial_rules(apps, schema_editor):
+    SurchargeRule = apps.get_model("quotes", "SurchargeRule")
+    SurchargeRule.objects.bulk_create(
+        SurchargeRule(
+            kind=kind,
+            starting_country=starting_country,
+            threshold=threshold,
+            inclusive=inclusive,
+            fee=fee,
+        )
+        for kind, starting_country, threshold, inclusive, fee in INITIAL_RULES
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quotes", "0003_rate_card_versions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SurchargeRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("service", "Service fee per shipment"),
+                            ("overweight", "Fee per overweight box"),
+                            ("oversized", "Fee per oversized box"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("starting_country", models.CharField(blank=True, max_length=255)),
+                ("threshold", models.FloatField(blank=True, null=True)),
+                ("inclusive", models.BooleanField(default=False)),
+                ("fee", models.FloatField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="surchargerule",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "starting_country"),
+                name="quotes_surcharge_rule_kind_country",
+            ),
+        ),
+        migrations.RunPython(create_initial_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+from django.db.models.functions import Round
+
+
+def amounts_to_cents(apps, schema_editor):
+    PerWeightRate = apps.get_model("quotes", "PerWeightRate")
+    SurchargeRule = apps.get_model("quotes", "SurchargeRule")
+    PerWeightRate.objects.update(per_kg_rate_cents=Round(F("per_kg_rate") * 100))
+    SurchargeRule.objects.update(fee_cents=Round(F("fee") * 100))
+
+
+def cents_to_amounts(apps, schema_editor):
+    PerWeightRate = apps.get_model("quotes", "PerWeightRate")
+    SurchargeRule = apps.get_model("quotes", "SurchargeRule")
+    PerWeightRate.objects.update(
+        per_kg_rate=ExpressionWrapper(
+            F("per_kg_rate_cents") / 100.0, output_field=models.FloatField()
+        )
+    )
+    SurchargeRule.objects.update(
+        fee=ExpressionWrapper(F("fee_cents") / 100.0, output_field=models.FloatField())
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quotes", "0004_surcharge_rules"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="perweightrate",
+            name="per_kg_rate_cents",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="surchargerule",
+            name="fee_cents",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        # Nullable while both columns exist, so migrating backwards can add
+        # the float columns back before filling them.
+        migrations.AlterField(
+            model_name="perweightrate",
+            name="per_kg_rate",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="surchargerule", name="fee", field=models.FloatField(null=True)
+        ),
+        migrations.RunPython(amounts_to_cents, cents_to_amounts),
+        migrations.RemoveField(model_name="perweightrate", name="per_kg_rate"),
+        migrations.RemoveField(model_name="surchargerule", name="fee"),
+    ]
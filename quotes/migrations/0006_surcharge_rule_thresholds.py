@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+# The default rules seeded by 0004: (kind, threshold, inclusive, fee in cents)
+DEFAULT_RULES = [
+    ("service", None, False, 0),
+    ("overweight", 30, False, 8000),
+    ("oversized", 120, False, 10000),
+]
+
+
+def fix_surcharge_rules(apps, schema_editor):
+    # Restores deleted default rules and gives overweight and oversized rules
+    # without a threshold the threshold of their kind's default rule, so the
+    # constraint below holds.
+    SurchargeRule = apps.get_model("quotes", "SurchargeRule")
+    for kind, threshold, inclusive, fee_cents in DEFAULT_RULES:
+        default, _ = SurchargeRule.objects.get_or_create(
+            kind=kind,
+            starting_country="",
+            defaults={
+                "threshold": threshold,
+                "inclusive": inclusive,
+                "fee_cents": fee_cents,
+            },
+        )
+        if threshold is not None:
+            if default.threshold is None:
+                default.threshold = threshold
+                default.save(update_fields=["threshold"])
+            SurchargeRule.objects.filter(kind=kind, threshold__isnull=True).update(
+                threshold=default.threshold
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quotes", "0005_prices_in_cents"),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_surcharge_rules, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="surchargerule",
+            constraint=models.CheckConstraint(
+                check=models.Q(("kind", "service"), ("threshold__isnull", False), _connector="OR"),
+                name="quotes_surcharge_rule_threshold",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quotes", "0006_surcharge_rule_thresholds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activeratecard",
+            name="revision",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.3 on 2026-10-18 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Separate from 0003, which assigns existing rates a version, so the
+    # ALTER TABLE runs in its own transaction rather than after the UPDATE.
+    dependencies = [
+        ("quotes", "0007_rate_table_revision"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="rate",
+            name="version",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rates",
+                to="quotes.ratecardversion",
+            ),
+        ),
+    ]
@@ -1,8 +1,55 @@
+from django.core.exceptions import ValidationError
 from django.db import models
-from quotes.managers import RateManager
+from django.utils import timezone
+from quotes.managers import (
+    PerWeightRateManager,
+    RateCardVersionManager,
+    RateManager,
+)
+
+
+class RateCardVersion(models.Model):
+    name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    objects = RateCardVersionManager()
+
+    def activate(self):
+        self.activated_at = timezone.now()
+        self.save(update_fields=["activated_at"])
+        ActiveRateCard.objects.update_or_create(
+            pk=ActiveRateCard.SINGLETON_ID, defaults={"version": self}
+        )
+
+
+class ActiveRateCard(models.Model):
+    # Single row pointing at the rate card version quotes are served from, so
+    # switching to a new card is one row update.
+    SINGLETON_ID = 1
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=SINGLETON_ID)
+    version = models.ForeignKey(
+        RateCardVersion, on_delete=models.PROTECT, related_name="+"
+    )
+    # Counts changes to anything quotes are priced from, in the transaction
+    # making them, so a replica that has a revision has every change up to it.
+    revision = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(id=1), name="quotes_single_active_rate_card"
+            ),
+        ]
 
 
 class Rate(models.Model):
+    version = models.ForeignKey(
+        RateCardVersion,
+        on_delete=models.CASCADE,
+        related_name="rates",
+    )
     starting_country = models.CharField(max_length=255)
     destination_country = models.CharField(max_length=255)
     shipping_channel = models.CharField(max_length=255)
@@ -11,9 +58,66 @@ class Rate(models.Model):
 
     objects = RateManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["starting_country", "destination_country"],
+                name="quotes_rate_lane_idx",
+            ),
+        ]
+
 
 class PerWeightRate(models.Model):
     min_weight_kg = models.FloatField()
     max_weight_kg = models.FloatField()
-    per_kg_rate = models.FloatField()
+    per_kg_rate_cents = models.IntegerField()
     rate = models.ForeignKey(Rate, on_delete=models.CASCADE, related_name="rates")
+
+    objects = PerWeightRateManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["rate", "min_weight_kg", "max_weight_kg"],
+                name="quotes_pwr_rate_weight_idx",
+            ),
+        ]
+
+
+class SurchargeRule(models.Model):
+    class Kind(models.TextChoices):
+        SERVICE = "service", "Service fee per shipment"
+        OVERWEIGHT = "overweight", "Fee per overweight box"
+        OVERSIZED = "oversized", "Fee per oversized box"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    # Blank for the rule applying to starting countries without their own.
+    starting_country = models.CharField(max_length=255, blank=True)
+    # Box weight in kg or longest dimension in cm over which the fee applies,
+    # unused for service fees.
+    threshold = models.FloatField(null=True, blank=True)
+    # Whether a box exactly at the threshold is charged.
+    inclusive = models.BooleanField(default=False)
+    fee_cents = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "starting_country"],
+                name="quotes_surcharge_rule_kind_country",
+            ),
+            models.CheckConstraint(
+                check=models.Q(kind="service") | models.Q(threshold__isnull=False),
+                name="quotes_surcharge_rule_threshold",
+            ),
+        ]
+
+    @property
+    def is_default(self) -> bool:
+        return not self.starting_country
+
+    def clean(self):
+        if self.kind != self.Kind.SERVICE and self.threshold is None:
+            raise ValidationError(
+                {"threshold": "Overweight and oversized fees need a threshold."}
+            )
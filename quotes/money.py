@@ -0,0 +1,33 @@
+import math
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+# Prices are integer minor units (cents) everywhere but at the edges: rate
+# card files and API responses use currency amounts.
+CENTS_PER_UNIT = 100
+
+
+def to_cents(amount, exact: bool = False) -> int:
+    # Converts the decimal value as written, e.g. 10.2 or "10.2", rather than
+    # its binary float approximation 10.199999..., rounding half up. With
+    # exact, amounts with fractions of a cent are rejected instead.
+    try:
+        value = Decimal(str(amount))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {amount!r}")
+    cents = (value * CENTS_PER_UNIT).quantize(Decimal(1), ROUND_HALF_UP)
+    if exact and cents != value * CENTS_PER_UNIT:
+        raise ValueError(f"Amount has fractions of a cent: {amount!r}")
+    return int(cents)
+
+
+def to_amount(cents: int) -> float:
+    # Exact to the cent: the closest float to e.g. 1234.56 is what a division
+    # of the integer 123456 gives.
+    return cents / CENTS_PER_UNIT
+
+
+def round_cents(cents: float) -> int:
+    # Half up, like to_cents, for products of a weight and a per kg rate.
+    return math.floor(cents + 0.5)
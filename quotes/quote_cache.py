@@ -0,0 +1,147 @@
+import hashlib
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from quotes.box_arrays import BoxArrays
+from quotes.instrumentation import stage
+from quotes.manifest import Manifest
+from quotes.streaming import BoxAggregates
+from quotes.rate_index import aget_rate_table_version, get_rate_table_version
+
+QUOTE_CACHE_KEY_PREFIX = "quotes:quote"
+
+
+def get_shipment_fingerprint(
+    starting_country: str, destination_country: str, boxes
+) -> str:
+    # Pricing only depends on count, weight, volume and longest dimension, so
+    # box lines are normalized to those and sorted: manifests listing the same
+    # boxes in another order or with rotated dimensions share a fingerprint.
+    fingerprint = hashlib.sha256()
+    fingerprint.update(f"{starting_country}\0{destination_country}\0".encode())
+    if isinstance(boxes, (Manifest, BoxArrays)):
+        fingerprint.update(boxes.sorted_rows_bytes())
+    elif isinstance(boxes, BoxAggregates):
+        fingerprint.update(boxes.aggregate_bytes())
+    else:
+        fingerprint.update(
+            repr(
+                sorted(
+                    (box.count, box.weight_kg, box.volume, box.longest_dimension)
+                    for box in boxes
+                )
+            ).encode()
+        )
+    return fingerprint.hexdigest()
+
+
+class QuoteCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[settings.QUOTES_CACHE_ALIAS]
+
+    def _make_key(
+        self, version, starting_country, destination_country, boxes, selection=None
+    ):
+        # The rate table version is part of the key, so any rate change makes
+        # every previously cached quote unreachable without an explicit purge.
+        # Selected quotes are cached apart from the shipment's full list,
+        # under a digest of the selection.
+        if version is None:
+            return None
+        parts = [
+            QUOTE_CACHE_KEY_PREFIX,
+            str(version),
+            get_shipment_fingerprint(starting_country, destination_country, boxes),
+        ]
+        if selection is not None:
+            parts.append(hashlib.sha256(selection.cache_key().encode()).hexdigest())
+        return ":".join(parts)
+
+    def get_key(
+        self, starting_country: str, destination_country: str, boxes, selection=None
+    ):
+        return self._make_key(
+            get_rate_table_version(),
+            starting_country,
+            destination_country,
+            boxes,
+            selection,
+        )
+
+    async def aget_key(
+        self, starting_country: str, destination_country: str, boxes, selection=None
+    ):
+        return self._make_key(
+            await aget_rate_table_version(),
+            starting_country,
+            destination_country,
+            boxes,
+            selection,
+        )
+
+    def _record(self, quotes):
+        with self._lock:
+            if quotes is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def get_or_calculate(
+        self,
+        starting_country: str,
+        destination_country: str,
+        boxes,
+        calculate,
+        selection=None,
+    ):
+        with stage("cache"):
+            key = self.get_key(starting_country, destination_country, boxes, selection)
+            quotes = None if key is None else self.backend.get(key)
+        self._record(quotes)
+        if quotes is None:
+            quotes = calculate(starting_country, destination_country, boxes, selection)
+            if key is not None:
+                with stage("cache"):
+                    self.backend.set(key, quotes)
+        return quotes
+
+    async def aget_or_calculate(
+        self,
+        starting_country: str,
+        destination_country: str,
+        boxes,
+        acalculate,
+        selection=None,
+    ):
+        with stage("cache"):
+            key = await self.aget_key(
+                starting_country, destination_country, boxes, selection
+            )
+            quotes = None if key is None else await self.backend.aget(key)
+        self._record(quotes)
+        if quotes is None:
+            quotes = await acalculate(
+                starting_country, destination_country, boxes, selection
+            )
+            if key is not None:
+                with stage("cache"):
+                    await self.backend.aset(key, quotes)
+        return quotes
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+quote_cache = QuoteCache()
@@ -0,0 +1,260 @@
+import threading
+from typing import Collection, Iterable, NamedTuple, Optional
+from django.db.models import Q
+from quotes.bands import BandIndex
+from quotes.models import PerWeightRate
+from quotes.routers import aget_primary_revision, get_primary_revision, quote_reads
+
+
+class WeightBand(NamedTuple):
+    min_weight_kg: float
+    max_weight_kg: float
+    per_kg_rate_cents: int
+
+
+class RateMatch(NamedTuple):
+    shipping_channel: str
+    shipping_time_range_min_days: int
+    shipping_time_range_max_days: int
+    per_kg_rate_cents: int
+
+
+class RateEntry:
+    __slots__ = (
+        "shipping_channel",
+        "shipping_time_range_min_days",
+        "shipping_time_range_max_days",
+        "bands",
+    )
+
+    def __init__(
+        self,
+        shipping_channel: str,
+        shipping_time_range_min_days: int,
+        shipping_time_range_max_days: int,
+        bands: Iterable[WeightBand],
+    ):
+        self.shipping_channel = shipping_channel
+        self.shipping_time_range_min_days = shipping_time_range_min_days
+        self.shipping_time_range_max_days = shipping_time_range_max_days
+        self.bands = BandIndex(bands)
+
+    def band_for_weight(self, weight: float) -> Optional[WeightBand]:
+        position = self.bands.find(weight)
+        if position < 0:
+            return None
+        return WeightBand(
+            self.bands.min_weights[position],
+            self.bands.max_weights[position],
+            self.bands.per_kg_rates_cents[position],
+        )
+
+    def match(self, position: int) -> RateMatch:
+        return RateMatch(
+            self.shipping_channel,
+            self.shipping_time_range_min_days,
+            self.shipping_time_range_max_days,
+            self.bands.per_kg_rates_cents[position],
+        )
+
+
+class RateIndex:
+    def __init__(
+        self,
+        version,
+        lanes: dict[tuple[str, str], list[RateEntry]],
+        rate_card_version_id: Optional[int] = None,
+    ):
+        self.version = version
+        self.lanes = lanes
+        self.rate_card_version_id = rate_card_version_id
+
+    @staticmethod
+    def _get_rows(
+        lanes: Optional[Iterable[tuple[str, str]]] = None,
+        starting_countries: Optional[Iterable[str]] = None,
+        destination_countries: Optional[Iterable[str]] = None,
+    ):
+        queryset = PerWeightRate.objects.active()
+        if starting_countries is not None:
+            queryset = queryset.filter(rate__starting_country__in=starting_countries)
+        if destination_countries is not None:
+            queryset = queryset.filter(
+                rate__destination_country__in=destination_countries
+            )
+        if lanes is not None:
+            lane_filter = Q(pk__in=[])
+            for starting_country, destination_country in lanes:
+                lane_filter |= Q(
+                    rate__starting_country=starting_country,
+                    rate__destination_country=destination_country,
+                )
+            queryset = queryset.filter(lane_filter)
+        return (
+            queryset.with_rate_details()
+            .values_list(
+                "rate__version_id",
+                "rate_id",
+                "starting_country",
+                "destination_country",
+                "shipping_channel",
+                "shipping_time_range_min_days",
+                "shipping_time_range_max_days",
+                "min_weight_kg",
+                "max_weight_kg",
+                "per_kg_rate_cents",
+            )
+            .order_by("rate_id")
+        )
+
+    @classmethod
+    def from_rows(cls, version, rows) -> "RateIndex":
+        rates: dict[int, tuple] = {}
+        rate_card_version_id = None
+        for (
+            rate_card_version_id,
+            rate_id,
+            starting_country,
+            destination_country,
+            shipping_channel,
+            min_days,
+            max_days,
+            min_weight_kg,
+            max_weight_kg,
+            per_kg_rate_cents,
+        ) in rows:
+            if rate_id not in rates:
+                rates[rate_id] = (
+                    (starting_country, destination_country),
+                    (shipping_channel, min_days, max_days),
+                    [],
+                )
+            rates[rate_id][2].append(
+                WeightBand(min_weight_kg, max_weight_kg, per_kg_rate_cents)
+            )
+
+        lanes: dict[tuple[str, str], list[RateEntry]] = {}
+        for lane, (shipping_channel, min_days, max_days), bands in rates.values():
+            lanes.setdefault(lane, []).append(
+                RateEntry(shipping_channel, min_days, max_days, bands)
+            )
+        return cls(version, lanes, rate_card_version_id)
+
+    @classmethod
+    def load(
+        cls,
+        version,
+        lanes: Optional[Iterable[tuple[str, str]]] = None,
+        starting_countries: Optional[Iterable[str]] = None,
+        destination_countries: Optional[Iterable[str]] = None,
+    ) -> "RateIndex":
+        with quote_reads():
+            return cls.from_rows(
+                version,
+                cls._get_rows(lanes, starting_countries, destination_countries),
+            )
+
+    @classmethod
+    async def aload(
+        cls, version, lanes: Optional[Iterable[tuple[str, str]]] = None
+    ) -> "RateIndex":
+        with quote_reads():
+            rows = [row async for row in cls._get_rows(lanes)]
+        return cls.from_rows(version, rows)
+
+    def filter_lanes(
+        self,
+        starting_countries: Optional[Iterable[str]] = None,
+        destination_countries: Optional[Iterable[str]] = None,
+    ) -> list[tuple[str, str]]:
+        starting_countries = (
+            None if starting_countries is None else set(starting_countries)
+        )
+        destination_countries = (
+            None if destination_countries is None else set(destination_countries)
+        )
+        return sorted(
+            (starting_country, destination_country)
+            for starting_country, destination_country in self.lanes
+            if (starting_countries is None or starting_country in starting_countries)
+            and (
+                destination_countries is None
+                or destination_country in destination_countries
+            )
+        )
+
+    def rates_for_weight(
+        self,
+        starting_country: str,
+        destination_country: str,
+        weight: float,
+        channels: Optional[Collection[str]] = None,
+    ) -> list[RateMatch]:
+        matches = []
+        for entry in self.lanes.get((starting_country, destination_country), ()):
+            if channels is not None and entry.shipping_channel not in channels:
+                continue
+            position = entry.bands.find(weight)
+            if position >= 0:
+                matches.append(entry.match(position))
+        return matches
+
+    def rates_for_weights(
+        self, starting_country: str, destination_country: str, weights: list[float]
+    ) -> list[list[RateMatch]]:
+        # rates_for_weight for many weights of one lane, looking the lane up
+        # once and each rate's bands once per weight.
+        matches: list[list[RateMatch]] = [[] for _ in weights]
+        for entry in self.lanes.get((starting_country, destination_country), ()):
+            for weight_matches, position in zip(
+                matches, entry.bands.find_many(weights)
+            ):
+                if position >= 0:
+                    weight_matches.append(entry.match(position))
+        return matches
+
+
+_rate_index: Optional[RateIndex] = None
+_rate_index_lock = threading.Lock()
+
+
+def get_rate_table_version():
+    # The primary's revision, bumped in the same transaction as every change
+    # to rates, rate cards and surcharge rules, so every process sees a change
+    # once it has committed.
+    return get_primary_revision()
+
+
+async def aget_rate_table_version():
+    return await aget_primary_revision()
+
+
+def get_rate_index() -> RateIndex:
+    global _rate_index
+    version = get_rate_table_version()
+    index = _rate_index
+    if index is None or version is None or index.version != version:
+        with _rate_index_lock:
+            index = _rate_index
+            if index is None or version is None or index.version != version:
+                index = RateIndex.load(version)
+                _rate_index = index
+    return index
+
+
+async def aget_rate_index() -> RateIndex:
+    global _rate_index
+    version = await aget_rate_table_version()
+    index = _rate_index
+    if index is None or version is None or index.version != version:
+        # No lock here: concurrent coroutines may both rebuild a stale index,
+        # which is wasted work but swaps in an equivalent index either way.
+        index = await RateIndex.aload(version)
+        _rate_index = index
+    return index
+
+
+def reset_rate_index():
+    global _rate_index
+    with _rate_index_lock:
+        _rate_index = None
@@ -0,0 +1,100 @@
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+from django.conf import settings
+from pydantic import ValidationError
+from quotes.rate_index import RateIndex, get_rate_index
+from quotes.repricing_worker import init_worker, reprice_chunk
+from quotes.surcharges import SurchargeRules, get_surcharge_rules
+from quotes.utils import (
+    QuoteCalculationService,
+    Shipment,
+    ShippingQuotesResponse,
+    get_validation_error_detail,
+)
+
+REPRICE_CHUNK_SIZE = 1000
+
+
+def price_lines(
+    lines: list[str], rate_index: RateIndex, surcharge_rules: SurchargeRules
+) -> list[str]:
+    results: list[Optional[str]] = []
+    shipments = []
+    for line in lines:
+        try:
+            shipments.append(Shipment.model_validate_json(line))
+            results.append(None)
+        except ValidationError as error:
+            results.append(
+                json.dumps({"errors": get_validation_error_detail(error.errors())})
+            )
+
+    batch_quotes = iter(
+        QuoteCalculationService.calculate_batch_quotes(
+            shipments, rate_index, surcharge_rules
+        )
+    )
+    return [
+        result
+        if result is not None
+        else ShippingQuotesResponse(quotes=next(batch_quotes)).model_dump_json()
+        for result in results
+    ]
+
+
+def _chunked(lines: Iterable[str], chunk_size: int) -> Iterator[list[str]]:
+    lines = (line for line in lines if line.strip())
+    while chunk := list(itertools.islice(lines, chunk_size)):
+        yield chunk
+
+
+def get_rate_index_snapshot() -> RateIndex:
+    if settings.QUOTES_RATE_INDEX_ENABLED:
+        return get_rate_index()
+    return RateIndex.load(None)
+
+
+def reprice_lines(
+    lines: Iterable[str],
+    workers: Optional[int] = None,
+    chunk_size: int = REPRICE_CHUNK_SIZE,
+    start_method: Optional[str] = None,
+) -> Iterator[str]:
+    # Prices shipments given as JSON lines in the /v1/quotes request format
+    # and yields one {"quotes": [...]} or {"errors": {...}} JSON line per
+    # shipment, in input order. Chunks of lines are priced in worker
+    # processes, each holding its own copy of the current rate index and
+    # surcharge rules, so pricing is not serialized by the GIL. Workers are
+    # started with the platform's default start method unless given one.
+    rate_index = get_rate_index_snapshot()
+    surcharge_rules = get_surcharge_rules()
+    chunks = _chunked(lines, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield from price_lines(chunk, rate_index, surcharge_rules)
+        return
+
+    # Workers only price against the snapshot and never use the database
+    # connections a forked worker inherits.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=init_worker,
+        initargs=(pickle.dumps((rate_index, surcharge_rules)),),
+    ) as executor:
+        # Keep a couple of chunks in flight per worker: enough to keep them
+        # busy without reading the whole input into memory.
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(reprice_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,31 @@
+import os
+import pickle
+
+# Entry points of reprice worker processes. A spawned worker starts from a
+# fresh interpreter and imports this module before Django is set up, so it
+# must not import models, directly or through other quotes modules, at the
+# top level.
+
+# Rate index and surcharge rules snapshot of the worker, set once by
+# init_worker.
+_snapshot = None
+
+
+def init_worker(snapshot: bytes):
+    global _snapshot
+    # Workers only price against the snapshot, so they skip the warm-up and
+    # the database reads it makes.
+    os.environ["QUOTES_WARM_UP"] = "0"
+    import django
+
+    # Sets up a spawned worker, a no-op in forked ones. The snapshot is only
+    # unpickled afterwards since that imports the rate index and surcharges.
+    django.setup()
+    _snapshot = pickle.loads(snapshot)
+
+
+def reprice_chunk(lines: list[str]) -> list[str]:
+    from quotes.repricing import price_lines
+
+    rate_index, surcharge_rules = _snapshot
+    return price_lines(lines, rate_index, surcharge_rules)
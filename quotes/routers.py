@@ -0,0 +1,171 @@
+import contextlib
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Optional
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+# Seconds a replica that is unreachable or behind the primary's revision is
+# left out before it is checked again.
+REPLICA_RETRY_AFTER = 5
+# Weight of the latest query in a replica's running latency average.
+LATENCY_SMOOTHING = 0.2
+
+_quote_reads: ContextVar[bool] = ContextVar("quote_reads", default=False)
+# (revision, monotonic time it expires at) of the primary's last read revision
+_primary_revision: Optional[tuple[int, float]] = None
+
+
+@contextlib.contextmanager
+def quote_reads():
+    # Reads made inside go to a quote replica when one is configured and has
+    # caught up with the primary's revision, and to the primary otherwise.
+    token = _quote_reads.set(True)
+    try:
+        yield
+    finally:
+        _quote_reads.reset(token)
+
+
+def get_revision(alias: str) -> Optional[int]:
+    return (
+        apps.get_model("quotes", "ActiveRateCard")
+        .objects.using(alias)
+        .values_list("revision", flat=True)
+        .first()
+    )
+
+
+def get_primary_revision() -> Optional[int]:
+    # Read from the primary at most once every QUOTES_RATE_TABLE_REVISION_TTL
+    # seconds, and again as soon as this process commits a change, so changes
+    # committed by other processes are picked up within the TTL whatever cache
+    # backend is configured.
+    global _primary_revision
+    cached = _primary_revision
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
+    revision = get_revision(DEFAULT_DB_ALIAS)
+    _cache_primary_revision(revision)
+    return revision
+
+
+async def aget_primary_revision() -> Optional[int]:
+    global _primary_revision
+    cached = _primary_revision
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
+    revision = (
+        await apps.get_model("quotes", "ActiveRateCard")
+        .objects.using(DEFAULT_DB_ALIAS)
+        .values_list("revision", flat=True)
+        .afirst()
+    )
+    _cache_primary_revision(revision)
+    return revision
+
+
+def _cache_primary_revision(revision: Optional[int]):
+    global _primary_revision
+    if revision is not None:
+        _primary_revision = (
+            revision,
+            time.monotonic() + settings.QUOTES_RATE_TABLE_REVISION_TTL,
+        )
+
+
+def expire_primary_revision():
+    global _primary_revision
+    _primary_revision = None
+
+
+class ReplicaPool:
+    def __init__(self):
+        self._counter = itertools.count()
+        self._latency: dict[str, float] = {}
+        # alias -> revision the replica was last seen at
+        self._current: dict[str, int] = {}
+        self._skip_until: dict[str, float] = {}
+
+    def reset(self):
+        self.__init__()
+
+    def record_latency(self, alias: str, seconds: float):
+        previous = self._latency.get(alias)
+        self._latency[alias] = (
+            seconds
+            if previous is None
+            else previous + LATENCY_SMOOTHING * (seconds - previous)
+        )
+
+    def _candidates(self, aliases: list[str], selection: str) -> list[str]:
+        if selection == "least_latency":
+            # Replicas without a measurement yet go first, so all get one.
+            return sorted(aliases, key=lambda alias: self._latency.get(alias, 0.0))
+        start = next(self._counter) % len(aliases)
+        return aliases[start:] + aliases[:start]
+
+    def is_current(self, alias: str, revision: int) -> bool:
+        # Replicas never go back in time, so one seen at or past the primary's
+        # revision is only checked again once the primary moves past it.
+        if self._current.get(alias, -1) >= revision:
+            return True
+        if time.monotonic() < self._skip_until.get(alias, 0):
+            return False
+        try:
+            replica_revision = get_revision(alias)
+        except DatabaseError:
+            replica_revision = None
+        if replica_revision is None or replica_revision < revision:
+            self._skip_until[alias] = time.monotonic() + REPLICA_RETRY_AFTER
+            return False
+        self._current[alias] = replica_revision
+        return True
+
+    def choose(self) -> Optional[str]:
+        aliases = list(settings.QUOTES_REPLICA_DATABASES)
+        if not aliases:
+            return None
+        revision = get_primary_revision()
+        if revision is None:
+            return None
+        for alias in self._candidates(aliases, settings.QUOTES_REPLICA_SELECTION):
+            if self.is_current(alias, revision):
+                return alias
+        return None
+
+
+replica_pool = ReplicaPool()
+
+
+def record_replica_latency(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        replica_pool.record_latency(
+            context["connection"].alias, time.perf_counter() - started
+        )
+
+
+class QuoteReplicaRouter:
+    # Quote reads made inside quote_reads() go to a replica from
+    # QUOTES_REPLICA_DATABASES. Everything else, writes and the reads of
+    # imports and the admin included, stays on the primary.
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "quotes" and _quote_reads.get():
+            return replica_pool.choose()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return False if db in settings.QUOTES_REPLICA_DATABASES else None
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 
 
@@ -15,6 +16,14 @@ class ShippingQuotesRequestSerializer(serializers.Serializer):
     boxes = BoxSerializer(many=True)
 
 
+class ShippingQuotesBatchRequestSerializer(serializers.Serializer):
+    shipments = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.QUOTES_BATCH_MAX_SHIPMENTS,
+    )
+
+
 class CostBreakdownSerializer(serializers.Serializer):
     shipping_cost = serializers.FloatField()
     service_fee = serializers.FloatField()
@@ -0,0 +1,131 @@
+from typing import Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from quotes.instrumentation import record_query
+from quotes.models import ActiveRateCard, PerWeightRate, Rate, SurchargeRule
+from quotes.routers import expire_primary_revision, record_replica_latency
+
+
+class _RateTableTransaction:
+    # What the rate table signals of one transaction have looked up,
+    # registered to run when it commits. Django drops it with the other
+    # on_commit callbacks if the transaction, or the savepoint it was
+    # registered in, rolls back.
+    def __init__(self):
+        self.pending = True
+        self.active_version_id: Optional[int] = None
+        # rate id -> rate card version id
+        self.rate_versions: dict[int, Optional[int]] = {}
+
+    def __call__(self):
+        self.pending = False
+
+
+class _RevisionBump:
+    # Registered on commit in the same savepoint as the revision UPDATE, so
+    # the two are rolled back together and a pending one means the revision
+    # has been bumped by this transaction.
+    def __init__(self):
+        self.pending = True
+
+    def __call__(self):
+        self.pending = False
+        expire_primary_revision()
+
+
+def _pending(using: str, callback_type):
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        # Every statement commits on its own.
+        return None
+    for callback in connection.run_on_commit:
+        if isinstance(callback[1], callback_type) and callback[1].pending:
+            return callback[1]
+    return None
+
+
+def _get_rate_table_transaction(using: str) -> _RateTableTransaction:
+    rate_table_transaction = _pending(using, _RateTableTransaction)
+    if rate_table_transaction is None:
+        rate_table_transaction = _RateTableTransaction()
+        transaction.on_commit(rate_table_transaction, using=using)
+    return rate_table_transaction
+
+
+def _is_active(
+    rate_table_transaction: _RateTableTransaction,
+    using: str,
+    rate_id: int,
+    version_id: Optional[int] = None,
+) -> bool:
+    # Whether a rate is on the active rate card, taking it to be when its
+    # card cannot be looked up.
+    if rate_table_transaction.active_version_id is None:
+        rate_table_transaction.active_version_id = (
+            ActiveRateCard.objects.using(using)
+            .values_list("version_id", flat=True)
+            .first()
+        )
+    if version_id is not None:
+        rate_table_transaction.rate_versions[rate_id] = version_id
+    elif rate_id not in rate_table_transaction.rate_versions:
+        rate_table_transaction.rate_versions[rate_id] = (
+            Rate.objects.using(using)
+            .filter(pk=rate_id)
+            .values_list("version_id", flat=True)
+            .first()
+        )
+    version_id = rate_table_transaction.rate_versions[rate_id]
+    return version_id is None or version_id == rate_table_transaction.active_version_id
+
+
+@receiver([post_save, post_delete], sender=ActiveRateCard)
+@receiver([post_save, post_delete], sender=Rate)
+@receiver([post_save, post_delete], sender=PerWeightRate)
+@receiver([post_save, post_delete], sender=SurchargeRule)
+def invalidate_rate_index(sender, instance, using, created=True, **kwargs):
+    # The revision is bumped once per transaction: it only has to change
+    # before the transaction commits, and each bump holds the row lock
+    # until then.
+    if _pending(using, _RevisionBump) is not None:
+        return
+    rate_table_transaction = _get_rate_table_transaction(using)
+    if sender is ActiveRateCard:
+        rate_table_transaction.active_version_id = None
+    # Rows added to or deleted from a staged rate card, e.g. by deleting a
+    # card that was never activated, do not change quotes (post_delete has
+    # no created argument). Edits always bump, since they may move a row
+    # off the active card.
+    elif sender in (Rate, PerWeightRate) and created:
+        if sender is Rate:
+            rate_id, version_id = instance.pk, instance.version_id
+        else:
+            rate_id, version_id = instance.rate_id, None
+        if not _is_active(rate_table_transaction, using, rate_id, version_id):
+            return
+    # update() sends no post_save, so bumping the revision does not recurse.
+    # Other processes pick the new revision up when they next read it, this
+    # one straight after the commit.
+    ActiveRateCard.objects.using(using).filter(pk=ActiveRateCard.SINGLETON_ID).update(
+        revision=F("revision") + 1
+    )
+    transaction.on_commit(_RevisionBump(), using=using)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_replica_latency_recorder(sender, connection, **kwargs):
+    if (
+        connection.alias in settings.QUOTES_REPLICA_DATABASES
+        and record_replica_latency not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(record_replica_latency)
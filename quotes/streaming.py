@@ -0,0 +1,372 @@
+import codecs
+import csv
+import json
+import math
+import re
+from typing import Iterable, Iterator, Mapping, Optional
+from pydantic import TypeAdapter, ValidationError
+from quotes.box_arrays import BOX_FIELDS
+from quotes.manifest import BoxRow
+
+STREAM_CHUNK_SIZE = 64 * 1024
+CSV_MEDIA_TYPE = "text/csv"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# media type -> format name used in errors
+BOX_LINE_MEDIA_TYPES = {CSV_MEDIA_TYPE: "CSV", NDJSON_MEDIA_TYPE: "NDJSON"}
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+_box_row_adapter = TypeAdapter(BoxRow)
+
+
+class ManifestStreamError(ValueError):
+    pass
+
+
+class _ExactSum:
+    # Running sum rounded only once, when read, like math.fsum over every
+    # value added: partials are non-overlapping floats adding up to the
+    # exact sum (Shewchuk's algorithm).
+    __slots__ = ("partials",)
+
+    def __init__(self):
+        self.partials: list[float] = []
+
+    def add(self, value: float):
+        partials = self.partials
+        i = 0
+        for partial in partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                partials[i] = low
+                i += 1
+            value = high
+        partials[i:] = [value]
+
+    def __float__(self) -> float:
+        return math.fsum(self.partials)
+
+
+class BoxAggregates:
+    # Running totals of a manifest whose box lines are not kept. The
+    # starting country may come after the boxes, so a counter is kept for
+    # every surcharge limit that could apply.
+    __slots__ = (
+        "boxes",
+        "_gross_weight",
+        "_volumetric_weight",
+        "_overweight",
+        "_oversized",
+    )
+
+    def __init__(
+        self,
+        overweight_limits: Iterable[tuple[float, bool]],
+        oversize_limits: Iterable[tuple[float, bool]],
+    ):
+        self.boxes = 0
+        # Summed exactly, so the totals match those of box lines, manifests
+        # and box arrays to the last bit.
+        self._gross_weight = _ExactSum()
+        self._volumetric_weight = _ExactSum()
+        self._overweight = dict.fromkeys(overweight_limits, 0)
+        self._oversized = dict.fromkeys(oversize_limits, 0)
+
+    def add(self, box: Mapping[str, float]):
+        length, width, height = box["length"], box["width"], box["height"]
+        self.add_row(
+            box["count"],
+            box["weight_kg"],
+            length * width * height,
+            max(length, width, height),
+        )
+
+    def add_row(
+        self, count: float, weight_kg: float, volume: float, longest_dimension: float
+    ):
+        self.boxes += 1
+        self._gross_weight.add(count * weight_kg)
+        self._volumetric_weight.add(count * volume)
+        for limit_kg, inclusive in self._overweight:
+            if weight_kg >= limit_kg if inclusive else weight_kg > limit_kg:
+                self._overweight[limit_kg, inclusive] += 1
+        for limit, inclusive in self._oversized:
+            if longest_dimension >= limit if inclusive else longest_dimension > limit:
+                self._oversized[limit, inclusive] += 1
+
+    def __len__(self) -> int:
+        return self.boxes
+
+    def gross_weight(self) -> float:
+        return float(self._gross_weight)
+
+    def volumetric_weight(self) -> float:
+        return float(self._volumetric_weight) / 6000
+
+    def count_overweight(self, limit_kg: float, inclusive: bool) -> int:
+        return self._overweight[limit_kg, inclusive]
+
+    def count_oversized(self, limit: float, inclusive: bool = False) -> int:
+        return self._oversized[limit, inclusive]
+
+    def aggregate_bytes(self) -> bytes:
+        # Quotes only depend on these totals, so they identify the manifest
+        # for the quote cache as well as its box lines would.
+        return repr(
+            (
+                self.gross_weight(),
+                self.volumetric_weight(),
+                sorted(self._overweight.items()),
+                sorted(self._oversized.items()),
+            )
+        ).encode()
+
+
+class _BoundedStream:
+    # Fails a body once more than max_bytes of it have been read, since
+    # streamed bodies are not held to DATA_UPLOAD_MAX_MEMORY_SIZE.
+    __slots__ = ("_stream", "_remaining")
+
+    def __init__(self, stream, max_bytes: Optional[int]):
+        self._stream = stream
+        self._remaining = max_bytes
+
+    def read(self, size: int) -> bytes:
+        chunk = self._stream.read(size)
+        if self._remaining is not None:
+            self._remaining -= len(chunk)
+            if self._remaining < 0:
+                raise ManifestStreamError("Request body is too large")
+        return chunk
+
+
+class _JsonStream:
+    def __init__(self, stream, chunk_size: int, max_value_length: Optional[int] = None):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._max_value_length = max_value_length
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._exhausted = False
+
+    def _fill(self) -> bool:
+        if self._exhausted:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._exhausted = True
+        try:
+            text = self._text.decode(chunk, final=not chunk)
+        except UnicodeDecodeError:
+            raise ManifestStreamError("Request body is not valid UTF-8")
+        # Only the unconsumed tail is kept, so the buffer stays around one
+        # chunk long however large the body is.
+        self._buffer = self._buffer[self._position :] + text
+        self._position = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ""
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise ManifestStreamError(f"Expected {character!r}")
+        self._position += 1
+
+    def _fill_value(self) -> bool:
+        # A value cut off at the end of the buffer is decoded again from its
+        # start once more is read, so values are capped to keep that cheap
+        # and to keep one value from taking up the memory of the whole body.
+        if (
+            self._max_value_length is not None
+            and len(self._buffer) - self._position >= self._max_value_length
+        ):
+            raise ManifestStreamError("JSON value is too long")
+        return self._fill()
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError as error:
+                if self._fill_value():
+                    continue
+                raise ManifestStreamError(str(error))
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self._buffer) and self._fill_value():
+                continue
+            self._position = end
+            return value
+
+    def next_item(self, closing: str) -> bool:
+        separator = self.peek()
+        if separator == closing:
+            self._position += 1
+            return False
+        self.expect(",")
+        return True
+
+
+def _add_box(aggregates: BoxAggregates, errors: list[dict], index: int, box):
+    try:
+        aggregates.add(_box_row_adapter.validate_python(box))
+    except ValidationError as error:
+        errors.extend(
+            {**item, "loc": ("boxes", index, *item["loc"])} for item in error.errors()
+        )
+
+
+def _read_boxes(reader: _JsonStream, aggregates: BoxAggregates, errors: list[dict]):
+    if reader.peek() != "[":
+        reader.value()
+        errors.append(
+            {
+                "loc": ("boxes",),
+                "msg": "Input should be a valid list",
+                "type": "list_type",
+            }
+        )
+        return
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    index = 0
+    while True:
+        _add_box(aggregates, errors, index, reader.value())
+        index += 1
+        if not reader.next_item("]"):
+            return
+
+
+def read_shipment_stream(
+    stream,
+    aggregates: BoxAggregates,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_value_length: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> tuple[dict, list[dict]]:
+    # Reads a quote request body from a file-like object, feeding box lines
+    # into aggregates one at a time instead of building the whole list.
+    # Returns the other top-level fields, for the caller to validate, and
+    # pydantic style errors for the boxes. Bodies over max_bytes, or with a
+    # box or field over max_value_length characters, fail as malformed.
+    reader = _JsonStream(
+        _BoundedStream(stream, max_bytes), chunk_size, max_value_length
+    )
+    fields = {}
+    errors: list[dict] = []
+    has_boxes = False
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise ManifestStreamError("Expected an object key")
+            reader.expect(":")
+            if key == "boxes":
+                has_boxes = True
+                _read_boxes(reader, aggregates, errors)
+            else:
+                fields[key] = reader.value()
+            if not reader.next_item("}"):
+                break
+    if reader.peek() != "":
+        raise ManifestStreamError("Extra data after the request body")
+
+    if not has_boxes:
+        errors.append({"loc": ("boxes",), "msg": "Field required", "type": "missing"})
+    return fields, errors
+
+
+def _iter_lines(
+    stream, chunk_size: int, max_line_length: Optional[int] = None
+) -> Iterator[str]:
+    # utf-8-sig drops the byte order mark spreadsheet exports often start with.
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        try:
+            pending += text.decode(chunk, final=not chunk)
+        except UnicodeDecodeError:
+            raise ManifestStreamError("Request body is not valid UTF-8")
+        lines = pending.splitlines(keepends=True)
+        # The last line may continue in the next chunk.
+        pending = lines.pop() if chunk and lines else ""
+        # It is split again with every chunk added to it, so lines are capped
+        # to keep that cheap.
+        if max_line_length is not None and any(
+            len(line) > max_line_length for line in (pending, *lines)
+        ):
+            raise ManifestStreamError("Line is too long")
+        yield from lines
+        if not chunk:
+            return
+
+
+def _read_csv_boxes(lines: Iterator[str], aggregates: BoxAggregates, errors):
+    rows = csv.DictReader(lines)
+    missing = [field for field in BOX_FIELDS if field not in (rows.fieldnames or [])]
+    if missing:
+        errors.append(
+            {
+                "loc": ("boxes",),
+                "msg": f"Missing CSV columns: {', '.join(missing)}",
+                "type": "missing",
+            }
+        )
+        return
+    try:
+        for index, row in enumerate(rows):
+            _add_box(aggregates, errors, index, row)
+    except csv.Error as error:
+        raise ManifestStreamError(str(error))
+
+
+def _read_ndjson_boxes(lines: Iterator[str], aggregates: BoxAggregates, errors):
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            box = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ManifestStreamError(str(error))
+        _add_box(aggregates, errors, index, box)
+        index += 1
+
+
+def read_box_lines(
+    stream,
+    aggregates: BoxAggregates,
+    media_type: str,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_line_length: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> list[dict]:
+    # Reads box lines only, one CSV row (after a header row naming the
+    # columns) or one JSON object per line, into aggregates. Returns pydantic
+    # style errors for the boxes. Bodies over max_bytes, or with a line over
+    # max_line_length characters, fail as malformed.
+    errors: list[dict] = []
+    lines = _iter_lines(_BoundedStream(stream, max_bytes), chunk_size, max_line_length)
+    if media_type == CSV_MEDIA_TYPE:
+        _read_csv_boxes(lines, aggregates, errors)
+    else:
+        _read_ndjson_boxes(lines, aggregates, errors)
+    return errors
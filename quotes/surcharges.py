@@ -0,0 +1,154 @@
+import functools
+import logging
+import math
+import operator
+import threading
+from typing import Callable, Iterable, NamedTuple, Optional
+from quotes.models import SurchargeRule
+from quotes.rate_index import aget_rate_table_version, get_rate_table_version
+from quotes.routers import quote_reads
+
+logger = logging.getLogger("quotes.surcharges")
+
+RULE_FIELDS = ("kind", "starting_country", "threshold", "inclusive", "fee_cents")
+# (threshold, inclusive, fee) standing in for a missing default rule: nothing
+# is over an infinite threshold and there is no fee to charge.
+NO_SURCHARGE = (math.inf, False, 0)
+
+
+class OriginSurcharges(NamedTuple):
+    service_fee_cents: int
+    overweight_fee_cents: int
+    # (limit in kg, whether a box weighing exactly the limit is charged)
+    overweight_limit: tuple[float, bool]
+    # Called with a box weight, e.g. partial(operator.le, 15) for >= 15 kg.
+    is_overweight: Callable[[float], bool]
+    oversized_fee_cents: int
+    # (longest dimension in cm, whether a box exactly that long is charged)
+    oversize_limit: tuple[float, bool]
+    is_oversized: Callable[[float], bool]
+
+
+def _threshold_predicate(threshold: float, inclusive: bool) -> Callable:
+    # partial objects rather than lambdas, so a compiled rule set pickles.
+    return functools.partial(operator.le if inclusive else operator.lt, threshold)
+
+
+class SurchargeRules:
+    # Surcharge rules compiled into one OriginSurcharges per starting country,
+    # so pricing a box is a dict lookup and a comparison.
+    def __init__(self, version, rules: Iterable[tuple]):
+        self.version = version
+        rules_by_kind: dict[str, dict[str, tuple]] = {
+            kind: {} for kind in SurchargeRule.Kind.values
+        }
+        # Rules the model and its constraints reject can still reach the
+        # table, e.g. through raw SQL. They are logged and left out rather
+        # than failing every quote.
+        for rule in rules:
+            kind, starting_country, threshold, inclusive, fee_cents = rule
+            if kind not in rules_by_kind:
+                logger.error("Skipped surcharge rule %r: unknown kind", rule)
+                continue
+            if kind != SurchargeRule.Kind.SERVICE and threshold is None:
+                logger.error("Skipped surcharge rule %r: no threshold", rule)
+                continue
+            rules_by_kind[kind][starting_country] = (threshold, inclusive, fee_cents)
+        for kind, rules in rules_by_kind.items():
+            if "" not in rules:
+                logger.error("No default %s surcharge rule, charging none", kind)
+                rules[""] = NO_SURCHARGE
+
+        self.default = self._compile(rules_by_kind, "")
+        self.origins = {
+            starting_country: self._compile(rules_by_kind, starting_country)
+            for rules in rules_by_kind.values()
+            for starting_country in rules
+            if starting_country
+        }
+
+    @staticmethod
+    def _compile(rules_by_kind, starting_country: str) -> OriginSurcharges:
+        def rule(kind):
+            rules = rules_by_kind[kind]
+            return rules.get(starting_country, rules[""])
+
+        _, _, service_fee_cents = rule(SurchargeRule.Kind.SERVICE)
+        overweight_kg, overweight_inclusive, overweight_fee_cents = rule(
+            SurchargeRule.Kind.OVERWEIGHT
+        )
+        oversize_cm, oversize_inclusive, oversized_fee_cents = rule(
+            SurchargeRule.Kind.OVERSIZED
+        )
+        return OriginSurcharges(
+            service_fee_cents=service_fee_cents,
+            overweight_fee_cents=overweight_fee_cents,
+            overweight_limit=(overweight_kg, overweight_inclusive),
+            is_overweight=_threshold_predicate(overweight_kg, overweight_inclusive),
+            oversized_fee_cents=oversized_fee_cents,
+            oversize_limit=(oversize_cm, oversize_inclusive),
+            is_oversized=_threshold_predicate(oversize_cm, oversize_inclusive),
+        )
+
+    @classmethod
+    def load(cls, version) -> "SurchargeRules":
+        with quote_reads():
+            return cls(version, SurchargeRule.objects.values_list(*RULE_FIELDS))
+
+    @classmethod
+    async def aload(cls, version) -> "SurchargeRules":
+        with quote_reads():
+            rules = [
+                rule async for rule in SurchargeRule.objects.values_list(*RULE_FIELDS)
+            ]
+        return cls(version, rules)
+
+    def for_origin(self, starting_country: str) -> OriginSurcharges:
+        return self.origins.get(starting_country, self.default)
+
+    def overweight_limits(self) -> set[tuple[float, bool]]:
+        return {
+            surcharges.overweight_limit
+            for surcharges in (self.default, *self.origins.values())
+        }
+
+    def oversize_limits(self) -> set[tuple[float, bool]]:
+        return {
+            surcharges.oversize_limit
+            for surcharges in (self.default, *self.origins.values())
+        }
+
+
+_surcharge_rules: Optional[SurchargeRules] = None
+_surcharge_rules_lock = threading.Lock()
+
+
+def get_surcharge_rules() -> SurchargeRules:
+    # Versioned with the rate table, so saving a rule reaches every process
+    # the same way a rate change does.
+    global _surcharge_rules
+    version = get_rate_table_version()
+    rules = _surcharge_rules
+    if rules is None or version is None or rules.version != version:
+        with _surcharge_rules_lock:
+            rules = _surcharge_rules
+            if rules is None or version is None or rules.version != version:
+                rules = SurchargeRules.load(version)
+                _surcharge_rules = rules
+    return rules
+
+
+async def aget_surcharge_rules() -> SurchargeRules:
+    global _surcharge_rules
+    version = await aget_rate_table_version()
+    rules = _surcharge_rules
+    if rules is None or version is None or rules.version != version:
+        rules = await SurchargeRules.aload(version)
+        _surcharge_rules = rules
+    return rules
+
+
+def reset_surcharge_rules():
+    global _surcharge_rules
+    with _surcharge_rules_lock:
+        _surcharge_rules = None
@@ -0,0 +1,94 @@
+import random
+import pytest
+from django.core.cache import caches
+from django.db import connections
+from quotes.db.postgresql.base import close_pools
+from quotes.instrumentation import reset_metrics
+from quotes.models import Rate
+from quotes.quote_cache import quote_cache
+from quotes.rate_index import reset_rate_index
+from quotes.routers import expire_primary_revision, replica_pool
+from quotes.surcharges import get_surcharge_rules, reset_surcharge_rules
+from quotes.utils import Box
+
+
+def pytest_runtest_setup(item):
+    if (
+        item.get_closest_marker("postgres")
+        and connections["default"].vendor != "postgresql"
+    ):
+        pytest.skip("needs Postgres, set TEST_POSTGRES_HOST")
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup):
+    yield
+    # Pooled connections stay open once closed, which would keep the test
+    # databases from being dropped.
+    connections.close_all()
+    close_pools()
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_caches():
+    # Test transactions roll the rate table revision back, so drop the
+    # revision read in the last test and every rate index and quote cached
+    # for it explicitly.
+    for cache in caches.all():
+        cache.clear()
+    expire_primary_revision()
+    reset_rate_index()
+    reset_surcharge_rules()
+    replica_pool.reset()
+    quote_cache.reset_stats()
+    reset_metrics()
+    yield
+    expire_primary_revision()
+    reset_rate_index()
+    reset_surcharge_rules()
+
+
+@pytest.fixture
+def surcharge_rules(db):
+    # The rules seeded by the migrations, loaded up front so tests counting
+    # queries only see the quote's own.
+    return get_surcharge_rules()
+
+
+@pytest.fixture
+def make_boxes():
+    # Random boxes, the same ones for the same amount.
+    def make_boxes(amount: int) -> list[Box]:
+        generator = random.Random(amount)
+        return [
+            Box(
+                count=generator.randint(1, 20),
+                weight_kg=generator.uniform(1, 60),
+                length=generator.uniform(10, 150),
+                width=generator.uniform(10, 150),
+                height=generator.uniform(10, 150),
+            )
+            for _ in range(amount)
+        ]
+
+    return make_boxes
+
+
+@pytest.fixture
+def create_china_usa_air_rate(db):
+    def create_china_usa_air_rate(weight_rates=None):
+        return Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=15,
+            shipping_time_range_max_days=20,
+            weight_rates=weight_rates
+            or [
+                {"min_weight_kg": 0, "max_weight_kg": 20, "per_kg_rate": 5.00},
+                {"min_weight_kg": 20, "max_weight_kg": 40, "per_kg_rate": 4.50},
+                {"min_weight_kg": 40, "max_weight_kg": 100, "per_kg_rate": 4.00},
+            ],
+        )
+
+    return create_china_usa_air_rate
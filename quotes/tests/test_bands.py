@@ -0,0 +1,41 @@
+from quotes.bands import BandIndex
+
+
+class TestBandIndex:
+    def test_contiguous_bands(self):
+        bands = BandIndex([(20, 40, 450), (0, 20, 500), (40, 100, 400)])
+
+        assert len(bands) == 3
+        assert list(bands.min_weights) == [0, 20, 40]
+        assert bands.find_many([-1, 0, 10, 20, 39.9, 40, 100, 100.5]) == [
+            -1,
+            0,
+            0,
+            1,
+            1,
+            2,
+            2,
+            -1,
+        ]
+
+    def test_gaps_keep_inclusive_upper_bounds(self):
+        bands = BandIndex([(0, 20, 500), (25, 40, 450)])
+
+        assert bands.find_many([20, 22, 25, 40]) == [0, -1, 1, 1]
+
+    def test_overlapping_bands_prefer_the_one_starting_last(self):
+        bands = BandIndex([(0, 100, 500), (20, 40, 450), (30, 35, 400)])
+
+        assert bands.find_many([10, 20, 32, 36, 40, 50, 100, 101]) == [
+            0,
+            1,
+            2,
+            1,
+            1,
+            0,
+            0,
+            -1,
+        ]
+
+    def test_empty(self):
+        assert BandIndex([]).find(10) == -1
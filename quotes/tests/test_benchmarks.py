@@ -0,0 +1,90 @@
+import json
+import os
+from pathlib import Path
+import pytest
+from django.core.management import CommandError, call_command
+from quotes.benchmarks import compare_to_baseline, parse_importtime, run_benchmarks
+from quotes.models import Rate, RateCardVersion
+
+
+def result(p50_ms: float, p95_ms: float):
+    return {"p50_ms": p50_ms, "p95_ms": p95_ms}
+
+
+def test_compare_to_baseline_flags_metrics_over_tolerance():
+    baseline = {"quote_view[1]": result(1.0, 2.0), "removed": result(1.0, 1.0)}
+
+    assert (
+        compare_to_baseline(
+            {"quote_view[1]": result(1.1, 2.0), "new": result(50.0, 50.0)},
+            baseline,
+            0.2,
+        )
+        == []
+    )
+    assert compare_to_baseline({"quote_view[1]": result(1.3, 2.5)}, baseline, 0.2) == [
+        "quote_view[1] p50_ms: 1.300 > 1.000 (+20% tolerance)",
+        "quote_view[1] p95_ms: 2.500 > 2.000 (+20% tolerance)",
+    ]
+
+
+def test_parse_importtime():
+    output = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       250 |        250 |   _io",
+            "import time:      1500 |       1750 | django",
+            "Some other stderr line",
+        ]
+    )
+
+    assert parse_importtime(output) == {"_io": 0.25, "django": 1.5}
+
+
+@pytest.mark.django_db
+def test_run_benchmarks_rolls_back_generated_data():
+    versions = list(RateCardVersion.objects.values_list("id", flat=True))
+    results = run_benchmarks(
+        lanes=2, bands=3, manifest_sizes=(1, 10), repeat=2, import_rows=10
+    )
+
+    assert list(results) == [
+        "calculate_quotes[1]",
+        "quote_view[1]",
+        "calculate_quotes[10]",
+        "quote_view[10]",
+        "import_rates[10]",
+    ]
+    for timings in results.values():
+        assert 0 < timings["p50_ms"] <= timings["p95_ms"] <= timings["p99_ms"]
+        assert timings["peak_memory_kb"] > 0
+    assert list(RateCardVersion.objects.values_list("id", flat=True)) == versions
+    assert not Rate.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_quotes_fails_on_regressions(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"quote_view[1]": result(1e-6, 1e-6)}))
+
+    with pytest.raises(CommandError, match="quote_view\\[1\\] p50_ms"):
+        call_command(
+            "benchmark_quotes",
+            "--lanes=1",
+            "--bands=1",
+            "--boxes=1",
+            "--repeat=1",
+            "--import-rows=1",
+            f"--baseline={baseline}",
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    "QUOTES_BENCHMARK_BASELINE" not in os.environ,
+    reason="set QUOTES_BENCHMARK_BASELINE to a benchmark_quotes --output file",
+)
+def test_no_regressions_against_stored_baseline():
+    baseline = json.loads(Path(os.environ["QUOTES_BENCHMARK_BASELINE"]).read_text())
+
+    assert compare_to_baseline(run_benchmarks(), baseline, 0.2) == []
@@ -0,0 +1,58 @@
+import pytest
+from quotes.utils import QuoteCalculationService
+
+pytest.importorskip("numpy")
+
+from quotes.box_arrays import BoxArrays  # noqa: E402
+
+
+class TestBoxArrays:
+    @pytest.mark.parametrize("starting_country", ["China", "India", "Vietnam"])
+    def test_matches_per_box_aggregation(
+        self, starting_country, surcharge_rules, make_boxes
+    ):
+        surcharges = surcharge_rules.for_origin(starting_country)
+        boxes = make_boxes(500)
+        box_arrays = BoxArrays.from_boxes(boxes)
+
+        assert len(box_arrays) == 500
+        for aggregate in ["_calculate_gross_weight", "_calculate_volumetric_weight"]:
+            assert getattr(QuoteCalculationService, aggregate)(
+                box_arrays
+            ) == pytest.approx(getattr(QuoteCalculationService, aggregate)(boxes))
+        for fee in [
+            "_calculate_boxes_overweight_fee",
+            "_calculate_boxes_oversized_fee",
+        ]:
+            assert getattr(QuoteCalculationService, fee)(
+                surcharges, box_arrays
+            ) == getattr(QuoteCalculationService, fee)(surcharges, boxes)
+
+    def test_from_dicts(self):
+        box_arrays = BoxArrays.from_dicts(
+            [
+                {"count": 2, "weight_kg": 15, "length": 10, "width": 20, "height": 30},
+                {"count": 1, "weight_kg": 31, "length": 130, "width": 1, "height": 1},
+            ]
+        )
+
+        assert box_arrays.gross_weight() == 61
+        assert box_arrays.volumetric_weight() == pytest.approx(12130 / 6000)
+        assert box_arrays.count_overweight(15, inclusive=True) == 2
+        assert box_arrays.count_overweight(15, inclusive=False) == 1
+        assert box_arrays.count_oversized(120) == 1
+
+    def test_empty_manifest(self):
+        box_arrays = BoxArrays.from_dicts([])
+
+        assert len(box_arrays) == 0
+        assert box_arrays.gross_weight() == 0
+        assert box_arrays.count_oversized(120) == 0
+
+    def test_sorted_rows_bytes_ignores_box_order(self, make_boxes):
+        boxes = make_boxes(20)
+
+        assert (
+            BoxArrays.from_boxes(boxes).sorted_rows_bytes()
+            == BoxArrays.from_boxes(boxes[::-1]).sorted_rows_bytes()
+        )
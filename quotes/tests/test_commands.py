@@ -0,0 +1,130 @@
+import json
+import re
+import pytest
+from django.core.management import CommandError, call_command
+from quotes.models import Rate, RateCardVersion
+from quotes.money import to_amount
+from quotes.utils import Box, QuoteCalculationService
+
+RATE_CARD = [
+    ["China", "USA", "air", 15, 20, 0, 20, 5.0],
+    ["China", "USA", "air", 15, 20, 20, 40, 4.5],
+    ["China", "USA", "air", 15, 20, 40, 10000, 4.0],
+    ["China", "USA", "ocean", 45, 50, 100, 10000, 1.0],
+    ["India", "USA", "air", 10, 15, 0, 10000, 9.5],
+]
+COLUMNS = [
+    "starting_country",
+    "destination_country",
+    "shipping_channel",
+    "shipping_time_range_min_days",
+    "shipping_time_range_max_days",
+    "min_weight_kg",
+    "max_weight_kg",
+    "per_kg_rate",
+]
+
+
+def imported_rate_card(version: RateCardVersion):
+    return [
+        [
+            rate.starting_country,
+            rate.destination_country,
+            rate.shipping_channel,
+            rate.shipping_time_range_min_days,
+            rate.shipping_time_range_max_days,
+            weight_band.min_weight_kg,
+            weight_band.max_weight_kg,
+            to_amount(weight_band.per_kg_rate_cents),
+        ]
+        for rate in version.rates.order_by("id")
+        for weight_band in rate.rates.order_by("min_weight_kg")
+    ]
+
+
+class TestImportRates:
+    @pytest.mark.django_db
+    def test_import_csv(self, tmp_path):
+        rate_card = tmp_path / "rates.csv"
+        rate_card.write_text(
+            "\n".join(
+                [",".join(COLUMNS)]
+                + [",".join(str(value) for value in row) for row in RATE_CARD]
+            )
+        )
+
+        call_command("import_rates", str(rate_card), "--batch-size", "2")
+
+        version = RateCardVersion.objects.get(name="rates.csv")
+        assert version.rates.count() == 3
+        assert imported_rate_card(version) == RATE_CARD
+        assert RateCardVersion.objects.get_active() != version
+
+    @pytest.mark.django_db
+    def test_import_jsonl(self, tmp_path):
+        rate_card = tmp_path / "rates.jsonl"
+        rate_card.write_text(
+            "\n".join(json.dumps(dict(zip(COLUMNS, row))) for row in RATE_CARD)
+        )
+
+        call_command("import_rates", str(rate_card), "--name", "july", "--activate")
+
+        version = RateCardVersion.objects.get_active()
+        assert version.name == "july"
+        assert imported_rate_card(version) == RATE_CARD
+
+    @pytest.mark.django_db
+    def test_invalid_row_rolls_back_import(self, tmp_path):
+        rate_card = tmp_path / "rates.jsonl"
+        rows = [dict(zip(COLUMNS, row)) for row in RATE_CARD]
+        rows[-1]["per_kg_rate"] = "cheap"
+        rate_card.write_text("\n".join(json.dumps(row) for row in rows))
+
+        with pytest.raises(CommandError, match="row 5"):
+            call_command("import_rates", str(rate_card), "--batch-size", "2")
+
+        assert not RateCardVersion.objects.filter(name="rates.jsonl").exists()
+        assert Rate.objects.count() == 0
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(
+        "last_line, error",
+        [
+            ('{"starting_country": "India",', "JSONDecodeError"),
+            ("[]", "TypeError"),
+            (None, "ValueError('Amount has fractions of a cent"),
+        ],
+    )
+    def test_invalid_jsonl_line(self, tmp_path, last_line, error):
+        rate_card = tmp_path / "rates.jsonl"
+        lines = [json.dumps(dict(zip(COLUMNS, row))) for row in RATE_CARD]
+        lines[-1] = last_line or lines[-1].replace("9.5", "9.555")
+        rate_card.write_text("\n".join(lines))
+
+        with pytest.raises(CommandError, match=re.escape(f"row 5: {error}")):
+            call_command("import_rates", str(rate_card))
+
+        assert Rate.objects.count() == 0
+
+
+class TestRateCardCommands:
+    @pytest.mark.django_db
+    def test_activate_rate_card(self):
+        version = RateCardVersion.objects.create(name="next")
+
+        call_command("activate_rate_card", str(version.pk))
+
+        assert RateCardVersion.objects.get_active() == version
+        with pytest.raises(CommandError):
+            call_command("activate_rate_card", "0")
+
+    @pytest.mark.django_db
+    def test_populate_db(self):
+        call_command("populate_db")
+
+        quotes = QuoteCalculationService.calculate_quotes(
+            "China",
+            "USA",
+            [Box(count=1, weight_kg=150, length=10, width=10, height=10)],
+        )
+        assert [quote.shipping_channel for quote in quotes] == ["air", "ocean"]
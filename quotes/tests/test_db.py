@@ -0,0 +1,251 @@
+import threading
+import psycopg2
+import pytest
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from quotes.db.pool import ConnectionPool, PoolTimeout
+from quotes.db.postgresql.base import _pools, close_pools
+from quotes.db.prepared import execute_prepared, execute_sql, prepare_sql
+from quotes.managers import RATE_LOOKUP_STATEMENT, LaneRate
+from quotes.models import PerWeightRate, Rate
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    def test_reuses_returned_connections(self):
+        pool = ConnectionPool(max_size=2, timeout=0)
+
+        first = pool.get(FakeConnection)
+        pool.put(first)
+
+        assert pool.get(FakeConnection) is first
+        assert len(pool) == 1
+
+    def test_waits_for_a_connection_once_full(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        pooled = pool.get(FakeConnection)
+        threading.Timer(0.05, pool.put, [pooled]).start()
+
+        assert pool.get(FakeConnection) is pooled
+
+    def test_times_out_once_full(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.get(FakeConnection)
+
+        with pytest.raises(PoolTimeout):
+            pool.get(FakeConnection)
+
+    def test_replaces_closed_and_unhealthy_connections(self):
+        pool = ConnectionPool(
+            max_size=2,
+            timeout=0,
+            check=lambda connection: connection.healthy,
+            check_after=-1,
+        )
+        closed, unhealthy = pool.get(FakeConnection), pool.get(FakeConnection)
+        closed.connection.close()
+        unhealthy.connection.healthy = False
+        pool.put(closed)
+        pool.put(unhealthy)
+
+        def connect():
+            connection = FakeConnection()
+            connection.healthy = True
+            return connection
+
+        pooled = pool.get(connect)
+
+        assert pooled not in (closed, unhealthy)
+        assert unhealthy.connection.closed
+        assert (len(pool), pool.idle()) == (1, 0)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0)
+
+        def connect():
+            raise OSError("connection refused")
+
+        with pytest.raises(OSError):
+            pool.get(connect)
+        assert pool.get(FakeConnection).connection is not None
+
+
+class FakeCursor:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        # In SQL column order: the model field before the annotations.
+        return [(500, "air", 1, 2)]
+
+
+class FakePreparingConnection:
+    prepared_statements_enabled = True
+
+    def __init__(self):
+        self.executed = []
+        self.prepared_statements = set()
+
+    def cursor(self):
+        return FakeCursor(self.executed)
+
+
+class TestPreparedStatements:
+    def test_prepare_sql(self):
+        assert (
+            prepare_sql("lookup", "SELECT a FROM t WHERE b = %s AND c LIKE '%%x' ", 1)
+            == "PREPARE lookup AS SELECT a FROM t WHERE b = $1 AND c LIKE '%x' "
+        )
+        assert execute_sql("lookup", 2) == "EXECUTE lookup (%s, %s)"
+        assert execute_sql("lookup", 0) == "EXECUTE lookup"
+
+    @pytest.mark.django_db
+    def test_prepares_once_per_session(self):
+        connection = FakePreparingConnection()
+        queryset = PerWeightRate.objects.for_lane_and_weight("China", "USA", 15)
+        sql, params = queryset.query.sql_with_params()
+
+        for _ in range(2):
+            rows = execute_prepared(connection, RATE_LOOKUP_STATEMENT, queryset)
+
+        assert rows == [("air", 1, 2, 500)]
+        assert connection.executed == [
+            (prepare_sql(RATE_LOOKUP_STATEMENT, sql, len(params)), None),
+            (execute_sql(RATE_LOOKUP_STATEMENT, len(params)), params),
+            (execute_sql(RATE_LOOKUP_STATEMENT, len(params)), params),
+        ]
+
+    @pytest.mark.django_db
+    def test_fetch_for_lane_and_weight(self, mocker):
+        connection = FakePreparingConnection()
+        mocker.patch("quotes.managers.connections", {"default": connection})
+
+        assert PerWeightRate.objects.fetch_for_lane_and_weight("China", "USA", 15) == [
+            LaneRate("air", 1, 2, 500)
+        ]
+
+    @pytest.mark.django_db
+    def test_fetch_for_lane_and_weight_on_channels(self, mocker):
+        connection = FakePreparingConnection()
+        mocker.patch("quotes.managers.connections", {"default": connection})
+
+        assert PerWeightRate.objects.fetch_for_lane_and_weight(
+            "China", "USA", 15, {"air", "ocean"}
+        ) == [LaneRate("air", 1, 2, 500)]
+        assert f"{RATE_LOOKUP_STATEMENT}_2_channels" in connection.executed[0][0]
+        assert (
+            PerWeightRate.objects.fetch_for_lane_and_weight("China", "USA", 15, set())
+            == []
+        )
+        assert len(connection.executed) == 2
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+class TestPostgresBackend:
+    # Against a real server through quotes.db.postgresql, with the pool and
+    # prepared statements on (see settings_test). Closing the connection is
+    # what the end of a request does.
+    @pytest.fixture
+    def lane(self):
+        Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=1,
+            shipping_time_range_max_days=2,
+            weight_rates=[
+                {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00}
+            ],
+        )
+        # Every test starts with new sessions, none prepared yet.
+        connection.close()
+        close_pools()
+
+    @staticmethod
+    def lookup():
+        return PerWeightRate.objects.fetch_for_lane_and_weight("China", "USA", 15)
+
+    @staticmethod
+    def backend_pid() -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    def test_pool_reuses_connections_across_requests(self, lane):
+        connection.ensure_connection()
+        pooled = connection.connection
+        pid = self.backend_pid()
+        connection.close()
+        assert _pools[connection.alias].idle() == 1
+
+        connection.ensure_connection()
+
+        assert connection.connection is pooled
+        assert self.backend_pid() == pid
+
+    def test_prepares_the_lookup_once_per_session(self, lane):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                assert self.lookup() == [LaneRate("air", 1, 2, 500)]
+                connection.close()
+
+        statements = [query["sql"].split()[0] for query in queries]
+        assert statements.count("PREPARE") == 1
+        assert statements.count("EXECUTE") == 3
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM pg_prepared_statements")
+            assert cursor.fetchall() == [(RATE_LOOKUP_STATEMENT,)]
+
+    def terminate_pooled_connection(self):
+        assert self.lookup()
+        pid = self.backend_pid()
+        connection.close()
+        settings_dict = connection.settings_dict
+        with psycopg2.connect(
+            dbname=settings_dict["NAME"],
+            user=settings_dict["USER"],
+            password=settings_dict["PASSWORD"],
+            host=settings_dict["HOST"],
+            port=settings_dict["PORT"],
+        ) as admin_connection:
+            with admin_connection.cursor() as cursor:
+                cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+        admin_connection.close()
+        return pid
+
+    def test_health_check_replaces_a_reset_connection(self, lane, monkeypatch):
+        pid = self.terminate_pooled_connection()
+        monkeypatch.setattr(_pools[connection.alias], "_check_after", -1)
+
+        # The dead connection is replaced at checkout, and the new session
+        # prepares the lookup again.
+        assert self.lookup() == [LaneRate("air", 1, 2, 500)]
+        assert self.backend_pid() != pid
+
+    def test_reset_connection_fails_one_request_only(self, lane):
+        self.terminate_pooled_connection()
+
+        # Idle for less than POOL_HEALTH_CHECK_AFTER, the connection is handed
+        # out unchecked: its first query fails and it leaves the pool.
+        with pytest.raises(OperationalError):
+            self.lookup()
+        connection.close()
+
+        assert self.lookup() == [LaneRate("air", 1, 2, 500)]
@@ -1,8 +1,14 @@
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
 from rest_framework.test import APIClient
 import pytest
 from quotes.models import Rate
 
 
+async def async_post(path, data, content_type):
+    return await AsyncClient().post(path, data, content_type=content_type)
+
+
 @pytest.mark.django_db
 def test_calculate_quotes_no_results():
     rate1 = Rate.objects.create_with_weight_rates(
@@ -52,4 +58,385 @@ def test_calculate_quotes_no_results():
         format="json",
     )
     assert response.status_code == 200
-    assert response.data == expected_response
+    assert response.json() == expected_response
+
+
+@pytest.mark.django_db
+def test_calculate_quotes_invalid_payload():
+    client = APIClient()
+    response = client.post(
+        "/v1/quotes",
+        {
+            "starting_country": "China",
+            "boxes": [
+                {"count": 1, "weight_kg": 10, "length": 1, "width": 1, "height": 1},
+                {"count": "many", "weight_kg": 10, "length": 1, "width": 1},
+            ],
+        },
+        format="json",
+    )
+    assert response.status_code == 400
+    assert response.json() == {
+        "destination_country": ["Field required"],
+        "boxes": {
+            "1": {
+                "count": [
+                    "Input should be a valid integer, unable to parse string as an integer"
+                ],
+                "height": ["Field required"],
+            }
+        },
+    }
+
+
+@pytest.mark.django_db
+def test_calculate_quotes_malformed_json():
+    client = APIClient()
+    response = client.post(
+        "/v1/quotes", b'{"starting_country": ', content_type="application/json"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_calculate_quotes_vectorized(settings):
+    pytest.importorskip("numpy")
+    settings.QUOTES_VECTORIZE_MIN_BOXES = 1
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate": 3.50},
+        ],
+    )
+    client = APIClient()
+    response = client.post(
+        "/v1/quotes",
+        {
+            "starting_country": "China",
+            "destination_country": "USA",
+            "boxes": [
+                {
+                    "count": 100,
+                    "weight_kg": 10,
+                    "length": 200,
+                    "width": 20,
+                    "height": 30,
+                },
+                {"count": 10, "weight_kg": 31, "length": 10, "width": 20, "height": 30},
+            ],
+        },
+        format="json",
+    )
+    assert response.status_code == 200
+    assert response.json()["quotes"][0]["cost_breakdown"] == {
+        "shipping_cost": 7035.0,
+        "service_fee": 300.0,
+        "oversized_fee": 100.0,
+        "overweight_fee": 80.0,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("rate_index_enabled", [True, False])
+def test_calculate_quotes_async(settings, rate_index_enabled):
+    settings.QUOTES_RATE_INDEX_ENABLED = rate_index_enabled
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate": 3.50},
+        ],
+    )
+    response = async_to_sync(async_post)(
+        "/v1/quotes/async",
+        {
+            "starting_country": "China",
+            "destination_country": "USA",
+            "boxes": [
+                {
+                    "count": 100,
+                    "weight_kg": 10,
+                    "length": 200,
+                    "width": 20,
+                    "height": 30,
+                }
+            ],
+        },
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "quotes": [
+            {
+                "shipping_channel": "air",
+                "total_cost": 7400.0,
+                "cost_breakdown": {
+                    "shipping_cost": 7000.0,
+                    "service_fee": 300.0,
+                    "oversized_fee": 100.0,
+                    "overweight_fee": 0.0,
+                },
+                "shipping_time_range": {"min_days": 15, "max_days": 20},
+            },
+        ]
+    }
+
+
+def create_china_usa_rates():
+    for shipping_channel, min_days, per_kg_rate in [
+        ("air", 15, 3.50),
+        ("ocean", 40, 1.00),
+    ]:
+        Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel=shipping_channel,
+            shipping_time_range_min_days=min_days,
+            shipping_time_range_max_days=min_days + 5,
+            weight_rates=[
+                {
+                    "min_weight_kg": 0,
+                    "max_weight_kg": 10000,
+                    "per_kg_rate": per_kg_rate,
+                },
+            ],
+        )
+
+
+SELECTION_SHIPMENT = {
+    "starting_country": "China",
+    "destination_country": "USA",
+    "boxes": [{"count": 1, "weight_kg": 10, "length": 20, "width": 20, "height": 30}],
+}
+
+
+@pytest.mark.django_db
+def test_calculate_quotes_with_selection():
+    create_china_usa_rates()
+    client = APIClient()
+
+    response = client.post(
+        "/v1/quotes?sort=total_cost&limit=1", SELECTION_SHIPMENT, format="json"
+    )
+    assert response.status_code == 200
+    assert [quote["shipping_channel"] for quote in response.json()["quotes"]] == [
+        "ocean"
+    ]
+
+    response = client.post("/v1/quotes?limit=0", SELECTION_SHIPMENT, format="json")
+    assert response.status_code == 400
+    assert "limit" in response.json()
+
+
+@pytest.mark.django_db
+def test_calculate_quotes_async_with_selection():
+    create_china_usa_rates()
+
+    response = async_to_sync(async_post)(
+        "/v1/quotes/async?channel=air", SELECTION_SHIPMENT, "application/json"
+    )
+    assert response.status_code == 200
+    assert [quote["shipping_channel"] for quote in response.json()["quotes"]] == ["air"]
+
+    response = async_to_sync(async_post)(
+        "/v1/quotes/async?sort=max_days", SELECTION_SHIPMENT, "application/json"
+    )
+    assert response.status_code == 400
+    assert "sort" in response.json()
+
+
+@pytest.mark.django_db
+def test_calculate_quotes_async_invalid_payload():
+    response = async_to_sync(async_post)(
+        "/v1/quotes/async",
+        {"starting_country": "China", "destination_country": "USA"},
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert response.json() == {"boxes": ["Field required"]}
+
+    response = async_to_sync(async_post)(
+        "/v1/quotes/async", "boxes=1", content_type="text/plain"
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.django_db
+def test_batch_quotes(surcharge_rules, django_assert_max_num_queries):
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00},
+            {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate": 3.50},
+        ],
+    )
+    Rate.objects.create_with_weight_rates(
+        starting_country="India",
+        destination_country="USA",
+        shipping_channel="ocean",
+        shipping_time_range_min_days=40,
+        shipping_time_range_max_days=50,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 10000, "per_kg_rate": 1.50}
+        ],
+    )
+    box = {"count": 1, "weight_kg": 10, "length": 20, "width": 20, "height": 30}
+
+    client = APIClient()
+    with django_assert_max_num_queries(1):
+        response = client.post(
+            "/v1/quotes/batch",
+            {
+                "shipments": [
+                    {
+                        "starting_country": "India",
+                        "destination_country": "USA",
+                        "boxes": [box],
+                    },
+                    {"starting_country": "China", "boxes": [box]},
+                    {
+                        "starting_country": "China",
+                        "destination_country": "USA",
+                        "boxes": [box],
+                    },
+                    {
+                        "starting_country": "China",
+                        "destination_country": "Peru",
+                        "boxes": [box],
+                    },
+                ]
+            },
+            format="json",
+        )
+
+    assert response.status_code == 200
+    assert response.data == {
+        "results": [
+            {
+                "quotes": [
+                    {
+                        "shipping_channel": "ocean",
+                        "total_cost": 15.0,
+                        "cost_breakdown": {
+                            "shipping_cost": 15.0,
+                            "service_fee": 0.0,
+                            "oversized_fee": 0.0,
+                            "overweight_fee": 0.0,
+                        },
+                        "shipping_time_range": {"min_days": 40, "max_days": 50},
+                    }
+                ]
+            },
+            {"errors": {"destination_country": ["This field is required."]}},
+            {
+                "quotes": [
+                    {
+                        "shipping_channel": "air",
+                        "total_cost": 350.0,
+                        "cost_breakdown": {
+                            "shipping_cost": 50.0,
+                            "service_fee": 300.0,
+                            "oversized_fee": 0.0,
+                            "overweight_fee": 0.0,
+                        },
+                        "shipping_time_range": {"min_days": 15, "max_days": 20},
+                    }
+                ]
+            },
+            {"quotes": []},
+        ]
+    }
+
+
+@pytest.mark.django_db
+def test_batch_quotes_rejects_empty_batch():
+    client = APIClient()
+    response = client.post("/v1/quotes/batch", {"shipments": []}, format="json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_quote_matrix():
+    for starting_country, per_kg_rate in [("China", 5.00), ("India", 4.00)]:
+        Rate.objects.create_with_weight_rates(
+            starting_country=starting_country,
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=15,
+            shipping_time_range_max_days=20,
+            weight_rates=[
+                {"min_weight_kg": 0, "max_weight_kg": 10000, "per_kg_rate": per_kg_rate}
+            ],
+        )
+
+    client = APIClient()
+    response = client.post(
+        "/v1/quotes/matrix",
+        {
+            "boxes": [
+                {"count": 1, "weight_kg": 10, "length": 20, "width": 20, "height": 30}
+            ],
+            "destination_countries": ["USA"],
+        },
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "matrix": {
+            "China": {
+                "USA": [
+                    {
+                        "shipping_channel": "air",
+                        "total_cost": 350.0,
+                        "cost_breakdown": {
+                            "shipping_cost": 50.0,
+                            "service_fee": 300.0,
+                            "oversized_fee": 0.0,
+                            "overweight_fee": 0.0,
+                        },
+                        "shipping_time_range": {"min_days": 15, "max_days": 20},
+                    }
+                ]
+            },
+            "India": {
+                "USA": [
+                    {
+                        "shipping_channel": "air",
+                        "total_cost": 40.0,
+                        "cost_breakdown": {
+                            "shipping_cost": 40.0,
+                            "service_fee": 0.0,
+                            "oversized_fee": 0.0,
+                            "overweight_fee": 0.0,
+                        },
+                        "shipping_time_range": {"min_days": 15, "max_days": 20},
+                    }
+                ]
+            },
+        }
+    }
+
+
+@pytest.mark.django_db
+def test_quote_matrix_invalid_payload():
+    client = APIClient()
+    response = client.post(
+        "/v1/quotes/matrix", {"boxes": [{"count": 1}]}, format="json"
+    )
+    assert response.status_code == 400
+    assert response.data["boxes"]["0"]["weight_kg"] == ["Field required"]
+
+    response = client.post("/v1/quotes/matrix", {"boxes": []})
+    assert response.status_code == 415
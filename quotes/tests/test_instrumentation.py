@@ -0,0 +1,142 @@
+import logging
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+import pytest
+from quotes.instrumentation import Histogram
+from quotes.models import Rate
+
+SHIPMENT = {
+    "starting_country": "China",
+    "destination_country": "USA",
+    "boxes": [
+        {"count": 10, "weight_kg": 12, "length": 40, "width": 30, "height": 20},
+        {"count": 1, "weight_kg": 2, "length": 10, "width": 10, "height": 10},
+    ],
+}
+
+
+async def async_post(path, data, content_type):
+    return await AsyncClient().post(path, data, content_type=content_type)
+
+
+@pytest.fixture
+def china_usa_rate(db):
+    return Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 10000, "per_kg_rate": 5.00},
+        ],
+    )
+
+
+def server_timing(response) -> dict[str, str]:
+    return {
+        entry.split(";", 1)[0]: entry.split(";", 1)[1]
+        for entry in response["Server-Timing"].split(", ")
+    }
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("quotes_test", "Test histogram.", "stage", [1, 5])
+    histogram.observe("parse", 0.5)
+    histogram.observe("parse", 1)
+    histogram.observe("parse", 7)
+
+    assert histogram.render() == [
+        "# HELP quotes_test Test histogram.",
+        "# TYPE quotes_test histogram",
+        'quotes_test_bucket{stage="parse",le="1"} 2',
+        'quotes_test_bucket{stage="parse",le="5"} 2',
+        'quotes_test_bucket{stage="parse",le="+Inf"} 3',
+        'quotes_test_sum{stage="parse"} 8.5',
+        'quotes_test_count{stage="parse"} 3',
+    ]
+
+
+def test_quote_request_timing_breakdown(
+    china_usa_rate, surcharge_rules, settings, caplog
+):
+    settings.QUOTES_RATE_INDEX_ENABLED = False
+    settings.QUOTES_CACHE_ENABLED = False
+
+    with caplog.at_level(logging.INFO, logger="quotes.requests"):
+        response = APIClient().post("/v1/quotes", SHIPMENT, format="json")
+
+    assert response.status_code == 200
+    timing = server_timing(response)
+    assert list(timing) == [
+        "parse",
+        "profile",
+        "rates",
+        "pricing",
+        "render",
+        "db",
+        "total",
+    ]
+    assert timing["db"].endswith('desc="1 queries"')
+
+    [record] = caplog.records
+    assert record.quote_request["endpoint"] == "quotes"
+    assert record.quote_request["status"] == 200
+    assert record.quote_request["boxes"] == 2
+    assert record.quote_request["db_queries"] == 1
+    assert "boxes=2 db_queries=1" in record.getMessage()
+
+
+def test_async_quote_request_timing_breakdown(
+    china_usa_rate, surcharge_rules, settings
+):
+    settings.QUOTES_RATE_INDEX_ENABLED = False
+
+    response = async_to_sync(async_post)(
+        "/v1/quotes/async", SHIPMENT, content_type="application/json"
+    )
+
+    assert response.status_code == 200
+    timing = server_timing(response)
+    assert list(timing) == [
+        "parse",
+        "cache",
+        "profile",
+        "rates",
+        "pricing",
+        "render",
+        "db",
+        "total",
+    ]
+    assert timing["db"].endswith('desc="1 queries"')
+
+
+def test_metrics_endpoint(china_usa_rate):
+    client = APIClient()
+    client.post("/v1/quotes", SHIPMENT, format="json")
+    client.post("/v1/quotes", SHIPMENT, format="json")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    metrics = response.content.decode().splitlines()
+    assert 'quotes_request_duration_seconds_count{endpoint="quotes"} 2' in metrics
+    assert 'quotes_stage_duration_seconds_count{stage="render"} 2' in metrics
+    # The second request is answered from the quote cache.
+    assert 'quotes_stage_duration_seconds_count{stage="pricing"} 1' in metrics
+    assert 'quotes_request_boxes_bucket{endpoint="quotes",le="5"} 2' in metrics
+    assert "quotes_cache_hits_total 1" in metrics
+    assert "quotes_cache_misses_total 1" in metrics
+
+
+def test_instrumentation_disabled(china_usa_rate, settings):
+    settings.QUOTES_INSTRUMENTATION_ENABLED = False
+
+    response = APIClient().post("/v1/quotes", SHIPMENT, format="json")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response
+    assert "quotes_request_duration_seconds_count" not in (
+        APIClient().get("/metrics").content.decode()
+    )
@@ -1,7 +1,7 @@
 import pytest
 from pytest_unordered import unordered
 from django.forms.models import model_to_dict
-from quotes.models import Rate
+from quotes.models import PerWeightRate, Rate, RateCardVersion
 
 
 @pytest.mark.django_db
@@ -37,15 +37,117 @@ def test_create_with_weight_rates():
     weight_rates2 = rate2.rates.all()
 
     weight_rates_as_dict1 = [
-        model_to_dict(instance, ["min_weight_kg", "max_weight_kg", "per_kg_rate"])
+        model_to_dict(instance, ["min_weight_kg", "max_weight_kg", "per_kg_rate_cents"])
         for instance in weight_rates1
     ]
     weight_rates_as_dict2 = [
-        model_to_dict(instance, ["min_weight_kg", "max_weight_kg", "per_kg_rate"])
+        model_to_dict(instance, ["min_weight_kg", "max_weight_kg", "per_kg_rate_cents"])
         for instance in weight_rates2
     ]
 
     assert len(weight_rates_as_dict1) == 4
-    assert weight_rates_as_dict1 == unordered(weights_for_rate1)
+    # Rates are given as currency amounts and stored in cents.
+    assert weight_rates_as_dict1 == unordered(
+        [
+            {"min_weight_kg": 0, "max_weight_kg": 20, "per_kg_rate_cents": 500},
+            {"min_weight_kg": 20, "max_weight_kg": 40, "per_kg_rate_cents": 450},
+            {"min_weight_kg": 40, "max_weight_kg": 100, "per_kg_rate_cents": 400},
+            {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate_cents": 350},
+        ]
+    )
     assert len(weight_rates_as_dict2) == 1
-    assert weight_rates_as_dict2 == unordered(weights_for_rate2)
+    assert weight_rates_as_dict2 == [
+        {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate_cents": 100}
+    ]
+
+
+@pytest.mark.django_db
+def test_for_lane_and_weight(django_assert_num_queries):
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 20, "per_kg_rate": 5.00},
+            {"min_weight_kg": 20, "max_weight_kg": 40, "per_kg_rate": 4.50},
+        ],
+    )
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="ocean",
+        shipping_time_range_min_days=45,
+        shipping_time_range_max_days=50,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 10000, "per_kg_rate": 1.00}
+        ],
+    )
+    Rate.objects.create_with_weight_rates(
+        starting_country="India",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=10,
+        shipping_time_range_max_days=15,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 10000, "per_kg_rate": 9.50}
+        ],
+    )
+
+    with django_assert_num_queries(1):
+        rates = [
+            (
+                rate.shipping_channel,
+                rate.shipping_time_range_min_days,
+                rate.shipping_time_range_max_days,
+                rate.per_kg_rate_cents,
+            )
+            for rate in PerWeightRate.objects.for_lane_and_weight("China", "USA", 30)
+        ]
+
+    assert rates == [("air", 15, 20, 450), ("ocean", 45, 50, 100)]
+
+
+@pytest.mark.django_db
+def test_for_lane_and_weight_ignores_inactive_rate_cards():
+    staged_version = RateCardVersion.objects.create(name="staged")
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 20, "per_kg_rate": 5.00},
+        ],
+        version=staged_version,
+    )
+
+    assert not PerWeightRate.objects.for_lane_and_weight("China", "USA", 10).exists()
+
+    staged_version.activate()
+
+    assert PerWeightRate.objects.for_lane_and_weight("China", "USA", 10).exists()
+
+
+@pytest.mark.django_db
+def test_rates_default_to_the_active_rate_card():
+    rate = Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[],
+    )
+
+    assert rate.version == RateCardVersion.objects.get_active()
+
+
+@pytest.mark.django_db
+def test_rates_have_no_default_rate_card(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        rate = Rate(starting_country="China", destination_country="USA")
+
+    assert rate.version_id is None
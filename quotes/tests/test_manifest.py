@@ -0,0 +1,113 @@
+import json
+import tracemalloc
+import pytest
+from quotes.manifest import Manifest
+from quotes.quote_cache import get_shipment_fingerprint
+from quotes.utils import Box, QuoteCalculationService, Shipment
+
+
+class TestManifest:
+    def test_shipment_builds_manifest(self):
+        shipment = Shipment.model_validate_json(
+            json.dumps(
+                {
+                    "starting_country": "China",
+                    "destination_country": "USA",
+                    "boxes": [
+                        {
+                            "count": 2,
+                            "weight_kg": 15,
+                            "length": 10,
+                            "width": 20,
+                            "height": 30,
+                        },
+                        {
+                            "count": 1,
+                            "weight_kg": 31.5,
+                            "length": 130,
+                            "width": 1,
+                            "height": 2,
+                        },
+                    ],
+                }
+            )
+        )
+
+        assert isinstance(shipment.boxes, Manifest)
+        assert len(shipment.boxes) == 2
+        assert list(shipment.boxes.count) == [2, 1]
+        assert list(shipment.boxes.weight_kg) == [15, 31.5]
+        assert list(shipment.boxes.volume) == [6000, 260]
+        assert list(shipment.boxes.longest_dimension) == [30, 130]
+
+    def test_shipment_accepts_boxes_and_manifests(self, make_boxes):
+        boxes = make_boxes(3)
+        shipment = Shipment(
+            starting_country="China", destination_country="USA", boxes=boxes
+        )
+
+        assert list(shipment.boxes.volume) == [box.volume for box in boxes]
+        assert (
+            Shipment(
+                starting_country="China",
+                destination_country="USA",
+                boxes=shipment.boxes,
+            ).boxes
+            is shipment.boxes
+        )
+
+    @pytest.mark.usefixtures("surcharge_rules")
+    @pytest.mark.parametrize("starting_country", ["China", "India", "Vietnam"])
+    def test_matches_per_box_aggregation(self, starting_country, make_boxes):
+        boxes = make_boxes(500)
+        manifest = Manifest.from_dicts(box.model_dump() for box in boxes)
+
+        assert QuoteCalculationService.build_shipment_profile(
+            starting_country, manifest
+        ) == QuoteCalculationService.build_shipment_profile(starting_country, boxes)
+
+    def test_fingerprint_ignores_box_order(self, make_boxes):
+        boxes = make_boxes(20)
+
+        assert get_shipment_fingerprint(
+            "China", "USA", Manifest.from_dicts(box.model_dump() for box in boxes)
+        ) == get_shipment_fingerprint(
+            "China",
+            "USA",
+            Manifest.from_dicts(box.model_dump() for box in reversed(boxes)),
+        )
+
+    def test_shares_box_arrays_layout(self, make_boxes):
+        pytest.importorskip("numpy")
+        from quotes.box_arrays import BoxArrays
+
+        manifest = Manifest.from_dicts(box.model_dump() for box in make_boxes(50))
+        box_arrays = BoxArrays.from_manifest(manifest)
+
+        assert box_arrays.sorted_rows_bytes() == manifest.sorted_rows_bytes()
+        assert box_arrays.gross_weight() == pytest.approx(manifest.gross_weight())
+        assert box_arrays.count_oversized(120) == manifest.count_oversized(120)
+
+    def test_uses_a_fraction_of_the_memory_of_boxes(self, make_boxes):
+        body = json.dumps(
+            {
+                "starting_country": "China",
+                "destination_country": "USA",
+                "boxes": [box.model_dump() for box in make_boxes(10_000)],
+            }
+        )
+
+        tracemalloc.start()
+        try:
+            boxes = [Box(**box) for box in json.loads(body)["boxes"]]
+            boxes_memory, _ = tracemalloc.get_traced_memory()
+            del boxes
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            shipment = Shipment.model_validate_json(body)
+            manifest_memory = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+
+        assert len(shipment.boxes) == 10_000
+        assert manifest_memory * 5 < boxes_memory
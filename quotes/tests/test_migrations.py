@@ -0,0 +1,46 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+def migrate(targets=None):
+    # Migrates the test database to targets, the latest migrations by
+    # default, and returns the models as of them.
+    executor = MigrationExecutor(connection)
+    targets = targets or executor.loader.graph.leaf_nodes("quotes")
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_existing_rates_are_assigned_the_initial_rate_card():
+    apps = migrate([("quotes", "0002_rate_lookup_indexes")])
+    Rate = apps.get_model("quotes", "Rate")
+    PerWeightRate = apps.get_model("quotes", "PerWeightRate")
+    for starting_country in ["China", "India"]:
+        rate = Rate.objects.create(
+            starting_country=starting_country,
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=1,
+            shipping_time_range_max_days=2,
+        )
+        PerWeightRate.objects.create(
+            rate=rate, min_weight_kg=0, max_weight_kg=100, per_kg_rate=5.5
+        )
+
+    apps = migrate()
+    Rate = apps.get_model("quotes", "Rate")
+    ActiveRateCard = apps.get_model("quotes", "ActiveRateCard")
+
+    active_version_id = ActiveRateCard.objects.get().version_id
+    assert list(Rate.objects.values_list("version_id", flat=True)) == [
+        active_version_id,
+        active_version_id,
+    ]
+    assert not Rate._meta.get_field("version").null
+    assert set(
+        apps.get_model("quotes", "PerWeightRate").objects.values_list(
+            "per_kg_rate_cents", flat=True
+        )
+    ) == {550}
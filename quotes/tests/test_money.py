@@ -0,0 +1,31 @@
+import pytest
+from quotes.money import round_cents, to_amount, to_cents
+
+
+class TestMoney:
+    @pytest.mark.parametrize(
+        "amount, cents",
+        [(10.2, 1020), ("10.2", 1020), (4, 400), ("1.005", 101), (0.125, 13)],
+    )
+    def test_to_cents(self, amount, cents):
+        assert to_cents(amount) == cents
+
+    @pytest.mark.parametrize("amount", ["cheap", "nan", float("inf"), None])
+    def test_to_cents_rejects_invalid_amounts(self, amount):
+        with pytest.raises(ValueError):
+            to_cents(amount)
+
+    @pytest.mark.parametrize("amount", ["4.555", 0.125, "0.001"])
+    def test_to_cents_exact_rejects_fractions_of_a_cent(self, amount):
+        assert to_cents("4.50", exact=True) == 450
+        with pytest.raises(ValueError, match="fractions of a cent"):
+            to_cents(amount, exact=True)
+
+    def test_to_amount(self):
+        assert to_amount(123456) == 1234.56
+        assert to_amount(to_cents(0.1) + to_cents(0.2)) == 0.3
+
+    def test_round_cents(self):
+        assert round_cents(20.5) == 21
+        assert round_cents(20.49) == 20
+        assert round_cents(3036.0000000001) == 3036
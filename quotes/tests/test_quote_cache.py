@@ -0,0 +1,107 @@
+import time
+import pytest
+from django.conf import settings
+from django.db.models import F
+from quotes.models import ActiveRateCard, PerWeightRate
+from quotes.quote_cache import get_shipment_fingerprint, quote_cache
+from quotes.utils import Box, QuoteCalculationService
+
+
+def test_shipment_fingerprint_is_normalized():
+    boxes = [
+        Box(count=1, weight_kg=10, length=20, width=30, height=40),
+        Box(count=2, weight_kg=5, length=10, width=10, height=10),
+    ]
+    reordered_and_rotated_boxes = [
+        Box(count=2, weight_kg=5, length=10, width=10, height=10),
+        Box(count=1, weight_kg=10, length=40, width=20, height=30),
+    ]
+
+    fingerprint = get_shipment_fingerprint("China", "USA", boxes)
+    assert fingerprint == get_shipment_fingerprint(
+        "China", "USA", reordered_and_rotated_boxes
+    )
+    assert fingerprint != get_shipment_fingerprint("India", "USA", boxes)
+    assert fingerprint != get_shipment_fingerprint("China", "USA", boxes[:1])
+
+
+@pytest.mark.django_db
+def test_repeated_quotes_are_served_from_cache(
+    mocker, django_assert_num_queries, create_china_usa_air_rate
+):
+    create_china_usa_air_rate()
+    boxes = [Box(count=1, weight_kg=10, length=20, width=30, height=40)]
+    build_shipment_profile = mocker.spy(
+        QuoteCalculationService, "build_shipment_profile"
+    )
+
+    quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    with django_assert_num_queries(0):
+        cached_quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+
+    assert cached_quotes == quotes
+    assert build_shipment_profile.call_count == 1
+    assert quote_cache.stats() == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.django_db
+def test_cached_quotes_are_invalidated_by_rate_changes(
+    django_capture_on_commit_callbacks,
+    create_china_usa_air_rate,
+):
+    # Each block stands for a committed transaction.
+    with django_capture_on_commit_callbacks(execute=True):
+        rate = create_china_usa_air_rate()
+    boxes = [Box(count=1, weight_kg=10, length=20, width=30, height=40)]
+
+    quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    assert quotes[0].cost_breakdown.shipping_cost == 50
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rate.delete()
+        create_china_usa_air_rate(
+            [{"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 4.00}]
+        )
+
+    quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    assert quotes[0].cost_breakdown.shipping_cost == 40
+    assert quote_cache.stats() == {"hits": 0, "misses": 2}
+
+
+@pytest.mark.django_db
+def test_quote_cache_can_be_disabled(settings, create_china_usa_air_rate):
+    settings.QUOTES_CACHE_ENABLED = False
+    create_china_usa_air_rate()
+    boxes = [Box(count=1, weight_kg=10, length=20, width=30, height=40)]
+
+    QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+
+    assert quote_cache.stats() == {"hits": 0, "misses": 0}
+
+
+@pytest.mark.django_db
+def test_cached_quotes_follow_changes_committed_elsewhere(
+    mocker, create_china_usa_air_rate
+):
+    create_china_usa_air_rate()
+    boxes = [Box(count=1, weight_kg=10, length=20, width=30, height=40)]
+    quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    assert quotes[0].cost_breakdown.shipping_cost == 50
+
+    # As another process would change rates: no signals and no on_commit
+    # hooks in this one, only the revision bumped in the database.
+    PerWeightRate.objects.update(per_kg_rate_cents=400)
+    ActiveRateCard.objects.update(revision=F("revision") + 1)
+
+    quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    assert quotes[0].cost_breakdown.shipping_cost == 50
+
+    now = time.monotonic()
+    mocker.patch(
+        "quotes.routers.time.monotonic",
+        return_value=now + settings.QUOTES_RATE_TABLE_REVISION_TTL,
+    )
+    quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+    assert quotes[0].cost_breakdown.shipping_cost == 40
+    assert quote_cache.stats() == {"hits": 1, "misses": 2}
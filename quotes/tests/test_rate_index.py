@@ -0,0 +1,153 @@
+import pytest
+from quotes.models import PerWeightRate, Rate, RateCardVersion
+from quotes.rate_index import (
+    RateEntry,
+    RateMatch,
+    WeightBand,
+    get_rate_index,
+    get_rate_table_version,
+)
+
+
+class TestRateEntry:
+    def test_band_for_weight(self):
+        entry = RateEntry(
+            "air",
+            1,
+            2,
+            [
+                WeightBand(20, 40, 450),
+                WeightBand(0, 20, 500),
+                WeightBand(40, 100, 400),
+            ],
+        )
+
+        assert entry.band_for_weight(10) == WeightBand(0, 20, 500)
+        assert entry.band_for_weight(20) == WeightBand(20, 40, 450)
+        assert entry.band_for_weight(100) == WeightBand(40, 100, 400)
+        assert entry.band_for_weight(100.5) is None
+        assert entry.band_for_weight(-1) is None
+
+
+class TestRateIndex:
+    @pytest.mark.django_db
+    def test_rates_for_weight(
+        self, django_assert_num_queries, create_china_usa_air_rate
+    ):
+        create_china_usa_air_rate()
+        Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="ocean",
+            shipping_time_range_min_days=45,
+            shipping_time_range_max_days=50,
+            weight_rates=[
+                {"min_weight_kg": 30, "max_weight_kg": 10000, "per_kg_rate": 1.00}
+            ],
+        )
+
+        # The rate table revision and the rates
+        with django_assert_num_queries(2):
+            index = get_rate_index()
+        with django_assert_num_queries(0):
+            matches = index.rates_for_weight("China", "USA", 35)
+
+        assert matches == [
+            RateMatch("air", 15, 20, 450),
+            RateMatch("ocean", 45, 50, 100),
+        ]
+        assert index.rates_for_weight("China", "USA", 35, {"ocean"}) == [
+            RateMatch("ocean", 45, 50, 100),
+        ]
+        assert index.rates_for_weight("China", "USA", 35, set()) == []
+        assert index.rates_for_weight("India", "USA", 35) == []
+
+    @pytest.mark.django_db
+    def test_rates_for_weights(self, create_china_usa_air_rate):
+        create_china_usa_air_rate()
+
+        index = get_rate_index()
+
+        assert index.rates_for_weights("China", "USA", [10, 20, 500, 40]) == [
+            [RateMatch("air", 15, 20, 500)],
+            [RateMatch("air", 15, 20, 450)],
+            [],
+            [RateMatch("air", 15, 20, 400)],
+        ]
+        assert index.rates_for_weights("India", "USA", [10]) == [[]]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("weight", [0, 10, 20, 20.5, 40, 100, 100.5])
+    def test_matches_the_database_lookup(self, weight, create_china_usa_air_rate):
+        create_china_usa_air_rate()
+        Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="ocean",
+            shipping_time_range_min_days=45,
+            shipping_time_range_max_days=50,
+            weight_rates=[
+                {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 2.00},
+                {"min_weight_kg": 20, "max_weight_kg": 40, "per_kg_rate": 1.50},
+            ],
+        )
+
+        assert get_rate_index().rates_for_weight("China", "USA", weight) == [
+            RateMatch(*rate)
+            for rate in PerWeightRate.objects.for_lane_and_weight(
+                "China", "USA", weight
+            )
+        ]
+
+    @pytest.mark.django_db
+    def test_index_is_reused_until_rates_change(
+        self, django_capture_on_commit_callbacks, create_china_usa_air_rate
+    ):
+        index = get_rate_index()
+        assert get_rate_index() is index
+
+        version = get_rate_table_version()
+        with django_capture_on_commit_callbacks(execute=True):
+            create_china_usa_air_rate()
+
+        assert get_rate_table_version() != version
+        rebuilt_index = get_rate_index()
+        assert rebuilt_index is not index
+        assert rebuilt_index.rates_for_weight("China", "USA", 10) == [
+            RateMatch("air", 15, 20, 500)
+        ]
+
+    @pytest.mark.django_db
+    def test_only_the_active_rate_card_is_indexed(
+        self, django_capture_on_commit_callbacks, create_china_usa_air_rate
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            active_version = RateCardVersion.objects.get_or_create_active()
+            create_china_usa_air_rate()
+        staged_version = RateCardVersion.objects.create(name="staged")
+        Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=5,
+            shipping_time_range_max_days=7,
+            weight_rates=[
+                {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 3.00}
+            ],
+            version=staged_version,
+        )
+
+        index = get_rate_index()
+        assert index.rate_card_version_id == active_version.pk
+        assert index.rates_for_weight("China", "USA", 10) == [
+            RateMatch("air", 15, 20, 500)
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            staged_version.activate()
+
+        index = get_rate_index()
+        assert index.rate_card_version_id == staged_version.pk
+        assert index.rates_for_weight("China", "USA", 10) == [
+            RateMatch("air", 5, 7, 300)
+        ]
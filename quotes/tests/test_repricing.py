@@ -0,0 +1,100 @@
+import json
+import pytest
+from django.core.management import call_command
+from quotes.models import Rate
+from quotes.repricing import reprice_lines
+from quotes.utils import Box, QuoteCalculationService, ShippingQuotesResponse
+
+SHIPMENTS = [
+    {
+        "starting_country": starting_country,
+        "destination_country": "USA",
+        "boxes": [
+            {
+                "count": count,
+                "weight_kg": 12,
+                "length": 40,
+                "width": 30,
+                "height": 20,
+            }
+        ],
+    }
+    for count in range(1, 8)
+    for starting_country in ["China", "India"]
+]
+
+
+@pytest.fixture
+def rates(db):
+    for starting_country in ["China", "India"]:
+        Rate.objects.create_with_weight_rates(
+            starting_country=starting_country,
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=15,
+            shipping_time_range_max_days=20,
+            weight_rates=[
+                {"min_weight_kg": 0, "max_weight_kg": 40, "per_kg_rate": 5.00},
+                {"min_weight_kg": 40, "max_weight_kg": 10000, "per_kg_rate": 4.50},
+            ],
+        )
+
+
+def expected_result(shipment: dict) -> str:
+    return ShippingQuotesResponse(
+        quotes=QuoteCalculationService.calculate_quotes(
+            shipment["starting_country"],
+            shipment["destination_country"],
+            [Box(**box) for box in shipment["boxes"]],
+        )
+    ).model_dump_json()
+
+
+class TestRepriceLines:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_prices_shipments_in_order(self, rates, workers):
+        lines = [json.dumps(shipment) for shipment in SHIPMENTS]
+
+        results = list(reprice_lines(lines, workers=workers, chunk_size=3))
+
+        assert results == [expected_result(shipment) for shipment in SHIPMENTS]
+
+    def test_prices_shipments_in_spawned_workers(self, rates):
+        # Spawned workers import the worker entry points before Django is
+        # set up in them.
+        lines = [json.dumps(shipment) for shipment in SHIPMENTS[:4]]
+
+        results = list(
+            reprice_lines(lines, workers=2, chunk_size=2, start_method="spawn")
+        )
+
+        assert results == [expected_result(shipment) for shipment in SHIPMENTS[:4]]
+
+    def test_reports_invalid_shipments(self, rates):
+        lines = [
+            json.dumps(SHIPMENTS[0]),
+            "",
+            json.dumps({"starting_country": "China", "boxes": []}),
+            "{",
+        ]
+
+        results = [json.loads(result) for result in reprice_lines(lines, workers=1)]
+
+        assert results[0] == json.loads(expected_result(SHIPMENTS[0]))
+        assert results[1] == {"errors": {"destination_country": ["Field required"]}}
+        assert list(results[2]["errors"]) == ["non_field_errors"]
+        assert len(results) == 3
+
+
+def test_reprice_command(rates, tmp_path):
+    shipments = tmp_path / "shipments.jsonl"
+    shipments.write_text("".join(json.dumps(shipment) + "\n" for shipment in SHIPMENTS))
+    output = tmp_path / "quotes.jsonl"
+
+    call_command(
+        "reprice", str(shipments), f"--output={output}", "--workers=2", "--chunk-size=4"
+    )
+
+    assert output.read_text().splitlines() == [
+        expected_result(shipment) for shipment in SHIPMENTS
+    ]
@@ -0,0 +1,224 @@
+import pytest
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+from quotes import routers
+from quotes.models import PerWeightRate, Rate, RateCardVersion, SurchargeRule
+from quotes.routers import ReplicaPool, get_primary_revision, get_revision, quote_reads
+from quotes.utils import Box, QuoteCalculationService
+
+replica_db = pytest.mark.django_db(
+    transaction=True, serialized_rollback=True, databases=["default", "replica"]
+)
+
+
+@pytest.fixture
+def replica(settings):
+    settings.QUOTES_REPLICA_DATABASES = ["replica"]
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=1,
+        shipping_time_range_max_days=2,
+        weight_rates=[{"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00}],
+    )
+    return "replica"
+
+
+class TestReplicaPool:
+    def test_round_robin(self):
+        pool = ReplicaPool()
+
+        assert [
+            pool._candidates(["a", "b", "c"], "round_robin")[0] for _ in range(4)
+        ] == ["a", "b", "c", "a"]
+
+    def test_least_latency(self):
+        pool = ReplicaPool()
+        pool.record_latency("a", 0.010)
+        pool.record_latency("b", 0.002)
+
+        assert pool._candidates(["a", "b", "c"], "least_latency") == ["c", "b", "a"]
+
+        pool.record_latency("c", 0.005)
+        for _ in range(10):
+            pool.record_latency("b", 0.050)
+        assert pool._candidates(["a", "b", "c"], "least_latency") == ["c", "a", "b"]
+
+
+@replica_db
+class TestQuoteReplicaRouter:
+    def test_routes_quote_reads_to_replicas(self, replica):
+        assert Rate.objects.all().db == "default"
+        with quote_reads():
+            assert Rate.objects.all().db == "replica"
+            assert Rate.objects.db_manager().db == "replica"
+            assert PerWeightRate.objects.select_for_update().db == "default"
+
+    def test_quote_lookups_read_from_replica(self, replica, settings):
+        settings.QUOTES_RATE_INDEX_ENABLED = False
+
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            quotes = QuoteCalculationService.calculate_quotes(
+                "China",
+                "USA",
+                [Box(count=1, weight_kg=10, length=10, width=10, height=10)],
+            )
+
+        assert [quote.cost_breakdown.shipping_cost for quote in quotes] == [50]
+        assert len(replica_queries) > 0
+
+    def test_skips_replicas_behind_the_primary(self, replica, monkeypatch):
+        # The primary has a change the replica has not replicated yet.
+        monkeypatch.setattr(
+            routers, "get_primary_revision", lambda: get_revision("default") + 1
+        )
+
+        with quote_reads(), CaptureQueriesContext(
+            connections["replica"]
+        ) as replica_queries:
+            assert Rate.objects.all().db == "default"
+            # Not checked again until REPLICA_RETRY_AFTER has passed.
+            assert Rate.objects.all().db == "default"
+        assert len(replica_queries) == 1
+
+    def test_skips_replicas_behind_an_edit_of_the_active_rate_card(
+        self, replica, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        with quote_reads():
+            assert Rate.objects.all().db == "replica"
+        seen_revision = get_revision("replica")
+
+        # Rates written into the active card keep its version id but not the
+        # revision, which the replica is still behind on.
+        with django_capture_on_commit_callbacks(execute=True):
+            Rate.objects.create_with_weight_rates(
+                starting_country="India",
+                destination_country="USA",
+                shipping_channel="air",
+                shipping_time_range_min_days=1,
+                shipping_time_range_max_days=2,
+                weight_rates=[],
+            )
+        monkeypatch.setattr(
+            routers,
+            "get_revision",
+            lambda alias: seen_revision if alias == "replica" else get_revision(alias),
+        )
+
+        with quote_reads():
+            assert Rate.objects.all().db == "default"
+
+    def test_checks_replicas_once_per_revision(self, replica):
+        with quote_reads(), CaptureQueriesContext(
+            connections["replica"]
+        ) as replica_queries:
+            for _ in range(3):
+                assert Rate.objects.all().db == "replica"
+        assert len(replica_queries) == 1
+
+
+@pytest.mark.django_db
+def test_changes_bump_the_primary_revision(django_capture_on_commit_callbacks):
+    revision = get_primary_revision()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RateCardVersion.objects.create(name="next").activate()
+    assert get_primary_revision() == revision + 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rule = SurchargeRule.objects.get(kind="service", starting_country="China")
+        rule.fee_cents = 35000
+        rule.save()
+    assert get_primary_revision() == revision + 2
+
+    # Read again once the change has committed.
+    with django_capture_on_commit_callbacks(execute=False):
+        rule.save()
+    assert get_primary_revision() == revision + 2
+    assert get_revision("default") == revision + 3
+
+
+def revision_updates(queries) -> int:
+    return sum(
+        query["sql"].startswith('UPDATE "quotes_activeratecard"')
+        for query in queries.captured_queries
+    )
+
+
+@pytest.mark.django_db
+def test_changes_bump_the_primary_revision_once_per_transaction(
+    django_capture_on_commit_callbacks,
+):
+    revision = get_primary_revision()
+    rule = SurchargeRule.objects.get(kind="service", starting_country="China")
+
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(
+        connections["default"]
+    ) as queries:
+        rate = Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=1,
+            shipping_time_range_max_days=2,
+            weight_rates=[],
+        )
+        for min_weight_kg in range(10):
+            PerWeightRate.objects.create(
+                rate=rate,
+                min_weight_kg=min_weight_kg,
+                max_weight_kg=min_weight_kg + 1,
+                per_kg_rate_cents=100,
+            )
+        rule.save()
+
+    assert revision_updates(queries) == 1
+    assert get_primary_revision() == revision + 1
+
+
+@pytest.mark.django_db
+def test_rolled_back_bumps_are_made_again(django_capture_on_commit_callbacks):
+    revision = get_primary_revision()
+    rule = SurchargeRule.objects.get(kind="service", starting_country="China")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(ValueError), transaction.atomic():
+            rule.save()
+            raise ValueError
+        rule.save()
+
+    assert get_primary_revision() == revision + 1
+
+
+@pytest.mark.django_db
+def test_staged_rate_cards_leave_the_primary_revision(
+    django_capture_on_commit_callbacks,
+):
+    revision = get_primary_revision()
+
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(
+        connections["default"]
+    ) as queries:
+        staged_version = RateCardVersion.objects.create(name="staged")
+        rate = Rate.objects.create_with_weight_rates(
+            starting_country="China",
+            destination_country="USA",
+            shipping_channel="air",
+            shipping_time_range_min_days=1,
+            shipping_time_range_max_days=2,
+            weight_rates=[
+                {"min_weight_kg": weight, "max_weight_kg": weight + 1, "per_kg_rate": 1}
+                for weight in range(100)
+            ],
+            version=staged_version,
+        )
+        PerWeightRate.objects.create(
+            rate=rate, min_weight_kg=100, max_weight_kg=200, per_kg_rate_cents=100
+        )
+        staged_version.delete()
+
+    assert revision_updates(queries) == 0
+    # Not a query for each of the 101 bands deleted
+    assert len(queries) < 20
+    assert get_primary_revision() == revision
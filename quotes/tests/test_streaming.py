@@ -0,0 +1,431 @@
+import csv
+import io
+import json
+import random
+import tracemalloc
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+import pytest
+from quotes.manifest import Manifest
+from quotes.models import Rate, SurchargeRule
+from quotes.streaming import (
+    ManifestStreamError,
+    read_box_lines,
+    read_shipment_stream,
+)
+from quotes.utils import QuoteCalculationService
+
+
+async def async_post(path, data, content_type):
+    return await AsyncClient().post(path, data, content_type=content_type)
+
+
+def make_boxes(amount: int) -> list[dict]:
+    generator = random.Random(amount)
+    return [
+        {
+            "count": generator.randint(1, 20),
+            "weight_kg": round(generator.uniform(1, 60), 3),
+            "length": round(generator.uniform(10, 150), 1),
+            "width": round(generator.uniform(10, 150), 1),
+            "height": round(generator.uniform(10, 150), 1),
+        }
+        for _ in range(amount)
+    ]
+
+
+def to_csv(boxes: list[dict], newline: str = "\r\n") -> bytes:
+    body = io.StringIO()
+    writer = csv.DictWriter(
+        body,
+        ["height", "width", "length", "weight_kg", "count"],
+        lineterminator=newline,
+    )
+    writer.writeheader()
+    writer.writerows(boxes)
+    return body.getvalue().encode()
+
+
+def to_ndjson(boxes: list[dict]) -> bytes:
+    return "".join(json.dumps(box) + "\n" for box in boxes).encode()
+
+
+def read(body: bytes, chunk_size: int = 1024):
+    boxes = QuoteCalculationService.create_box_aggregates()
+    fields, errors = read_shipment_stream(io.BytesIO(body), boxes, chunk_size)
+    return fields, boxes, errors
+
+
+@pytest.mark.usefixtures("surcharge_rules")
+class TestReadShipmentStream:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+    @pytest.mark.parametrize("starting_country", ["China", "India", "Vietnam"])
+    def test_matches_manifest_profile(self, chunk_size, starting_country):
+        boxes = make_boxes(300)
+        body = json.dumps(
+            {"boxes": boxes, "destination_country": "USA"}, indent=2
+        ).encode()
+
+        fields, aggregates, errors = read(body, chunk_size)
+
+        assert fields == {"destination_country": "USA"}
+        assert errors == []
+        assert len(aggregates) == 300
+        assert QuoteCalculationService.build_shipment_profile(
+            starting_country, aggregates
+        ) == QuoteCalculationService.build_shipment_profile(
+            starting_country, Manifest.from_dicts(boxes)
+        )
+
+    def test_decodes_characters_split_across_chunks(self):
+        fields, _, _ = read(
+            json.dumps({"starting_country": "Việt Nam", "boxes": []}).encode(), 1
+        )
+
+        assert fields == {"starting_country": "Việt Nam"}
+
+    def test_reports_box_errors(self):
+        _, aggregates, errors = read(
+            json.dumps(
+                {
+                    "boxes": [
+                        {"count": 1, "weight_kg": 1, "length": 1, "width": 1},
+                        make_boxes(1)[0],
+                        "box",
+                    ]
+                }
+            ).encode()
+        )
+
+        assert len(aggregates) == 1
+        assert [(error["loc"], error["msg"]) for error in errors] == [
+            (("boxes", 0, "height"), "Field required"),
+            (("boxes", 2), "Input should be a valid dictionary"),
+        ]
+        assert read(b'{"starting_country": "China"}')[2][0]["loc"] == ("boxes",)
+
+    @pytest.mark.parametrize(
+        "body", [b'{"boxes": [{"count": 1}', b'{"boxes": []}}', b"[]", b"\xff"]
+    )
+    def test_rejects_malformed_json(self, body):
+        with pytest.raises(ManifestStreamError):
+            read(body)
+
+    def test_rejects_values_over_the_length_limit(self):
+        def read_country(length: int):
+            body = io.BytesIO(
+                b'{"starting_country": "' + b"x" * length + b'", "boxes": []}'
+            )
+            read_shipment_stream(
+                body,
+                QuoteCalculationService.create_box_aggregates(),
+                1024,
+                max_value_length=10_000,
+            )
+            return body.tell()
+
+        read_country(9_000)
+        with pytest.raises(ManifestStreamError, match="JSON value is too long"):
+            read_country(1_000_000)
+
+    def test_fails_long_values_without_reading_them_whole(self):
+        body = io.BytesIO(b'{"starting_country": "' + b"x" * 1_000_000 + b'"}')
+
+        with pytest.raises(ManifestStreamError):
+            read_shipment_stream(
+                body,
+                QuoteCalculationService.create_box_aggregates(),
+                1024,
+                max_value_length=10_000,
+            )
+        assert body.tell() < 20_000
+
+    @pytest.mark.parametrize("media_type", [None, "text/csv"])
+    def test_rejects_bodies_over_the_size_limit(self, media_type):
+        boxes = make_boxes(20)
+        body = (
+            to_csv(boxes)
+            if media_type
+            else json.dumps({"starting_country": "China", "boxes": boxes}).encode()
+        )
+
+        def read_body(max_bytes: int):
+            aggregates = QuoteCalculationService.create_box_aggregates()
+            if media_type:
+                read_box_lines(
+                    io.BytesIO(body), aggregates, media_type, 64, max_bytes=max_bytes
+                )
+            else:
+                read_shipment_stream(
+                    io.BytesIO(body), aggregates, 64, max_bytes=max_bytes
+                )
+
+        read_body(len(body))
+        with pytest.raises(ManifestStreamError, match="Request body is too large"):
+            read_body(len(body) - 1)
+
+    def test_memory_does_not_grow_with_the_manifest(self):
+        box = json.dumps(make_boxes(1)[0])
+
+        def peak_memory(amount: int) -> int:
+            body = io.BytesIO(f'{{"boxes": [{", ".join([box] * amount)}]}}'.encode())
+            tracemalloc.start()
+            try:
+                read_shipment_stream(
+                    body, QuoteCalculationService.create_box_aggregates()
+                )
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        # Both bodies span several 64KiB chunks, the larger one ten times as
+        # many.
+        assert peak_memory(20_000) < peak_memory(2_000) * 1.2
+
+
+@pytest.mark.usefixtures("surcharge_rules")
+class TestReadBoxLines:
+    @pytest.mark.parametrize("chunk_size", [1, 5, 64 * 1024])
+    @pytest.mark.parametrize(
+        "media_type, body",
+        [
+            ("text/csv", to_csv(make_boxes(200))),
+            ("text/csv", b"\xef\xbb\xbf" + to_csv(make_boxes(200), newline="\n")),
+            ("application/x-ndjson", to_ndjson(make_boxes(200))),
+        ],
+    )
+    def test_matches_manifest_profile(self, chunk_size, media_type, body):
+        aggregates = QuoteCalculationService.create_box_aggregates()
+
+        errors = read_box_lines(io.BytesIO(body), aggregates, media_type, chunk_size)
+
+        assert errors == []
+        assert len(aggregates) == 200
+        assert QuoteCalculationService.build_shipment_profile(
+            "China", aggregates
+        ) == QuoteCalculationService.build_shipment_profile(
+            "China", Manifest.from_dicts(make_boxes(200))
+        )
+
+    def test_reports_row_errors(self):
+        body = b"count,weight_kg,length,width,height\n1,2,3,4,5\nmany,2,3,4,5\n"
+
+        errors = read_box_lines(
+            io.BytesIO(body),
+            QuoteCalculationService.create_box_aggregates(),
+            "text/csv",
+        )
+
+        assert [(error["loc"], error["type"]) for error in errors] == [
+            (("boxes", 1, "count"), "int_parsing")
+        ]
+
+    def test_reports_missing_csv_columns(self):
+        errors = read_box_lines(
+            io.BytesIO(b"count,weight_kg,length\n1,2,3\n"),
+            QuoteCalculationService.create_box_aggregates(),
+            "text/csv",
+        )
+
+        assert [(error["loc"], error["msg"]) for error in errors] == [
+            (("boxes",), "Missing CSV columns: width, height")
+        ]
+
+    @pytest.mark.parametrize("chunk_size", [1024, 64 * 1024])
+    def test_rejects_lines_over_the_length_limit(self, chunk_size):
+        def read_line(length: int):
+            body = io.BytesIO(to_ndjson(make_boxes(3)) + b" " * length + b"\n")
+            read_box_lines(
+                body,
+                QuoteCalculationService.create_box_aggregates(),
+                "application/x-ndjson",
+                chunk_size,
+                max_line_length=10_000,
+            )
+
+        read_line(9_000)
+        with pytest.raises(ManifestStreamError, match="Line is too long"):
+            read_line(1_000_000)
+
+    def test_fails_long_lines_without_reading_them_whole(self):
+        body = io.BytesIO(b"count," * 1_000_000)
+
+        with pytest.raises(ManifestStreamError):
+            read_box_lines(
+                body,
+                QuoteCalculationService.create_box_aggregates(),
+                "text/csv",
+                1024,
+                max_line_length=10_000,
+            )
+        assert body.tell() < 20_000
+
+    def test_rejects_malformed_ndjson(self):
+        with pytest.raises(ManifestStreamError):
+            read_box_lines(
+                io.BytesIO(b'{"count": 1}\n{"count": \n'),
+                QuoteCalculationService.create_box_aggregates(),
+                "application/x-ndjson",
+            )
+
+
+@pytest.fixture
+def china_usa_rate(db):
+    return Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=15,
+        shipping_time_range_max_days=20,
+        weight_rates=[
+            {"min_weight_kg": 0, "max_weight_kg": 100000, "per_kg_rate": 5.00},
+        ],
+    )
+
+
+class TestStreamedQuoteRequests:
+    def test_quotes_match_buffered_requests(self, china_usa_rate, settings):
+        settings.QUOTES_CACHE_ENABLED = False
+        body = json.dumps(
+            {
+                "starting_country": "China",
+                "destination_country": "USA",
+                "boxes": make_boxes(2000),
+            }
+        )
+        buffered = APIClient().post("/v1/quotes", body, content_type="application/json")
+
+        settings.QUOTES_STREAMING_MIN_BYTES = 0
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 1000
+        streamed = APIClient().post("/v1/quotes", body, content_type="application/json")
+        streamed_async = async_to_sync(async_post)(
+            "/v1/quotes/async", body, content_type="application/json"
+        )
+
+        assert buffered.status_code == 200
+        assert streamed.status_code == 200
+        assert streamed.json() == buffered.json()
+        assert streamed_async.json() == buffered.json()
+
+    def test_errors_match_buffered_requests(self, db, settings):
+        body = json.dumps(
+            {
+                "starting_country": "",
+                "boxes": [
+                    {"count": "many", "weight_kg": 10, "length": 1, "width": 1},
+                ],
+            }
+        )
+        buffered = APIClient().post("/v1/quotes", body, content_type="application/json")
+
+        settings.QUOTES_STREAMING_MIN_BYTES = 0
+        streamed = APIClient().post("/v1/quotes", body, content_type="application/json")
+        streamed_async = async_to_sync(async_post)(
+            "/v1/quotes/async", body, content_type="application/json"
+        )
+
+        assert buffered.status_code == streamed.status_code == 400
+        assert streamed.json() == buffered.json()
+        assert streamed_async.json() == buffered.json()
+
+    def test_malformed_json(self, db, settings):
+        settings.QUOTES_STREAMING_MIN_BYTES = 0
+
+        response = APIClient().post(
+            "/v1/quotes", b'{"boxes": [', content_type="application/json"
+        )
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "JSON parse error"}
+
+
+class TestBoxLineQuoteRequests:
+    @pytest.mark.parametrize(
+        "media_type, encode",
+        [("text/csv", to_csv), ("application/x-ndjson", to_ndjson)],
+    )
+    def test_quotes_match_json_requests(self, china_usa_rate, media_type, encode):
+        boxes = make_boxes(50)
+        expected = APIClient().post(
+            "/v1/quotes",
+            {"starting_country": "China", "destination_country": "USA", "boxes": boxes},
+            format="json",
+        )
+        path = "/v1/quotes?starting_country=China&destination_country=USA"
+
+        response = APIClient().post(path, encode(boxes), content_type=media_type)
+        async_response = async_to_sync(async_post)(
+            path.replace("quotes", "quotes/async"),
+            encode(boxes),
+            content_type=f"{media_type}; charset=utf-8",
+        )
+
+        assert response.status_code == 200
+        assert response.json() == expected.json()
+        assert async_response.json() == expected.json()
+
+    def test_rules_saved_while_reading_boxes(
+        self, china_usa_rate, mocker, django_capture_on_commit_callbacks
+    ):
+        boxes = make_boxes(50)
+        expected = APIClient().post(
+            "/v1/quotes",
+            {"starting_country": "China", "destination_country": "USA", "boxes": boxes},
+            format="json",
+        )
+
+        def read_box_lines_then_save_rule(*args, **kwargs):
+            errors = read_box_lines(*args, **kwargs)
+            rule = SurchargeRule.objects.get(
+                kind=SurchargeRule.Kind.OVERWEIGHT, starting_country=""
+            )
+            rule.threshold = 25
+            with django_capture_on_commit_callbacks(execute=True):
+                rule.save()
+            return errors
+
+        mocker.patch(
+            "quotes.views.read_box_lines", side_effect=read_box_lines_then_save_rule
+        )
+        response = APIClient().post(
+            "/v1/quotes?starting_country=China&destination_country=USA",
+            to_csv(boxes),
+            content_type="text/csv",
+        )
+
+        # Priced with the rules the boxes were counted against.
+        assert response.status_code == 200
+        assert response.json() == expected.json()
+
+    def test_body_size_limit(self, db, settings):
+        settings.QUOTES_STREAMING_MAX_BYTES = 100
+
+        response = APIClient().post(
+            "/v1/quotes?starting_country=China&destination_country=USA",
+            to_csv(make_boxes(10)),
+            content_type="text/csv",
+        )
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "CSV parse error"}
+
+    def test_lane_errors(self, db):
+        response = APIClient().post(
+            "/v1/quotes?starting_country=China",
+            to_csv(make_boxes(1)),
+            content_type="text/csv",
+        )
+
+        assert response.status_code == 400
+        assert response.json() == {"destination_country": ["Field required"]}
+
+    def test_malformed_body(self, db):
+        response = APIClient().post(
+            "/v1/quotes?starting_country=China&destination_country=USA",
+            b"{",
+            content_type="application/x-ndjson",
+        )
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "NDJSON parse error"}
@@ -0,0 +1,180 @@
+import math
+import pickle
+import pytest
+from django.contrib.admin.sites import site
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from quotes.models import SurchargeRule
+from quotes.streaming import BoxAggregates
+from quotes.surcharges import SurchargeRules, get_surcharge_rules
+from quotes.utils import Box, QuoteCalculationService
+
+DEFAULT_RULES = [
+    ("service", "", None, False, 0),
+    ("overweight", "", 30, False, 8000),
+    ("oversized", "", 120, False, 10000),
+]
+
+
+class TestSurchargeRules:
+    def test_compiles_rules_per_starting_country(self):
+        rules = SurchargeRules(
+            None,
+            DEFAULT_RULES
+            + [
+                ("service", "China", None, False, 30000),
+                ("overweight", "India", 15, True, 6000),
+                ("oversized", "Vietnam", 70, True, 10000),
+            ],
+        )
+
+        assert rules.for_origin("China").service_fee_cents == 30000
+        assert rules.for_origin("Peru").service_fee_cents == 0
+
+        india = rules.for_origin("India")
+        assert (india.overweight_fee_cents, india.overweight_limit) == (
+            6000,
+            (15, True),
+        )
+        assert india.is_overweight(15)
+        assert not india.is_overweight(14.9)
+        assert india.oversize_limit == (120, False)
+
+        vietnam = rules.for_origin("Vietnam")
+        assert vietnam.is_oversized(70)
+        assert not vietnam.is_oversized(69)
+        assert not vietnam.is_overweight(30)
+        assert vietnam.is_overweight(30.5)
+
+        assert rules.overweight_limits() == {(30, False), (15, True)}
+        assert rules.oversize_limits() == {(120, False), (70, True)}
+
+    def test_skips_invalid_rules(self, caplog):
+        rules = SurchargeRules(
+            None,
+            DEFAULT_RULES
+            + [
+                ("overweight", "Peru", None, False, 5000),
+                ("oversized", "Peru", 100, False, 4000),
+                ("pallet", "Peru", 10, False, 1000),
+            ],
+        )
+
+        peru = rules.for_origin("Peru")
+        assert peru.overweight_limit == (30, False)
+        assert peru.oversize_limit == (100, False)
+        assert rules.overweight_limits() == {(30, False)}
+        assert [record.levelname for record in caplog.records] == ["ERROR", "ERROR"]
+
+    def test_missing_default_rules_charge_nothing(self, caplog):
+        rules = SurchargeRules(
+            None, DEFAULT_RULES[:2] + [("oversized", "Vietnam", 70, False, 10000)]
+        )
+
+        assert rules.for_origin("Peru").oversize_limit == (math.inf, False)
+        assert rules.for_origin("Peru").oversized_fee_cents == 0
+        assert not rules.for_origin("Peru").is_oversized(10**6)
+        assert rules.for_origin("Vietnam").is_oversized(71)
+        assert "No default oversized surcharge rule" in caplog.text
+
+    def test_pickles(self):
+        peru = pickle.loads(
+            pickle.dumps(SurchargeRules(None, DEFAULT_RULES))
+        ).for_origin("Peru")
+
+        assert peru.overweight_limit == (30, False)
+        assert peru.is_overweight(31)
+        assert not peru.is_overweight(30)
+
+    def test_box_aggregates_count_inclusive_limits(self):
+        aggregates = BoxAggregates([(15, True)], [(70, True), (70, False)])
+        for weight_kg, length in [(15, 70), (10, 71)]:
+            aggregates.add(
+                {
+                    "count": 1,
+                    "weight_kg": weight_kg,
+                    "length": length,
+                    "width": 1,
+                    "height": 1,
+                }
+            )
+
+        assert aggregates.count_overweight(15, True) == 1
+        assert aggregates.count_oversized(70, inclusive=True) == 2
+        assert aggregates.count_oversized(70) == 1
+
+
+@pytest.mark.django_db
+class TestStoredSurchargeRules:
+    def test_migration_seeds_current_surcharges(self):
+        rules = get_surcharge_rules()
+
+        assert rules.for_origin("China").service_fee_cents == 30000
+        assert rules.for_origin("India").overweight_limit == (15, True)
+        assert rules.for_origin("Vietnam").oversize_limit == (70, False)
+        assert rules.for_origin("Peru").overweight_limit == (30, False)
+        assert rules.for_origin("Peru").oversize_limit == (120, False)
+
+    def test_is_loaded_once_per_rate_table_version(
+        self, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        # The rate table revision and the rules
+        with django_assert_num_queries(2):
+            rules = get_surcharge_rules()
+            assert get_surcharge_rules() is rules
+
+        with django_capture_on_commit_callbacks(execute=True):
+            SurchargeRule.objects.create(
+                kind=SurchargeRule.Kind.SERVICE, starting_country="Peru", fee_cents=5000
+            )
+
+        assert get_surcharge_rules() is not rules
+        assert get_surcharge_rules().for_origin("Peru").service_fee_cents == 5000
+
+    def test_fees_over_a_threshold_need_one(self):
+        rule = SurchargeRule(
+            kind=SurchargeRule.Kind.OVERWEIGHT, starting_country="Peru", fee_cents=5000
+        )
+
+        with pytest.raises(ValidationError) as error:
+            rule.full_clean()
+        assert list(error.value.message_dict) == ["threshold"]
+        with pytest.raises(IntegrityError):
+            rule.save()
+
+    def test_default_rules_cannot_be_deleted_in_the_admin(self, rf, admin_user):
+        request = rf.get("/")
+        request.user = admin_user
+        rule_admin = site._registry[SurchargeRule]
+        default = SurchargeRule.objects.get(kind="overweight", starting_country="")
+        india = SurchargeRule.objects.get(kind="overweight", starting_country="India")
+
+        assert not rule_admin.has_delete_permission(request, default)
+        assert rule_admin.has_delete_permission(request, india)
+        assert rule_admin.get_readonly_fields(request, default) == (
+            "kind",
+            "starting_country",
+        )
+
+    def test_new_rules_apply_to_quotes(self, django_capture_on_commit_callbacks):
+        boxes = [Box(count=1, weight_kg=25, length=90, width=10, height=10)]
+        with django_capture_on_commit_callbacks(execute=True):
+            SurchargeRule.objects.create(
+                kind=SurchargeRule.Kind.OVERWEIGHT,
+                starting_country="Peru",
+                threshold=20,
+                fee_cents=5000,
+            )
+            SurchargeRule.objects.create(
+                kind=SurchargeRule.Kind.OVERSIZED,
+                starting_country="Peru",
+                threshold=80,
+                fee_cents=4000,
+            )
+
+        profile = QuoteCalculationService.build_shipment_profile("Peru", boxes)
+
+        assert (
+            profile.overweight_fee_cents,
+            profile.oversized_fee_cents,
+        ) == (5000, 4000)
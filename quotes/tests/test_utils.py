@@ -1,10 +1,19 @@
 import pytest
+from django.http import QueryDict
+from rest_framework.test import APIClient
 from model_bakery.recipe import Recipe, foreign_key
+from quotes.models import Rate, RateCardVersion
+from quotes.quote_cache import quote_cache
+from pydantic import ValidationError
+from quotes.rate_index import RateMatch
 from quotes.utils import (
     QuoteCalculationService,
     Box,
     Quote,
     QuotePriceBreakdown,
+    QuoteSelection,
+    Shipment,
+    ShipmentProfile,
     ShippingTimeRange,
 )
 
@@ -66,9 +75,10 @@ INITIAL_DB_DATA = [
 
 class TestQuoteCalculationService:
     @pytest.mark.django_db
-    def test_calculate_quotes_from_china(self, mocker):
+    def test_calculate_quotes_from_china(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="China",
             destination_country="USA",
             shipping_channel="air",
@@ -76,18 +86,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=10, length=200, width=100, height=20),
@@ -106,6 +111,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=3536.20,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -119,9 +125,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_oversized_from_vietnam(self, mocker):
+    def test_calculate_quotes_oversized_from_vietnam(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="Vietnam",
             destination_country="USA",
             shipping_channel="air",
@@ -129,18 +136,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=10, length=20, width=10, height=20),
@@ -159,6 +161,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=406,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -172,9 +175,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_standard_from_vietnam(self, mocker):
+    def test_calculate_quotes_standard_from_vietnam(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="Vietnam",
             destination_country="USA",
             shipping_channel="air",
@@ -182,18 +186,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=10, length=20, width=10, height=20),
@@ -212,6 +211,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=306,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -225,9 +225,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_oversized(self, mocker):
+    def test_calculate_quotes_oversized(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="Peru",
             destination_country="USA",
             shipping_channel="air",
@@ -235,18 +236,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=10, length=20, width=10, height=20),
@@ -265,6 +261,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=406,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -278,9 +275,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_overweight(self, mocker):
+    def test_calculate_quotes_overweight(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="Peru",
             destination_country="USA",
             shipping_channel="air",
@@ -288,18 +286,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=50, length=20, width=10, height=20),
@@ -318,6 +311,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=1894,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -331,9 +325,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_oversized_and_overweight(self, mocker):
+    def test_calculate_quotes_oversized_and_overweight(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="Peru",
             destination_country="USA",
             shipping_channel="air",
@@ -341,18 +336,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=50, length=20, width=10, height=200),
@@ -371,6 +361,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=2094,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -384,9 +375,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_standard_from_india(self, mocker):
+    def test_calculate_quotes_standard_from_india(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="India",
             destination_country="USA",
             shipping_channel="air",
@@ -394,18 +386,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=2,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=12, length=20, width=10, height=50),
@@ -424,6 +411,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=2,
             ),
+            total_cost=387.6,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -437,9 +425,10 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_overweight_from_india(self, mocker):
+    def test_calculate_quotes_overweight_from_india(self):
         rate = Recipe(
             "quotes.Rate",
+            version=RateCardVersion.objects.get_or_create_active,
             starting_country="India",
             destination_country="USA",
             shipping_channel="air",
@@ -447,18 +436,13 @@ class TestQuoteCalculationService:
             shipping_time_range_max_days=4,
         )
 
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[
-                Recipe(
-                    "quotes.PerWeightRate",
-                    min_weight_kg=10,
-                    max_weight_kg=2000,
-                    per_kg_rate=10.2,
-                    rate=foreign_key(rate),
-                ).make()
-            ],
-        )
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=10,
+            max_weight_kg=2000,
+            per_kg_rate_cents=1020,
+            rate=foreign_key(rate),
+        ).make()
 
         test_boxes = [
             Box(count=1, weight_kg=20, length=20, width=10, height=50),
@@ -477,6 +461,7 @@ class TestQuoteCalculationService:
                 min_days=1,
                 max_days=4,
             ),
+            total_cost=976,
         )
 
         quotes = QuoteCalculationService.calculate_quotes(
@@ -490,12 +475,7 @@ class TestQuoteCalculationService:
         )
 
     @pytest.mark.django_db
-    def test_calculate_quotes_no_results(self, mocker):
-        mocker.patch(
-            "quotes.models.PerWeightRate.objects.filter",
-            return_value=[],
-        )
-
+    def test_calculate_quotes_no_results(self):
         test_boxes = [
             Box(count=1, weight_kg=290, length=20, width=10, height=50),
             Box(count=2, weight_kg=390, length=21, width=11, height=50),
@@ -507,3 +487,478 @@ class TestQuoteCalculationService:
             test_boxes,
         )
         assert len(quotes) == 0
+
+
+class TestQuoteCalculationServiceQueries:
+    @pytest.fixture
+    def lane_with_several_channels(self):
+        for shipping_channel in ["air", "express", "ocean"]:
+            Rate.objects.create_with_weight_rates(
+                starting_country="China",
+                destination_country="USA",
+                shipping_channel=shipping_channel,
+                shipping_time_range_min_days=1,
+                shipping_time_range_max_days=2,
+                weight_rates=[
+                    {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00},
+                    {"min_weight_kg": 100, "max_weight_kg": 10000, "per_kg_rate": 4.00},
+                ],
+            )
+
+    @pytest.mark.django_db
+    def test_calculate_quotes_from_rate_index(
+        self, lane_with_several_channels, surcharge_rules, django_assert_num_queries
+    ):
+        test_boxes = [Box(count=3, weight_kg=50, length=20, width=10, height=20)]
+
+        with django_assert_num_queries(1):
+            quotes = QuoteCalculationService.calculate_quotes(
+                "China", "USA", test_boxes
+            )
+        assert len(quotes) == 3
+
+        with django_assert_num_queries(0):
+            quotes = QuoteCalculationService.calculate_quotes(
+                "China", "USA", test_boxes
+            )
+        assert len(quotes) == 3
+
+    @pytest.mark.django_db
+    def test_calculate_quotes_from_database(
+        self,
+        lane_with_several_channels,
+        surcharge_rules,
+        django_assert_num_queries,
+        settings,
+    ):
+        settings.QUOTES_RATE_INDEX_ENABLED = False
+        test_boxes = [Box(count=3, weight_kg=50, length=20, width=10, height=20)]
+
+        with django_assert_num_queries(1):
+            quotes = QuoteCalculationService.calculate_quotes(
+                "China", "USA", test_boxes
+            )
+
+        assert [quote.shipping_channel for quote in quotes] == [
+            "air",
+            "express",
+            "ocean",
+        ]
+        assert all(quote.cost_breakdown.shipping_cost == 600 for quote in quotes)
+
+    @pytest.mark.django_db
+    def test_calculate_batch_quotes_from_database(
+        self,
+        lane_with_several_channels,
+        surcharge_rules,
+        django_assert_num_queries,
+        settings,
+    ):
+        settings.QUOTES_RATE_INDEX_ENABLED = False
+        shipments = [
+            Shipment(
+                starting_country="China",
+                destination_country="USA",
+                boxes=[Box(count=count, weight_kg=50, length=20, width=10, height=20)],
+            )
+            for count in [1, 3]
+        ] + [
+            Shipment(
+                starting_country="India",
+                destination_country="USA",
+                boxes=[Box(count=1, weight_kg=50, length=20, width=10, height=20)],
+            )
+        ]
+
+        with django_assert_num_queries(1):
+            batch_quotes = QuoteCalculationService.calculate_batch_quotes(shipments)
+
+        assert [
+            [quote.cost_breakdown.shipping_cost for quote in quotes]
+            for quotes in batch_quotes
+        ] == [[250, 250, 250], [600, 600, 600], []]
+
+    @pytest.mark.django_db
+    def test_pricing_paths_give_equal_quotes(
+        self, lane_with_several_channels, surcharge_rules
+    ):
+        boxes = [
+            Box(count=3, weight_kg=12.345, length=33.3, width=21.7, height=19.1),
+            Box(count=1, weight_kg=31.01, length=125, width=10, height=10),
+        ]
+        shipment = Shipment(
+            starting_country="China", destination_country="USA", boxes=boxes
+        )
+
+        quotes = QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+
+        # Box lines, the columnar manifest, the batch path and the cached
+        # quotes all agree exactly, totals included.
+        assert QuoteCalculationService.calculate_batch_quotes([shipment]) == [quotes]
+        for _ in range(2):
+            assert (
+                QuoteCalculationService.calculate_quotes("China", "USA", shipment.boxes)
+                == quotes
+            )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("amount", range(1500, 1530))
+    def test_large_manifests_give_equal_quotes_on_every_path(
+        self,
+        create_china_usa_air_rate,
+        surcharge_rules,
+        make_boxes,
+        amount,
+        settings,
+    ):
+        settings.QUOTES_CACHE_ENABLED = False
+        create_china_usa_air_rate(
+            [{"min_weight_kg": 0, "max_weight_kg": 10_000_000, "per_kg_rate": 4.50}]
+        )
+        # Sizes in whole cm make volumetric weights thirds and sixths, so
+        # costs often land on half a cent and would round apart on weights
+        # differing in the last bit.
+        boxes = [
+            Box(
+                count=box.count,
+                weight_kg=round(box.weight_kg, 2),
+                length=round(box.length),
+                width=round(box.width),
+                height=round(box.height),
+            )
+            for box in make_boxes(amount)
+        ]
+        assert len(boxes) >= settings.QUOTES_VECTORIZE_MIN_BOXES
+        shipment = {
+            "starting_country": "China",
+            "destination_country": "USA",
+            "boxes": [box.model_dump() for box in boxes],
+        }
+        client = APIClient()
+
+        # Box arrays, the columnar manifest, box aggregates and box lines.
+        quotes = client.post("/v1/quotes", shipment, format="json").json()
+        assert (
+            client.post(
+                "/v1/quotes/batch", {"shipments": [shipment]}, format="json"
+            ).json()["results"][0]
+            == quotes
+        )
+        settings.QUOTES_STREAMING_MIN_BYTES = 0
+        assert client.post("/v1/quotes", shipment, format="json").json() == quotes
+        assert [
+            quote.model_dump(mode="json")
+            for quote in QuoteCalculationService.calculate_quotes("China", "USA", boxes)
+        ] == quotes["quotes"]
+
+    @pytest.mark.django_db
+    def test_fees_count_every_surcharged_box(self):
+        Recipe(
+            "quotes.PerWeightRate",
+            min_weight_kg=0,
+            max_weight_kg=2000,
+            per_kg_rate_cents=100,
+            rate=foreign_key(
+                Recipe(
+                    "quotes.Rate",
+                    version=RateCardVersion.objects.get_or_create_active,
+                    starting_country="Peru",
+                    destination_country="USA",
+                    shipping_channel="air",
+                )
+            ),
+        ).make()
+
+        test_boxes = [
+            Box(count=1, weight_kg=50, length=200, width=10, height=20),
+            Box(count=1, weight_kg=10, length=20, width=10, height=20),
+        ]
+
+        quotes = QuoteCalculationService.calculate_quotes("Peru", "USA", test_boxes)
+        assert quotes[0].cost_breakdown.oversized_fee == 100
+        assert quotes[0].cost_breakdown.overweight_fee == 80
+
+
+class TestQuoteSelection:
+    @pytest.fixture
+    def lane_with_different_channels(self):
+        for shipping_channel, min_days, per_kg_rate in [
+            ("air", 5, 5.00),
+            ("express", 1, 8.00),
+            ("ocean", 30, 1.00),
+        ]:
+            Rate.objects.create_with_weight_rates(
+                starting_country="China",
+                destination_country="USA",
+                shipping_channel=shipping_channel,
+                shipping_time_range_min_days=min_days,
+                shipping_time_range_max_days=min_days + 10,
+                weight_rates=[
+                    {
+                        "min_weight_kg": 0,
+                        "max_weight_kg": 10000,
+                        "per_kg_rate": per_kg_rate,
+                    },
+                ],
+            )
+
+    def test_from_query(self):
+        selection = QuoteSelection.from_query(
+            QueryDict("channel=air,ocean&channel=express&sort=min_days&limit=2")
+        )
+        assert selection == QuoteSelection(
+            channel=frozenset(["air", "express", "ocean"]), sort="min_days", limit=2
+        )
+        assert QuoteSelection.from_query(QueryDict("")) is None
+
+    @pytest.mark.parametrize("query", ["sort=max_days", "limit=0", "limit=all"])
+    def test_from_query_invalid(self, query):
+        with pytest.raises(ValidationError):
+            QuoteSelection.from_query(QueryDict(query))
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("cache_enabled", [True, False])
+    @pytest.mark.parametrize("rate_index_enabled", [True, False])
+    @pytest.mark.parametrize(
+        "selection, channels",
+        [
+            (QuoteSelection(sort="total_cost"), ["ocean", "air", "express"]),
+            (QuoteSelection(sort="total_cost", limit=2), ["ocean", "air"]),
+            (QuoteSelection(sort="min_days", limit=1), ["express"]),
+            (QuoteSelection(channel=frozenset(["ocean", "air"])), ["air", "ocean"]),
+            (QuoteSelection(channel=frozenset(["ocean", "air"]), limit=1), ["air"]),
+            (QuoteSelection(channel=frozenset()), []),
+        ],
+    )
+    def test_calculate_quotes_with_selection(
+        self,
+        lane_with_different_channels,
+        settings,
+        cache_enabled,
+        rate_index_enabled,
+        selection,
+        channels,
+    ):
+        settings.QUOTES_CACHE_ENABLED = cache_enabled
+        settings.QUOTES_RATE_INDEX_ENABLED = rate_index_enabled
+        test_boxes = [Box(count=1, weight_kg=10, length=20, width=10, height=20)]
+
+        quotes = QuoteCalculationService.calculate_quotes(
+            "China", "USA", test_boxes, selection
+        )
+
+        assert [quote.shipping_channel for quote in quotes] == channels
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("cache_enabled", [True, False])
+    def test_prices_only_selected_rates(
+        self, lane_with_different_channels, settings, mocker, cache_enabled
+    ):
+        settings.QUOTES_CACHE_ENABLED = cache_enabled
+        price_shipment_profile = mocker.spy(
+            QuoteCalculationService, "price_shipment_profile"
+        )
+        test_boxes = [Box(count=1, weight_kg=10, length=20, width=10, height=20)]
+
+        QuoteCalculationService.calculate_quotes(
+            "China", "USA", test_boxes, QuoteSelection(sort="total_cost", limit=1)
+        )
+
+        _, rates = price_shipment_profile.call_args.args
+        assert [rate.shipping_channel for rate in rates] == ["ocean"]
+
+    @pytest.mark.django_db
+    def test_caches_quotes_per_selection(self, lane_with_different_channels):
+        test_boxes = [Box(count=1, weight_kg=10, length=20, width=10, height=20)]
+        cheapest = QuoteSelection(sort="total_cost", limit=1)
+
+        for selection in [None, cheapest, cheapest, None]:
+            QuoteCalculationService.calculate_quotes(
+                "China", "USA", test_boxes, selection
+            )
+
+        assert quote_cache.stats() == {"hits": 2, "misses": 2}
+        assert [
+            quote.shipping_channel
+            for quote in QuoteCalculationService.calculate_quotes(
+                "China", "USA", test_boxes, cheapest
+            )
+        ] == ["ocean"]
+
+
+@pytest.mark.usefixtures("surcharge_rules")
+class TestShipmentProfile:
+    def test_build_shipment_profile(self):
+        profile = QuoteCalculationService.build_shipment_profile(
+            "China",
+            [
+                Box(count=1, weight_kg=10, length=200, width=100, height=20),
+                Box(count=2, weight_kg=40, length=21, width=11, height=30),
+            ],
+        )
+
+        assert profile == ShipmentProfile(
+            starting_country="China",
+            chargeable_weight=90,
+            service_fee_cents=30000,
+            oversized_fee_cents=10000,
+            overweight_fee_cents=8000,
+        )
+
+    def test_price_shipment_profile(self):
+        profile = ShipmentProfile(
+            starting_country="China",
+            chargeable_weight=90,
+            service_fee_cents=30000,
+            oversized_fee_cents=10000,
+            overweight_fee_cents=8000,
+        )
+
+        quotes = QuoteCalculationService.price_shipment_profile(
+            profile,
+            [RateMatch("air", 1, 2, 450), RateMatch("ocean", 30, 40, 125)],
+        )
+
+        assert [quote.model_dump(mode="json") for quote in quotes] == [
+            {
+                "shipping_channel": "air",
+                "total_cost": 885.0,
+                "cost_breakdown": {
+                    "shipping_cost": 405.0,
+                    "service_fee": 300.0,
+                    "oversized_fee": 100.0,
+                    "overweight_fee": 80.0,
+                },
+                "shipping_time_range": {"min_days": 1, "max_days": 2},
+            },
+            {
+                "shipping_channel": "ocean",
+                "total_cost": 592.5,
+                "cost_breakdown": {
+                    "shipping_cost": 112.5,
+                    "service_fee": 300.0,
+                    "oversized_fee": 100.0,
+                    "overweight_fee": 80.0,
+                },
+                "shipping_time_range": {"min_days": 30, "max_days": 40},
+            },
+        ]
+
+    def test_totals_are_exact_to_the_cent(self):
+        profile = ShipmentProfile(
+            starting_country="Peru",
+            chargeable_weight=0.5,
+            service_fee_cents=10,
+            oversized_fee_cents=0,
+            overweight_fee_cents=0,
+        )
+
+        [quote] = QuoteCalculationService.price_shipment_profile(
+            profile, [RateMatch("air", 1, 2, 40)]
+        )
+
+        assert quote.cost_breakdown.shipping_cost == 0.2
+        # Adding the float amounts would give 0.30000000000000004.
+        assert quote.total_cost == 0.3
+
+    @pytest.mark.django_db
+    def test_fees_are_computed_once_per_shipment(self, mocker):
+        for shipping_channel in ["air", "express", "ocean"]:
+            Rate.objects.create_with_weight_rates(
+                starting_country="China",
+                destination_country="USA",
+                shipping_channel=shipping_channel,
+                shipping_time_range_min_days=1,
+                shipping_time_range_max_days=2,
+                weight_rates=[
+                    {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00}
+                ],
+            )
+        oversized_fee = mocker.spy(
+            QuoteCalculationService, "_calculate_boxes_oversized_fee"
+        )
+
+        quotes = QuoteCalculationService.calculate_quotes(
+            "China", "USA", [Box(count=1, weight_kg=10, length=1, width=1, height=1)]
+        )
+
+        assert len(quotes) == 3
+        assert oversized_fee.call_count == 1
+
+
+class TestQuoteMatrix:
+    @pytest.fixture
+    def lanes(self):
+        for starting_country in ["China", "India", "Vietnam"]:
+            for destination_country in ["USA", "Peru"]:
+                Rate.objects.create_with_weight_rates(
+                    starting_country=starting_country,
+                    destination_country=destination_country,
+                    shipping_channel="air",
+                    shipping_time_range_min_days=1,
+                    shipping_time_range_max_days=2,
+                    weight_rates=[
+                        {"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00},
+                        {
+                            "min_weight_kg": 100,
+                            "max_weight_kg": 10000,
+                            "per_kg_rate": 4,
+                        },
+                    ],
+                )
+
+    boxes = [
+        Box(count=2, weight_kg=20, length=100, width=50, height=20),
+        Box(count=1, weight_kg=40, length=80, width=60, height=40),
+    ]
+
+    @pytest.mark.usefixtures("surcharge_rules")
+    def test_aggregate_boxes(self):
+        aggregates = QuoteCalculationService.aggregate_boxes(self.boxes)
+
+        for starting_country in ["China", "India", "Vietnam", "Peru"]:
+            assert QuoteCalculationService.build_shipment_profile(
+                starting_country, aggregates
+            ) == QuoteCalculationService.build_shipment_profile(
+                starting_country, self.boxes
+            )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("rate_index_enabled", [True, False])
+    def test_matches_lane_quotes(self, lanes, settings, rate_index_enabled):
+        settings.QUOTES_RATE_INDEX_ENABLED = rate_index_enabled
+
+        matrix = QuoteCalculationService.calculate_quote_matrix(self.boxes)
+
+        assert list(matrix) == ["China", "India", "Vietnam"]
+        for starting_country, row in matrix.items():
+            assert list(row) == ["Peru", "USA"]
+            for destination_country, quotes in row.items():
+                assert quotes == QuoteCalculationService.calculate_quotes(
+                    starting_country, destination_country, self.boxes
+                )
+
+    @pytest.mark.django_db
+    def test_filters_lanes_in_one_query(
+        self, lanes, surcharge_rules, settings, django_assert_num_queries
+    ):
+        settings.QUOTES_RATE_INDEX_ENABLED = False
+
+        with django_assert_num_queries(1):
+            matrix = QuoteCalculationService.calculate_quote_matrix(
+                self.boxes,
+                starting_countries=["India", "Vietnam", "Japan"],
+                destination_countries=["USA"],
+            )
+
+        assert {
+            starting_country: list(row) for starting_country, row in matrix.items()
+        } == {"India": ["USA"], "Vietnam": ["USA"]}
+
+    @pytest.mark.django_db
+    def test_builds_one_profile_per_starting_country(self, lanes, mocker):
+        build_profile = mocker.spy(QuoteCalculationService, "build_shipment_profile")
+
+        QuoteCalculationService.calculate_quote_matrix(self.boxes)
+
+        assert build_profile.call_count == 3
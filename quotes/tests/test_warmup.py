@@ -0,0 +1,50 @@
+import pytest
+from django.apps import apps
+from django.db import OperationalError
+from quotes.models import Rate
+from quotes.quote_cache import quote_cache
+from quotes.rate_index import get_rate_index
+from quotes.warmup import warm_up
+
+# Warming up closes the connections it used, which a test transaction would
+# not survive.
+warm_up_db = pytest.mark.django_db(transaction=True, serialized_rollback=True)
+
+
+@warm_up_db
+def test_warm_up_loads_rates_and_prices_a_quote(django_assert_num_queries):
+    Rate.objects.create_with_weight_rates(
+        starting_country="China",
+        destination_country="USA",
+        shipping_channel="air",
+        shipping_time_range_min_days=1,
+        shipping_time_range_max_days=2,
+        weight_rates=[{"min_weight_kg": 0, "max_weight_kg": 100, "per_kg_rate": 5.00}],
+    )
+
+    timings = warm_up()
+
+    assert list(timings) == ["urls", "validators", "rates", "quote", "total"]
+    assert all(duration >= 0 for duration in timings.values())
+    assert quote_cache.stats() == {"hits": 0, "misses": 0}
+    with django_assert_num_queries(0):
+        assert get_rate_index().filter_lanes() == [("China", "USA")]
+
+
+def test_warm_up_skips_rates_when_the_database_is_unavailable(mocker):
+    mocker.patch(
+        "quotes.warmup.get_surcharge_rules",
+        side_effect=OperationalError("no such table: quotes_surchargerule"),
+    )
+
+    assert list(warm_up()) == ["urls", "validators", "rates", "total"]
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_ready_warms_up_when_enabled(settings, mocker, enabled):
+    settings.QUOTES_WARM_UP = enabled
+    warm_up = mocker.patch("quotes.warmup.warm_up")
+
+    apps.get_app_config("quotes").ready()
+
+    assert warm_up.called is enabled
@@ -1,4 +1,19 @@
 from django.urls import path
 from quotes import views
+from quotes.instrumentation import instrumented
 
-urlpatterns = [path("", view=views.ShippingQuotesView.as_view())]
+urlpatterns = [
+    path("quotes", view=instrumented("quotes")(views.ShippingQuotesView.as_view())),
+    path(
+        "quotes/async",
+        view=instrumented("quotes_async")(views.AsyncShippingQuotesView.as_view()),
+    ),
+    path(
+        "quotes/batch",
+        view=instrumented("quotes_batch")(views.ShippingQuotesBatchView.as_view()),
+    ),
+    path(
+        "quotes/matrix",
+        view=instrumented("quotes_matrix")(views.QuoteMatrixView.as_view()),
+    ),
+]
@@ -1,6 +1,26 @@
 import functools
+import heapq
+import itertools
+import math
+from typing import Iterable, Literal, Optional, Union
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from quotes.box_arrays import BoxArrays
+from quotes.instrumentation import stage
+from quotes.manifest import Manifest
+from quotes.money import round_cents, to_amount
+from quotes.streaming import BoxAggregates
 from quotes.models import PerWeightRate
-from pydantic import BaseModel, computed_field
+from quotes.quote_cache import quote_cache
+from quotes.rate_index import RateIndex, aget_rate_index, get_rate_index
+from quotes.routers import quote_reads
+from quotes.surcharges import (
+    OriginSurcharges,
+    SurchargeRules,
+    aget_surcharge_rules,
+    get_surcharge_rules,
+)
+from pydantic import BaseModel, Field
 
 
 class Box(BaseModel):
@@ -19,6 +39,70 @@ class Box(BaseModel):
         return max(self.length, self.width, self.height)
 
 
+class ShipmentLane(BaseModel):
+    starting_country: str = Field(min_length=1)
+    destination_country: str = Field(min_length=1)
+
+
+class Shipment(ShipmentLane):
+    boxes: Manifest
+
+
+Boxes = Union[list[Box], Manifest, BoxArrays, BoxAggregates]
+# Box collections aggregated column by column rather than box by box.
+COLUMNAR_BOXES = (Manifest, BoxArrays, BoxAggregates)
+
+
+class QuoteMatrixRequest(BaseModel):
+    boxes: Manifest
+    # Unset filters match every origin or destination with a rate.
+    starting_countries: Optional[list[str]] = None
+    destination_countries: Optional[list[str]] = None
+
+
+class QuoteSelection(BaseModel):
+    # Query parameters of the quote endpoint: only quotes on these shipping
+    # channels, cheapest or fastest first, at most limit of them.
+    channel: Optional[frozenset[str]] = None
+    sort: Optional[Literal["total_cost", "min_days"]] = None
+    limit: Optional[int] = Field(default=None, ge=1)
+
+    @classmethod
+    def from_query(cls, query) -> Optional["QuoteSelection"]:
+        # Channels may be repeated or comma separated, channel=air,ocean.
+        # None when the query has no selection parameter at all, so quotes
+        # are returned as priced.
+        params = {name: query[name] for name in ("sort", "limit") if name in query}
+        if "channel" in query:
+            params["channel"] = [
+                channel
+                for value in query.getlist("channel")
+                for channel in value.split(",")
+                if channel
+            ]
+        return cls.model_validate(params) if params else None
+
+    def cache_key(self) -> str:
+        channels = None if self.channel is None else sorted(self.channel)
+        return repr((channels, self.sort, self.limit))
+
+
+class ShipmentProfile(BaseModel):
+    starting_country: str
+    chargeable_weight: float
+    service_fee_cents: int
+    oversized_fee_cents: int
+    overweight_fee_cents: int
+
+    @property
+    def fees_cents(self) -> int:
+        return (
+            self.service_fee_cents
+            + self.oversized_fee_cents
+            + self.overweight_fee_cents
+        )
+
+
 class QuotePriceBreakdown(BaseModel):
     shipping_cost: float
     service_fee: float
@@ -35,116 +119,461 @@ class Quote(BaseModel):
     shipping_channel: str
     cost_breakdown: QuotePriceBreakdown
     shipping_time_range: ShippingTimeRange
+    # Added up in cents when the quote is priced rather than from the float
+    # breakdown on every dump.
+    total_cost: float
 
-    @computed_field
-    @property
-    def total_cost(self) -> float:
-        return (
-            self.cost_breakdown.shipping_cost
-            + self.cost_breakdown.service_fee
-            + self.cost_breakdown.overweight_fee
-            + self.cost_breakdown.oversized_fee
-        )
+
+class ShippingQuotesResponse(BaseModel):
+    quotes: list[Quote]
+
+
+# starting country -> destination country -> quotes
+QuoteMatrix = dict[str, dict[str, list[Quote]]]
+
+
+class QuoteMatrixResponse(BaseModel):
+    matrix: QuoteMatrix
+
+
+def get_validation_error_detail(errors: list[dict]) -> dict:
+    # Nest pydantic error locations the way DRF reports serializer errors,
+    # e.g. {"boxes": {"0": {"count": ["Field required"]}}}.
+    detail = {}
+    for item in errors:
+        *parents, field = [str(location) for location in item["loc"]] or [
+            "non_field_errors"
+        ]
+        node = detail
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node.setdefault(field, []).append(item["msg"])
+    return detail
 
 
 class QuoteCalculationService:
     @staticmethod
-    def _calculate_gross_weight(boxes: list[Box]):
-        return functools.reduce(
-            lambda gross_weight, box: gross_weight + box.count * box.weight_kg, boxes, 0
-        )
+    def _calculate_gross_weight(boxes: Boxes):
+        # Every representation sums weights with fsum, so they agree exactly.
+        if isinstance(boxes, COLUMNAR_BOXES):
+            return boxes.gross_weight()
+        return math.fsum(box.count * box.weight_kg for box in boxes)
 
     @staticmethod
-    def _calculate_volumetric_weight(boxes: list[Box]):
-        print("calculate volumetric")
-        return functools.reduce(
-            lambda vol_weight, box: vol_weight + (box.count * box.volume / 6000),
-            boxes,
-            0,
-        )
+    def _calculate_volumetric_weight(boxes: Boxes):
+        if isinstance(boxes, COLUMNAR_BOXES):
+            return boxes.volumetric_weight()
+        return math.fsum(box.count * box.volume for box in boxes) / 6000
 
     @staticmethod
-    def _is_box_overweight(starting_country: str, box: Box) -> bool:
-        if starting_country == "India":
-            return box.weight_kg >= 15
-        return box.weight_kg > 30
+    def create_box_aggregates(
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> BoxAggregates:
+        surcharge_rules = surcharge_rules or get_surcharge_rules()
+        return BoxAggregates(
+            surcharge_rules.overweight_limits(), surcharge_rules.oversize_limits()
+        )
 
     @staticmethod
-    def _is_box_oversized(starting_country: str, box: Box) -> bool:
-        if starting_country == "Vietnam":
-            return box.longest_dimension > 70
-        return box.longest_dimension > 120
+    def aggregate_boxes(
+        boxes: Boxes, surcharge_rules: Optional[SurchargeRules] = None
+    ) -> BoxAggregates:
+        # Folds boxes into totals covering every surcharge limit, so profiles
+        # for any number of starting countries are built without going over
+        # the box lines again.
+        if isinstance(boxes, BoxAggregates):
+            return boxes
+        aggregates = QuoteCalculationService.create_box_aggregates(surcharge_rules)
+        if isinstance(boxes, (Manifest, BoxArrays)):
+            rows = zip(
+                boxes.count, boxes.weight_kg, boxes.volume, boxes.longest_dimension
+            )
+        else:
+            rows = (
+                (box.count, box.weight_kg, box.volume, box.longest_dimension)
+                for box in boxes
+            )
+        for row in rows:
+            aggregates.add_row(*row)
+        return aggregates
 
     @staticmethod
     def _calculate_boxes_overweight_fee(
-        starting_country: str, boxes: list[Box]
-    ) -> float:
+        surcharges: OriginSurcharges, boxes: Boxes
+    ) -> int:
+        if isinstance(boxes, COLUMNAR_BOXES):
+            return surcharges.overweight_fee_cents * boxes.count_overweight(
+                *surcharges.overweight_limit
+            )
         return functools.reduce(
-            lambda fee, box: fee + 80
-            if QuoteCalculationService._is_box_overweight(starting_country, box)
-            else 0,
+            lambda fee, box: fee
+            + (
+                surcharges.overweight_fee_cents
+                if surcharges.is_overweight(box.weight_kg)
+                else 0
+            ),
             boxes,
             0,
         )
 
     @staticmethod
     def _calculate_boxes_oversized_fee(
-        starting_country: str, boxes: list[Box]
-    ) -> float:
+        surcharges: OriginSurcharges, boxes: Boxes
+    ) -> int:
+        if isinstance(boxes, COLUMNAR_BOXES):
+            return surcharges.oversized_fee_cents * boxes.count_oversized(
+                *surcharges.oversize_limit
+            )
         return functools.reduce(
-            lambda fee, box: fee + 100
-            if QuoteCalculationService._is_box_oversized(starting_country, box)
-            else 0,
+            lambda fee, box: fee
+            + (
+                surcharges.oversized_fee_cents
+                if surcharges.is_oversized(box.longest_dimension)
+                else 0
+            ),
             boxes,
             0,
         )
 
     @staticmethod
-    def _calculate_service_fee(starting_country: str) -> float:
-        return 300 if starting_country == "China" else 0
+    def _get_rates_for_weight(
+        starting_country: str,
+        destination_country: str,
+        chargeable_weight: float,
+        channels: Optional[frozenset[str]] = None,
+    ):
+        if settings.QUOTES_RATE_INDEX_ENABLED:
+            return get_rate_index().rates_for_weight(
+                starting_country, destination_country, chargeable_weight, channels
+            )
+        with quote_reads():
+            return PerWeightRate.objects.fetch_for_lane_and_weight(
+                starting_country, destination_country, chargeable_weight, channels
+            )
 
     @staticmethod
-    def calculate_quotes(
-        starting_country: str, destination_country: str, boxes: list[Box]
-    ) -> list[Quote]:
-        chargeable_weight = max(
+    def _calculate_chargeable_weight(boxes: Boxes) -> float:
+        return max(
             QuoteCalculationService._calculate_gross_weight(boxes),
             QuoteCalculationService._calculate_volumetric_weight(boxes),
         )
-        rates_for_weight = PerWeightRate.objects.filter(
-            rate__starting_country=starting_country,
-            rate__destination_country=destination_country,
-            min_weight_kg__lte=chargeable_weight,
-            max_weight_kg__gte=chargeable_weight,
+
+    @staticmethod
+    async def _aget_rates_for_weight(
+        starting_country: str,
+        destination_country: str,
+        chargeable_weight: float,
+        channels: Optional[frozenset[str]] = None,
+    ):
+        if settings.QUOTES_RATE_INDEX_ENABLED:
+            return (await aget_rate_index()).rates_for_weight(
+                starting_country, destination_country, chargeable_weight, channels
+            )
+        with quote_reads():
+            return await sync_to_async(PerWeightRate.objects.fetch_for_lane_and_weight)(
+                starting_country, destination_country, chargeable_weight, channels
+            )
+
+    @staticmethod
+    def build_shipment_profile(
+        starting_country: str,
+        boxes: Boxes,
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> ShipmentProfile:
+        surcharges = (surcharge_rules or get_surcharge_rules()).for_origin(
+            starting_country
         )
-        return [
-            Quote(
-                shipping_channel=rate.rate.shipping_channel,
-                cost_breakdown=QuotePriceBreakdown(
-                    shipping_cost=round(chargeable_weight * rate.per_kg_rate, 2),
-                    service_fee=round(
-                        QuoteCalculationService._calculate_service_fee(
-                            starting_country
-                        ),
-                        2,
-                    ),
-                    oversized_fee=round(
-                        QuoteCalculationService._calculate_boxes_oversized_fee(
-                            starting_country, boxes
-                        ),
-                        2,
+        return ShipmentProfile(
+            starting_country=starting_country,
+            chargeable_weight=QuoteCalculationService._calculate_chargeable_weight(
+                boxes
+            ),
+            service_fee_cents=surcharges.service_fee_cents,
+            oversized_fee_cents=QuoteCalculationService._calculate_boxes_oversized_fee(
+                surcharges, boxes
+            ),
+            overweight_fee_cents=(
+                QuoteCalculationService._calculate_boxes_overweight_fee(
+                    surcharges, boxes
+                )
+            ),
+        )
+
+    @staticmethod
+    def price_shipment_profile(profile: ShipmentProfile, rates) -> list[Quote]:
+        # Costs are added up in integer cents and only converted to currency
+        # amounts for the response, so every pricing path agrees to the cent.
+        service_fee = to_amount(profile.service_fee_cents)
+        oversized_fee = to_amount(profile.oversized_fee_cents)
+        overweight_fee = to_amount(profile.overweight_fee_cents)
+        fees_cents = profile.fees_cents
+        quotes = []
+        for rate in rates:
+            shipping_cost_cents = round_cents(
+                profile.chargeable_weight * rate.per_kg_rate_cents
+            )
+            quotes.append(
+                Quote(
+                    shipping_channel=rate.shipping_channel,
+                    cost_breakdown=QuotePriceBreakdown(
+                        shipping_cost=to_amount(shipping_cost_cents),
+                        service_fee=service_fee,
+                        oversized_fee=oversized_fee,
+                        overweight_fee=overweight_fee,
                     ),
-                    overweight_fee=round(
-                        QuoteCalculationService._calculate_boxes_overweight_fee(
-                            starting_country, boxes
-                        ),
-                        2,
+                    shipping_time_range=ShippingTimeRange(
+                        min_days=rate.shipping_time_range_min_days,
+                        max_days=rate.shipping_time_range_max_days,
                     ),
-                ),
-                shipping_time_range=ShippingTimeRange(
-                    min_days=rate.rate.shipping_time_range_min_days,
-                    max_days=rate.rate.shipping_time_range_max_days,
-                ),
+                    total_cost=to_amount(shipping_cost_cents + fees_cents),
+                )
             )
-            for rate in rates_for_weight
-        ]
+        return quotes
+
+    @staticmethod
+    def select_rates(
+        profile: ShipmentProfile, rates: Iterable, selection: QuoteSelection
+    ) -> list:
+        # Filters, orders and truncates the rates before pricing, as one pass
+        # over a generator, so quotes that would be dropped are never built.
+        # With a limit only the top rates are kept in a heap instead of
+        # sorting all of them. Fees are the same for every rate of a profile,
+        # so shipping costs order the rates like the quotes' total costs.
+        # Ties are broken by the other sort field, then by lane order.
+        if selection.channel is not None:
+            rates = (
+                rate for rate in rates if rate.shipping_channel in selection.channel
+            )
+
+        def cost(rate) -> int:
+            return round_cents(profile.chargeable_weight * rate.per_kg_rate_cents)
+
+        sort_keys = {
+            "total_cost": lambda rate: (cost(rate), rate.shipping_time_range_min_days),
+            "min_days": lambda rate: (rate.shipping_time_range_min_days, cost(rate)),
+        }
+        if selection.sort is None:
+            return list(itertools.islice(rates, selection.limit))
+        if selection.limit is None:
+            return sorted(rates, key=sort_keys[selection.sort])
+        return heapq.nsmallest(selection.limit, rates, key=sort_keys[selection.sort])
+
+    @staticmethod
+    def calculate_profile_quotes(
+        profile: ShipmentProfile,
+        destination_country: str,
+        selection: Optional[QuoteSelection] = None,
+    ) -> list[Quote]:
+        with stage("rates"):
+            rates_for_weight = QuoteCalculationService._get_rates_for_weight(
+                profile.starting_country,
+                destination_country,
+                profile.chargeable_weight,
+                selection and selection.channel,
+            )
+        with stage("pricing"):
+            if selection is not None:
+                rates_for_weight = QuoteCalculationService.select_rates(
+                    profile, rates_for_weight, selection
+                )
+            return QuoteCalculationService.price_shipment_profile(
+                profile, rates_for_weight
+            )
+
+    @staticmethod
+    async def acalculate_profile_quotes(
+        profile: ShipmentProfile,
+        destination_country: str,
+        selection: Optional[QuoteSelection] = None,
+    ) -> list[Quote]:
+        with stage("rates"):
+            rates_for_weight = await QuoteCalculationService._aget_rates_for_weight(
+                profile.starting_country,
+                destination_country,
+                profile.chargeable_weight,
+                selection and selection.channel,
+            )
+        with stage("pricing"):
+            if selection is not None:
+                rates_for_weight = QuoteCalculationService.select_rates(
+                    profile, rates_for_weight, selection
+                )
+            return QuoteCalculationService.price_shipment_profile(
+                profile, rates_for_weight
+            )
+
+    @staticmethod
+    def calculate_quotes(
+        starting_country: str,
+        destination_country: str,
+        boxes: Boxes,
+        selection: Optional[QuoteSelection] = None,
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> list[Quote]:
+        # Box aggregates only count boxes over the limits of the rules they
+        # were built with, so those same rules must be passed in here.
+        calculate = functools.partial(
+            QuoteCalculationService._calculate_quotes, surcharge_rules=surcharge_rules
+        )
+        if settings.QUOTES_CACHE_ENABLED:
+            # Quotes are cached per selection, so a miss only prices the
+            # selected rates too.
+            return quote_cache.get_or_calculate(
+                starting_country, destination_country, boxes, calculate, selection
+            )
+        return calculate(starting_country, destination_country, boxes, selection)
+
+    @staticmethod
+    def _calculate_quotes(
+        starting_country: str,
+        destination_country: str,
+        boxes: Boxes,
+        selection: Optional[QuoteSelection] = None,
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> list[Quote]:
+        with stage("profile"):
+            profile = QuoteCalculationService.build_shipment_profile(
+                starting_country, boxes, surcharge_rules
+            )
+        return QuoteCalculationService.calculate_profile_quotes(
+            profile, destination_country, selection
+        )
+
+    @staticmethod
+    async def acalculate_quotes(
+        starting_country: str,
+        destination_country: str,
+        boxes: Boxes,
+        selection: Optional[QuoteSelection] = None,
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> list[Quote]:
+        acalculate = functools.partial(
+            QuoteCalculationService._acalculate_quotes, surcharge_rules=surcharge_rules
+        )
+        if settings.QUOTES_CACHE_ENABLED:
+            return await quote_cache.aget_or_calculate(
+                starting_country, destination_country, boxes, acalculate, selection
+            )
+        return await acalculate(starting_country, destination_country, boxes, selection)
+
+    @staticmethod
+    async def _acalculate_quotes(
+        starting_country: str,
+        destination_country: str,
+        boxes: Boxes,
+        selection: Optional[QuoteSelection] = None,
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> list[Quote]:
+        surcharge_rules = surcharge_rules or await aget_surcharge_rules()
+        with stage("profile"):
+            profile = QuoteCalculationService.build_shipment_profile(
+                starting_country, boxes, surcharge_rules
+            )
+        return await QuoteCalculationService.acalculate_profile_quotes(
+            profile, destination_country, selection
+        )
+
+    @staticmethod
+    def calculate_batch_quotes(
+        shipments: list[Shipment],
+        rate_index: Optional[RateIndex] = None,
+        surcharge_rules: Optional[SurchargeRules] = None,
+    ) -> list[list[Quote]]:
+        if rate_index is None:
+            with stage("rates"):
+                if settings.QUOTES_RATE_INDEX_ENABLED:
+                    rate_index = get_rate_index()
+                else:
+                    # One query for every lane in the batch instead of one
+                    # per shipment.
+                    rate_index = RateIndex.load(
+                        None,
+                        lanes={
+                            (shipment.starting_country, shipment.destination_country)
+                            for shipment in shipments
+                        },
+                    )
+
+        with stage("profile"):
+            surcharge_rules = surcharge_rules or get_surcharge_rules()
+            profiles = [
+                QuoteCalculationService.build_shipment_profile(
+                    shipment.starting_country, shipment.boxes, surcharge_rules
+                )
+                for shipment in shipments
+            ]
+
+        # Weights are looked up lane by lane, all of a lane's weights at once.
+        rates: list = [None] * len(shipments)
+        with stage("rates"):
+            lane_positions: dict[tuple[str, str], list[int]] = {}
+            for position, shipment in enumerate(shipments):
+                lane_positions.setdefault(
+                    (shipment.starting_country, shipment.destination_country), []
+                ).append(position)
+            for (
+                starting_country,
+                destination_country,
+            ), positions in lane_positions.items():
+                lane_rates = rate_index.rates_for_weights(
+                    starting_country,
+                    destination_country,
+                    [profiles[position].chargeable_weight for position in positions],
+                )
+                for position, shipment_rates in zip(positions, lane_rates):
+                    rates[position] = shipment_rates
+
+        with stage("pricing"):
+            return [
+                QuoteCalculationService.price_shipment_profile(profile, shipment_rates)
+                for profile, shipment_rates in zip(profiles, rates)
+            ]
+
+    @staticmethod
+    def calculate_quote_matrix(
+        boxes: Boxes,
+        starting_countries: Optional[list[str]] = None,
+        destination_countries: Optional[list[str]] = None,
+    ) -> QuoteMatrix:
+        # Prices one shipment on every lane matching the filters. The boxes
+        # are aggregated once and each starting country gets one profile,
+        # however many destinations it is priced against.
+        with stage("profile"):
+            surcharge_rules = get_surcharge_rules()
+            aggregates = QuoteCalculationService.aggregate_boxes(boxes, surcharge_rules)
+
+        with stage("rates"):
+            if settings.QUOTES_RATE_INDEX_ENABLED:
+                rate_index = get_rate_index()
+            else:
+                # One query for every matching lane.
+                rate_index = RateIndex.load(
+                    None,
+                    starting_countries=starting_countries,
+                    destination_countries=destination_countries,
+                )
+            lanes = rate_index.filter_lanes(starting_countries, destination_countries)
+
+        with stage("profile"):
+            profiles = {
+                starting_country: QuoteCalculationService.build_shipment_profile(
+                    starting_country, aggregates, surcharge_rules
+                )
+                for starting_country in {lane[0] for lane in lanes}
+            }
+
+        matrix: QuoteMatrix = {}
+        with stage("pricing"):
+            for starting_country, destination_country in lanes:
+                profile = profiles[starting_country]
+                matrix.setdefault(starting_country, {})[
+                    destination_country
+                ] = QuoteCalculationService.price_shipment_profile(
+                    profile,
+                    rate_index.rates_for_weight(
+                        starting_country,
+                        destination_country,
+                        profile.chargeable_weight,
+                    ),
+                )
+        return matrix
@@ -1,28 +1,305 @@
+from typing import Optional
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from pydantic import ValidationError
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework.generics import CreateAPIView
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+)
+from quotes.box_arrays import BoxArrays, is_vectorization_available
+from quotes.instrumentation import record_boxes, render_metrics, stage
+from quotes.manifest import Manifest
+from quotes.quote_cache import quote_cache
+from quotes.streaming import (
+    BOX_LINE_MEDIA_TYPES,
+    ManifestStreamError,
+    read_box_lines,
+    read_shipment_stream,
+)
+from quotes.surcharges import (
+    SurchargeRules,
+    aget_surcharge_rules,
+    get_surcharge_rules,
+)
 from quotes.serializers import (
+    ShippingQuotesBatchRequestSerializer,
     ShippingQuotesRequestSerializer,
-    ShippingQuotesResponseSerializer,
 )
 from quotes.utils import (
     QuoteCalculationService,
-    Box,
+    Boxes,
+    QuoteMatrixRequest,
+    QuoteMatrixResponse,
+    QuoteSelection,
+    Shipment,
+    ShipmentLane,
+    ShippingQuotesResponse,
+    get_validation_error_detail,
 )
 
 
+def _build_boxes(boxes):
+    record_boxes(len(boxes))
+    min_boxes = settings.QUOTES_VECTORIZE_MIN_BOXES
+    if (
+        min_boxes is not None
+        and len(boxes) >= min_boxes
+        and is_vectorization_available()
+    ):
+        if isinstance(boxes, Manifest):
+            return BoxArrays.from_manifest(boxes)
+        return BoxArrays.from_boxes(boxes)
+    return boxes
+
+
+def _should_stream(request) -> bool:
+    min_bytes = settings.QUOTES_STREAMING_MIN_BYTES
+    return (
+        min_bytes is not None
+        and int(request.META.get("CONTENT_LENGTH") or 0) >= min_bytes
+    )
+
+
+def _box_line_media_type(request) -> Optional[str]:
+    media_type = request.content_type.split(";")[0].strip()
+    return media_type if media_type in BOX_LINE_MEDIA_TYPES else None
+
+
+def _parse_error_message(box_line_media_type: Optional[str]) -> str:
+    return f"{BOX_LINE_MEDIA_TYPES.get(box_line_media_type, 'JSON')} parse error"
+
+
+def _stream_shipment(
+    request,
+    box_line_media_type: Optional[str] = None,
+    surcharge_rules: Optional[SurchargeRules] = None,
+):
+    # Large JSON bodies are read straight from the request stream into
+    # running box aggregates, so memory does not grow with the manifest.
+    # CSV and NDJSON bodies only hold box lines and are always streamed,
+    # with the lane taken from the query string.
+    boxes = QuoteCalculationService.create_box_aggregates(surcharge_rules)
+    if box_line_media_type is None:
+        fields, errors = read_shipment_stream(
+            request,
+            boxes,
+            max_value_length=settings.QUOTES_STREAMING_MAX_VALUE_LENGTH,
+            max_bytes=settings.QUOTES_STREAMING_MAX_BYTES,
+        )
+    else:
+        fields = request.GET.dict()
+        errors = read_box_lines(
+            request,
+            boxes,
+            box_line_media_type,
+            max_line_length=settings.QUOTES_STREAMING_MAX_VALUE_LENGTH,
+            max_bytes=settings.QUOTES_STREAMING_MAX_BYTES,
+        )
+    try:
+        lane = ShipmentLane.model_validate(fields)
+    except ValidationError as error:
+        lane = None
+        errors = error.errors() + errors
+    record_boxes(len(boxes))
+    return lane, boxes, errors
+
+
+def _validate_json(model, body):
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as error:
+        if any(item["type"] == "json_invalid" for item in error.errors()):
+            raise ParseError("JSON parse error")
+        raise DRFValidationError(get_validation_error_detail(error.errors()))
+
+
+def _parse_selection(request) -> Optional[QuoteSelection]:
+    try:
+        return QuoteSelection.from_query(request.GET)
+    except ValidationError as error:
+        raise DRFValidationError(get_validation_error_detail(error.errors()))
+
+
+def _quotes_response(quotes) -> HttpResponse:
+    with stage("render"):
+        body = ShippingQuotesResponse(quotes=quotes).model_dump_json()
+    return HttpResponse(body, content_type="application/json", status=HTTP_200_OK)
+
+
 class ShippingQuotesView(CreateAPIView):
+    @staticmethod
+    def _parse_shipment(
+        request,
+    ) -> tuple[ShipmentLane, Boxes, Optional[SurchargeRules]]:
+        # JSON, CSV and NDJSON bodies are validated once, straight into the
+        # pydantic models or box aggregates. Other content types (e.g. form
+        # posts) still go through DRF parsing. Streamed boxes come with the
+        # surcharge rules they were aggregated for.
+        box_line_media_type = _box_line_media_type(request)
+        if box_line_media_type or (
+            request.content_type.startswith("application/json")
+            and _should_stream(request)
+        ):
+            surcharge_rules = get_surcharge_rules()
+            try:
+                lane, boxes, errors = _stream_shipment(
+                    request, box_line_media_type, surcharge_rules
+                )
+            except ManifestStreamError:
+                raise ParseError(_parse_error_message(box_line_media_type))
+            if errors:
+                raise DRFValidationError(get_validation_error_detail(errors))
+            return lane, boxes, surcharge_rules
+        if request.content_type.startswith("application/json"):
+            shipment = _validate_json(Shipment, request.body)
+        else:
+            serializer = ShippingQuotesRequestSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            shipment = Shipment.model_validate(serializer.data)
+        return shipment, _build_boxes(shipment.boxes), None
+
     def post(self, request, *args, **kwargs):
-        serializer = ShippingQuotesRequestSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        data = serializer.data
+        with stage("parse"):
+            selection = _parse_selection(request)
+            lane, boxes, surcharge_rules = self._parse_shipment(request)
         quotes = QuoteCalculationService.calculate_quotes(
-            data["starting_country"],
-            data["destination_country"],
-            [Box(**box_data) for box_data in data["boxes"]],
+            lane.starting_country,
+            lane.destination_country,
+            boxes,
+            selection,
+            surcharge_rules,
+        )
+        return _quotes_response(quotes)
+
+
+class AsyncShippingQuotesView(View):
+    http_method_names = ["post"]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like DRF's APIView, the quote API is not cookie authenticated.
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request, *args, **kwargs):
+        box_line_media_type = _box_line_media_type(request)
+        if not (
+            box_line_media_type or request.content_type.startswith("application/json")
+        ):
+            return JsonResponse(
+                {"detail": f'Unsupported media type "{request.content_type}".'},
+                status=HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        with stage("parse"):
+            try:
+                selection = QuoteSelection.from_query(request.GET)
+            except ValidationError as error:
+                return JsonResponse(
+                    get_validation_error_detail(error.errors()),
+                    status=HTTP_400_BAD_REQUEST,
+                )
+            if box_line_media_type or _should_stream(request):
+                # Fetched here because the sync stream reader cannot query.
+                surcharge_rules = await aget_surcharge_rules()
+                try:
+                    lane, boxes, errors = _stream_shipment(
+                        request, box_line_media_type, surcharge_rules
+                    )
+                except ManifestStreamError:
+                    return JsonResponse(
+                        {"detail": _parse_error_message(box_line_media_type)},
+                        status=HTTP_400_BAD_REQUEST,
+                    )
+            else:
+                surcharge_rules = None
+                try:
+                    lane = Shipment.model_validate_json(request.body)
+                    boxes, errors = _build_boxes(lane.boxes), []
+                except ValidationError as error:
+                    errors = error.errors()
+        if errors:
+            return JsonResponse(
+                get_validation_error_detail(errors), status=HTTP_400_BAD_REQUEST
+            )
+        quotes = await QuoteCalculationService.acalculate_quotes(
+            lane.starting_country,
+            lane.destination_country,
+            boxes,
+            selection,
+            surcharge_rules,
         )
-        response_serializer = ShippingQuotesResponseSerializer(
-            data={"quotes": [quote.model_dump(mode="json") for quote in quotes]}
+        return _quotes_response(quotes)
+
+
+class ShippingQuotesBatchView(CreateAPIView):
+    def post(self, request, *args, **kwargs):
+        with stage("parse"):
+            batch_serializer = ShippingQuotesBatchRequestSerializer(data=request.data)
+            batch_serializer.is_valid(raise_exception=True)
+
+            results = []
+            shipments = []
+            for shipment_data in batch_serializer.validated_data["shipments"]:
+                serializer = ShippingQuotesRequestSerializer(data=shipment_data)
+                if serializer.is_valid():
+                    shipments.append(Shipment(**serializer.data))
+                    results.append(None)
+                else:
+                    results.append({"errors": serializer.errors})
+        record_boxes(sum(len(shipment.boxes) for shipment in shipments))
+
+        batch_quotes = iter(QuoteCalculationService.calculate_batch_quotes(shipments))
+        for position, result in enumerate(results):
+            if result is None:
+                results[position] = {
+                    "quotes": [
+                        quote.model_dump(mode="json") for quote in next(batch_quotes)
+                    ]
+                }
+        return Response({"results": results}, status=HTTP_200_OK)
+
+
+class QuoteMatrixView(CreateAPIView):
+    def post(self, request, *args, **kwargs):
+        if not request.content_type.startswith("application/json"):
+            raise UnsupportedMediaType(request.content_type)
+        with stage("parse"):
+            matrix_request = _validate_json(QuoteMatrixRequest, request.body)
+        record_boxes(len(matrix_request.boxes))
+        matrix = QuoteCalculationService.calculate_quote_matrix(
+            matrix_request.boxes,
+            matrix_request.starting_countries,
+            matrix_request.destination_countries,
+        )
+        with stage("render"):
+            body = QuoteMatrixResponse(matrix=matrix).model_dump_json()
+        return HttpResponse(body, content_type="application/json", status=HTTP_200_OK)
+
+
+class MetricsView(View):
+    http_method_names = ["get"]
+
+    def get(self, request, *args, **kwargs):
+        cache_stats = quote_cache.stats()
+        return HttpResponse(
+            render_metrics(
+                {
+                    "quotes_cache_hits_total": (
+                        "Quote cache hits.",
+                        cache_stats["hits"],
+                    ),
+                    "quotes_cache_misses_total": (
+                        "Quote cache misses.",
+                        cache_stats["misses"],
+                    ),
+                }
+            ),
+            content_type="text/plain; version=0.0.4",
         )
-        response_serializer.is_valid(raise_exception=True)
-        return Response(response_serializer.data, status=HTTP_200_OK)
@@ -0,0 +1,138 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+from quotes.manifest import Manifest
+from quotes.models import PerWeightRate
+from quotes.rate_index import RateMatch, get_rate_index
+from quotes.routers import quote_reads
+from quotes.serializers import (
+    ShippingQuotesBatchRequestSerializer,
+    ShippingQuotesRequestSerializer,
+)
+from quotes.surcharges import get_surcharge_rules
+from quotes.utils import (
+    QuoteCalculationService,
+    QuoteMatrixRequest,
+    QuoteMatrixResponse,
+    Shipment,
+    ShipmentProfile,
+    ShippingQuotesResponse,
+)
+
+logger = logging.getLogger("quotes.warmup")
+
+WARM_UP_BOXES = [
+    {"count": 2, "weight_kg": 12.5, "length": 40, "width": 30, "height": 20}
+]
+
+
+@contextmanager
+def _timed(timings: dict[str, float], step: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def _prime_validators():
+    # The first request through a serializer builds its fields and the first
+    # pydantic validation or dump of a model sets up its validator and
+    # serializer, so every model the quote views use goes through once.
+    shipment = {
+        "starting_country": "Origin",
+        "destination_country": "Destination",
+        "boxes": WARM_UP_BOXES,
+    }
+    serializer = ShippingQuotesRequestSerializer(data=shipment)
+    serializer.is_valid(raise_exception=True)
+    Shipment.model_validate(serializer.data)
+    Shipment.model_validate_json(json.dumps(shipment))
+    ShippingQuotesBatchRequestSerializer(data={"shipments": [shipment]}).is_valid(
+        raise_exception=True
+    )
+    QuoteMatrixRequest.model_validate_json(json.dumps({"boxes": WARM_UP_BOXES}))
+
+    quotes = QuoteCalculationService.price_shipment_profile(
+        ShipmentProfile(
+            starting_country="Origin",
+            chargeable_weight=25,
+            service_fee_cents=0,
+            oversized_fee_cents=0,
+            overweight_fee_cents=0,
+        ),
+        [RateMatch("warm-up", 1, 2, 100)],
+    )
+    ShippingQuotesResponse(quotes=quotes).model_dump_json()
+    QuoteMatrixResponse(matrix={"Origin": {"Destination": quotes}}).model_dump_json()
+
+
+def _find_lane():
+    if settings.QUOTES_RATE_INDEX_ENABLED:
+        lanes = get_rate_index().filter_lanes()
+        return lanes[0] if lanes else None
+    with quote_reads():
+        return (
+            PerWeightRate.objects.active()
+            .with_rate_details()
+            .values_list("starting_country", "destination_country")
+            .first()
+        )
+
+
+def _price_synthetic_quote(lane):
+    # Profile and pricing without the quote cache, so warming up neither
+    # stores a quote nor counts as a cache miss.
+    starting_country, destination_country = lane
+    profile = QuoteCalculationService.build_shipment_profile(
+        starting_country, Manifest.from_dicts(WARM_UP_BOXES)
+    )
+    QuoteCalculationService.calculate_profile_quotes(profile, destination_country)
+
+
+def _close_connections():
+    # Connections opened while warming up are not handed down to workers
+    # forked afterwards, e.g. by gunicorn --preload, pooled ones included.
+    connections.close_all()
+    if any(
+        database["ENGINE"] == "quotes.db.postgresql"
+        for database in settings.DATABASES.values()
+    ):
+        from quotes.db.postgresql.base import close_pools
+
+        close_pools()
+
+
+def warm_up() -> dict[str, float]:
+    # Does the one-off work a new worker would otherwise do while serving its
+    # first quotes: importing the views, building validators, loading the
+    # rate index and surcharge rules and pricing one quote. Returns the time
+    # each step took in ms. A database that is unreachable or not migrated
+    # yet only skips the steps needing it.
+    timings: dict[str, float] = {}
+    with _timed(timings, "total"):
+        with _timed(timings, "urls"):
+            get_resolver().url_patterns
+        with _timed(timings, "validators"):
+            _prime_validators()
+        try:
+            with _timed(timings, "rates"):
+                get_surcharge_rules()
+                lane = _find_lane()
+            if lane is not None:
+                with _timed(timings, "quote"):
+                    _price_synthetic_quote(lane)
+        except DatabaseError as error:
+            logger.warning("Skipped warming up rates: %s", error)
+        finally:
+            _close_connections()
+
+    logger.info(
+        " ".join(f"{step}_ms={duration}" for step, duration in timings.items()),
+        extra={"quote_warm_up": timings},
+    )
+    return timings